@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Modified z-score cut-off recommended by Iglewicz & Hoaglin
+DEFAULT_THRESHOLD = 3.5
+# Metrics whose changes are judged on a log scale (relative jumps)
+LOG_METRICS = {"waste_per_capita_kg", "total_waste_tonnes"}
+
+
+@dataclass(frozen=True)
+class Anomalies:
+    """
+    Robust z-scores of every observed change, for every metric and country of the cube.
+
+    `scores[m, c, y]` scores the step from the previous observation to year y
+    (NaN where y is not observed or has no earlier observation); `previous`
+    holds the year index of that previous observation.
+    """
+    countries: tuple
+    years: np.ndarray
+    metrics: tuple
+    values: np.ndarray
+    previous: np.ndarray
+    scores: np.ndarray
+    threshold: float
+
+    @property
+    def flags(self):
+        with np.errstate(invalid="ignore"):
+            return np.abs(self.scores) > self.threshold
+
+    def mask(self, metric):
+        """Boolean (country, year) array of flagged points"""
+        return self.flags[self.metrics.index(metric)]
+
+    def lookup(self, metric, countries, years):
+        """Vectorized flag lookup for parallel arrays of countries and years (False when outside the cube)"""
+        lookup = {c: i for i, c in enumerate(self.countries)}
+        ci = np.array([lookup.get(c, -1) for c in countries], dtype=int)
+        yi = np.asarray(years, dtype=int) - int(self.years[0])
+        inside = (ci >= 0) & (yi >= 0) & (yi < len(self.years))
+        result = np.zeros(len(ci), dtype=bool)
+        result[inside] = self.mask(metric)[ci[inside], yi[inside]]
+        return result
+
+    def table(self, metric, countries=None):
+        """Flagged points of one metric: country, year, value, previous observation and z-score"""
+        m = self.metrics.index(metric)
+        rows, cols = np.nonzero(self.mask(metric))
+        frame = pd.DataFrame({
+            "country": np.array(self.countries)[rows],
+            "year": self.years[cols],
+            "value": self.values[m, rows, cols],
+            "previous_year": self.years[self.previous[m, rows, cols]],
+            "previous_value": self.values[m, rows, self.previous[m, rows, cols]],
+            "robust_z": self.scores[m, rows, cols],
+        })
+        if countries is not None:
+            frame = frame[frame["country"].isin(countries)]
+        return frame.sort_values("robust_z", key=np.abs, ascending=False).reset_index(drop=True)
+
+
+def detect_anomalies(cube, threshold=DEFAULT_THRESHOLD):
+    """
+    Flag suspicious jumps in all observed series of the cube in one array pass.
+
+    Each step between consecutive observations (possibly years apart) is compared
+    with the series' typical yearly change: residual = (step - median_rate * gap) / sqrt(gap).
+    Residuals are scaled by their MAD, floored at the MAD pooled over all countries
+    so that very smooth series do not flag ordinary noise. Interpolated and imputed
+    cells are never scored; they are only as good as the observations around them.
+    """
+    n_metrics, n_countries, n_years = cube.values.shape
+    cols = np.arange(n_years)
+    previous = np.zeros(cube.values.shape, dtype=int)
+    scores = np.full(cube.values.shape, np.nan)
+    observed_values = np.full(cube.values.shape, np.nan)
+
+    with warnings.catch_warnings():
+        # Countries without enough observations yield all-NaN slices
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for m, metric in enumerate(cube.metrics):
+            values = cube.values[m]
+            observed = cube.observed_mask(metric) & ~np.isnan(values)
+            if metric in LOG_METRICS:
+                observed &= values > 0
+            observed_values[m] = np.where(observed, values, np.nan)
+            series = np.log(observed_values[m]) if metric in LOG_METRICS else observed_values[m]
+
+            # Index of the latest observation strictly before each year
+            last = np.maximum.accumulate(np.where(observed, cols, -1), axis=1)
+            prev = np.concatenate([np.full((n_countries, 1), -1), last[:, :-1]], axis=1)
+            scored = observed & (prev >= 0)
+            prev = np.clip(prev, 0, None)
+
+            gap = np.where(scored, cols - prev, np.nan)
+            step = np.where(scored, series - np.take_along_axis(series, prev, axis=1), np.nan)
+            typical = np.nanmedian(step / gap, axis=1, keepdims=True)
+            resid = (step - typical * gap) / np.sqrt(gap)
+
+            centre = np.nanmedian(resid, axis=1, keepdims=True)
+            spread = 1.4826 * np.nanmedian(np.abs(resid - centre), axis=1, keepdims=True)
+            pooled = 1.4826 * np.nanmedian(np.abs(resid - np.nanmedian(resid)))
+            scale = np.fmax(spread, pooled)
+
+            previous[m] = prev
+            scores[m] = np.where(scored & (scale > 0), (resid - centre) / scale, np.nan)
+
+    return Anomalies(
+        countries=cube.countries,
+        years=cube.years,
+        metrics=cube.metrics,
+        values=observed_values,
+        previous=previous,
+        scores=scores,
+        threshold=threshold,
+    )
+
+
+def without_anomalies(df_waste, flagged):
+    """
+    Waste data with flagged observations left out and the gaps around them filled again.
+
+    Interpolated, extrapolated and imputed waste values of an affected country were
+    derived from its observations, the flagged ones included, so they are dropped
+    as well and re-interpolated linearly from the remaining observations, as in
+    data_loader.clean_datasets. Other countries are returned unchanged.
+
+    Args:
+        df_waste: Waste data with waste_observed and population_millions columns
+        flagged: Iterable of (country, year) observations to leave out
+
+    Returns:
+        DataFrame with the same rows as df_waste
+    """
+    flagged = {(country, int(year)) for country, year in flagged}
+    if not flagged:
+        return df_waste
+
+    df = df_waste.copy()
+    affected = df["country"].isin({country for country, _ in flagged}).to_numpy()
+    dropped = np.array([key in flagged for key in zip(df["country"], df["year"].astype(int))])
+    observed = df["waste_observed"].fillna(False).astype(bool).to_numpy()
+    df.loc[affected & (dropped | ~observed), "waste_per_capita_kg"] = np.nan
+
+    for country in {country for country, _ in flagged}:
+        rows = df[df["country"] == country].sort_values("year").index
+        series = df.loc[rows, "waste_per_capita_kg"]
+        if series.notna().sum() >= 2:
+            df.loc[rows, "waste_per_capita_kg"] = series.interpolate(method="linear", limit_direction="both")
+
+    # Population is static per country, so totals follow per capita values
+    df.loc[affected, "total_waste_tonnes"] = (
+        df.loc[affected, "waste_per_capita_kg"] * df.loc[affected, "population_millions"] * 1000
+    )
+    return df
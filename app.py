@@ -6,10 +6,25 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from pathlib import Path
 import numpy as np
-from sklearn.impute import KNNImputer
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
-from statsmodels.tsa.arima.model import ARIMA
+import functools
+import os
+import time
+import metrics
+from charts import PACKED_MIN_SERIES, line_chart, packed_traces, series_colors
+from clustering import DISTANCE_METHODS
+from cube import OBSERVED
+from export import FORMATS, export_file
+from loaders import (DEFAULT_SELECTIONS, load_animated_map, load_anomalies, load_cube, load_data, load_forecasts,
+                     load_indicators, load_rank_tables, load_scenario_baseline, load_sector_cube,
+                     load_sector_forecasts, load_trajectory_distances, load_vintage_forecast_changes,
+                     load_vintage_store, load_window_index, start_metrics_server, start_warmup)
+from risk import AFRICA_RULES, EUROPE_RULES, calculate_risk_score, calculate_risk_score_africa
+from scenarios import apply_scenario, monte_carlo_ranks, rule_sensitivity
+from similarity import DEFAULT_WINDOW
+from tables import PAGE_SIZE, gradient_styles, page_bounds, query_table
+from vintages import CURRENT, list_vintages
+from forecasting import SECTOR_COLS, forecast_sectors, forecast_totals
+from indicators import INDICATOR_LABELS
 import warnings
 warnings.filterwarnings("ignore")
 
@@ -20,6 +35,8 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+rerun_start = time.perf_counter()
+
 # Enhanced CSS
 st.markdown("""
 <style>
@@ -70,308 +87,184 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_data():
-    base_path = Path(__file__).parent
-    
-    df_rec = pd.read_csv(base_path / "municipal-waste-recycling-rate" / "municipal-waste-recycling-rate.csv")
-    df_was = pd.read_csv(base_path / "total-waste-generation" / "total-waste-generation.csv")
-    
-    df_rec = df_rec.rename(columns={
-        "Entity": "country", "Code": "country_code", "Year": "year",
-        "Variable:% Recycling - MUNW": "recycling_rate"
-    })
-    df_rec["year"] = df_rec["year"].astype(int)
-    
-    df_was = df_was.rename(columns={"Entity": "country", "Code": "country_code", "Year": "year"})
-    df_was["year"] = df_was["year"].astype(int)
-    
-    waste_cols = {}
-    for col in df_was.columns:
-        if "households" in col.lower() or "activities of households" in col.lower():
-            waste_cols[col] = "households_tonnes"
-        elif "construction" in col.lower():
-            waste_cols[col] = "construction_tonnes"
-        elif "manufacturing" in col.lower():
-            waste_cols[col] = "manufacturing_tonnes"
-        elif "other service" in col.lower():
-            waste_cols[col] = "services_tonnes"
-    
-    df_was = df_was.rename(columns=waste_cols)
-    wcols = [c for c in df_was.columns if c.endswith("_tonnes")]
-    
-    if wcols:
-        df_was["total_waste_tonnes"] = df_was[wcols].sum(axis=1, skipna=True)
-    else:
-        numeric_cols = df_was.select_dtypes(include=[np.number]).columns
-        numeric_cols = [c for c in numeric_cols if c not in ["year"]]
-        if len(numeric_cols) > 0:
-            df_was["total_waste_tonnes"] = df_was[numeric_cols].sum(axis=1, skipna=True)
-        else:
-            df_was["total_waste_tonnes"] = 0
-    
-    # Expanded to 27 European countries with recycling data
-    europe = ["France", "Germany", "Italy", "Spain", "Belgium", "Netherlands",
-              "Austria", "Denmark", "Sweden", "Finland", "Norway", "Switzerland",
-              "Poland", "Portugal", "Greece", "Ireland", "Czechia",
-              "United Kingdom", "Luxembourg", "Slovenia", "Slovakia",
-              "Estonia", "Hungary", "Iceland", "Latvia", "Lithuania", "Turkey"]
-    
-    # Expanded to 22 African countries with waste data
-    africa = ["Algeria", "Egypt", "Morocco", "Tunisia", "South Africa",
-              "Kenya", "Ghana", "Botswana", "Mauritius", "Benin",
-              "Burkina Faso", "Burundi", "Cape Verde", "Guinea", "Lesotho",
-              "Madagascar", "Niger", "Sudan", "Tanzania", "Togo", "Zambia", "Zimbabwe"]
-    
-    europe = [c for c in europe if c in df_rec["country"].unique()]
-    africa = [c for c in africa if c in df_was["country"].unique()]
-    
-    pop_dict = {
-        # European countries (27 total)
-        "France": 67.4, "Germany": 83.2, "Italy": 59.6, "Spain": 47.4,
-        "Belgium": 11.5, "Netherlands": 17.4, "Austria": 8.9, "Denmark": 5.8,
-        "Sweden": 10.4, "Finland": 5.5, "Norway": 5.4, "Switzerland": 8.6,
-        "Poland": 38.0, "Portugal": 10.3, "Greece": 10.7, "Ireland": 5.0,
-        "Czechia": 10.7, "United Kingdom": 67.1, "Luxembourg": 0.63,
-        "Slovenia": 2.1, "Slovakia": 5.5,
-        "Estonia": 1.3, "Hungary": 9.7, "Iceland": 0.37, "Latvia": 1.9,
-        "Lithuania": 2.8, "Turkey": 84.3,
-        # African countries (22 total)
-        "Algeria": 43.9, "Egypt": 102.3, "Morocco": 36.9, "Tunisia": 11.8,
-        "South Africa": 59.3, "Kenya": 53.8, "Ghana": 31.1, "Botswana": 2.4,
-        "Mauritius": 1.3, "Benin": 12.1,
-        "Burkina Faso": 20.9, "Burundi": 11.9, "Cape Verde": 0.56, "Guinea": 13.1,
-        "Lesotho": 2.1, "Madagascar": 27.7, "Niger": 24.2, "Sudan": 43.8,
-        "Tanzania": 59.7, "Togo": 8.3, "Zambia": 18.4, "Zimbabwe": 14.9
-    }
-    
-    df_was["population_millions"] = df_was["country"].map(pop_dict)
-    mask = df_was["population_millions"].notna() & (df_was["total_waste_tonnes"] > 0)
-    df_was.loc[mask, "waste_per_capita_kg"] = (
-        df_was.loc[mask, "total_waste_tonnes"] * 1000 / 
-        (df_was.loc[mask, "population_millions"] * 1_000_000)
-    )
-    
-    africa_data = df_was[df_was["country"].isin(africa)].copy()
-    
-    if len(africa_data) > 0:
-        for country in africa:
-            country_data = africa_data[africa_data["country"] == country].copy()
-            if len(country_data) > 0:
-                year_min = africa_data["year"].min()
-                year_max = africa_data["year"].max()
-                
-                full_years = pd.DataFrame({
-                    "year": range(year_min, year_max + 1),
-                    "country": country
-                })
-                
-                country_full = pd.merge(full_years, country_data, 
-                                       on=["year", "country"], how="left")
-                
-                country_full["country_code"] = country_data["country_code"].iloc[0] if len(country_data) > 0 else None
-                country_full["population_millions"] = pop_dict.get(country)
-                
-                if country_full["total_waste_tonnes"].notna().sum() >= 2:
-                    country_full["total_waste_tonnes"] = country_full["total_waste_tonnes"].interpolate(
-                        method="linear", limit_direction="both"
-                    )
-                    
-                    if country_full["population_millions"].iloc[0] > 0:
-                        mask_calc = country_full["total_waste_tonnes"].notna()
-                        country_full.loc[mask_calc, "waste_per_capita_kg"] = (
-                            country_full.loc[mask_calc, "total_waste_tonnes"] * 1000 / 
-                            (country_full.loc[mask_calc, "population_millions"] * 1_000_000)
-                        )
-                
-                df_was = df_was[df_was["country"] != country]
-                df_was = pd.concat([df_was, country_full], ignore_index=True)
-    
-    # Interpolate waste data for European countries (fill missing odd years)
-    europe_data = df_was[df_was["country"].isin(europe)].copy()
-    
-    if len(europe_data) > 0:
-        for country in europe:
-            country_data = europe_data[europe_data["country"] == country].copy()
-            if len(country_data) > 0 and len(country_data) >= 2:
-                year_min = country_data["year"].min()
-                year_max = country_data["year"].max()
-                
-                # Create full year range
-                full_years = pd.DataFrame({
-                    "year": range(year_min, year_max + 1),
-                    "country": country
-                })
-                
-                country_full = pd.merge(full_years, country_data, 
-                                       on=["year", "country"], how="left")
-                
-                country_full["country_code"] = country_data["country_code"].iloc[0] if len(country_data) > 0 else None
-                country_full["population_millions"] = pop_dict.get(country)
-                
-                # Interpolate total waste
-                if country_full["total_waste_tonnes"].notna().sum() >= 2:
-                    country_full["total_waste_tonnes"] = country_full["total_waste_tonnes"].interpolate(
-                        method="linear", limit_direction="both"
-                    )
-                    
-                    # Recalculate waste per capita
-                    if country_full["population_millions"].iloc[0] and country_full["population_millions"].iloc[0] > 0:
-                        mask_calc = country_full["total_waste_tonnes"].notna()
-                        country_full.loc[mask_calc, "waste_per_capita_kg"] = (
-                            country_full.loc[mask_calc, "total_waste_tonnes"] * 1000 / 
-                            (country_full.loc[mask_calc, "population_millions"] * 1_000_000)
-                        )
-                
-                # Remove old data and add interpolated data
-                df_was = df_was[df_was["country"] != country]
-                df_was = pd.concat([df_was, country_full], ignore_index=True)
-    
-    rec_list = []
-    for country in europe:
-        cdata = df_rec[df_rec["country"] == country].copy()
-        if len(cdata) > 0:
-            yrs = range(cdata["year"].min(), cdata["year"].max() + 1)
-            full_df = pd.DataFrame({"year": list(yrs), "country": country})
-            merged = pd.merge(full_df, cdata, on=["country", "year"], how="left")
-            merged["country_code"] = merged["country_code"].ffill().bfill()
-            merged["recycling_rate"] = merged["recycling_rate"].interpolate(method="linear")
-            rec_list.append(merged)
-    
-    df_rec_clean = pd.concat(rec_list, ignore_index=True) if rec_list else pd.DataFrame()
-    
-    df_merged = pd.merge(df_rec_clean, 
-                        df_was[["country", "year", "total_waste_tonnes", "waste_per_capita_kg"]],
-                        on=["country", "year"], how="outer")
-    
-    return df_rec_clean, df_was, df_merged, europe, africa
+def animated_map(data, metric, colorscale, label):
+    """Animated map of the countries in `data` over the selected years"""
+    codes = data.drop_duplicates("country").set_index("country")["country_code"]
+    countries = tuple(sorted(codes.index))
+    return load_animated_map(cube, metric, countries, tuple(codes[list(countries)]), tuple(year_range),
+                             colorscale, label)
+
+def export_buttons(frames, key):
+    """Download buttons for the given frames; a file is only written when its button is clicked"""
+    frames = {name: frame for name, frame in frames.items() if frame is not None and len(frame) > 0}
+    if not frames:
+        return
+    fmt = st.radio("Format", list(FORMATS), horizontal=True, key=f"export_format_{key}")
+    extension, mime = FORMATS[fmt]
+    for name, frame in frames.items():
+        st.download_button(
+            f"⬇️ {name}{extension} ({len(frame):,} rows)",
+            # Deferred: runs on click, off the script thread, and does not rerun the page
+            data=functools.partial(export_file, frame, fmt),
+            file_name=f"{name}_{year_range[0]}-{year_range[1]}{extension}",
+            mime=mime,
+            key=f"export_{key}_{name}",
+            on_click="ignore"
+        )
+
+def add_filled_markers(fig, data, y, metric):
+    """Overlay hollow markers on values that were filled rather than observed"""
+    provenance = cube.lookup_provenance(metric, data["country"], data["year"])
+    mask = (provenance != "Observed") & (provenance != "Missing") & data[y].notna().to_numpy()
+    if mask.any():
+        filled = data[mask]
+        fig.add_trace(go.Scatter(
+            x=filled["year"],
+            y=filled[y],
+            mode="markers",
+            name="Filled (not observed)",
+            marker=dict(symbol="circle-open", size=11, color="#555", line=dict(width=2)),
+            customdata=np.stack([filled["country"], provenance[mask]], axis=-1),
+            hovertemplate="%{customdata[0]} %{x}: %{y:.1f}<br>%{customdata[1]} value<extra></extra>"
+        ))
+    return fig
 
-def forecast_waste(df, country, years_ahead=5, window_size=5):
+def add_anomaly_markers(fig, data, y, metric):
+    """Overlay red crosses on observed values flagged as suspicious jumps"""
+    mask = anomalies.lookup(metric, data["country"], data["year"]) & data[y].notna().to_numpy()
+    if mask.any():
+        flagged = data[mask]
+        fig.add_trace(go.Scatter(
+            x=flagged["year"],
+            y=flagged[y],
+            mode="markers",
+            name="Suspicious jump",
+            marker=dict(symbol="x", size=12, color="#D32F2F", line=dict(width=1)),
+            customdata=flagged["country"],
+            hovertemplate="%{customdata} %{x}: %{y:,.1f}<br>Flagged as anomaly<extra></extra>"
+        ))
+    return fig
+
+def observed_rows(data, metrics):
+    """Keep only rows whose values are real observations for every given metric"""
+    keep = np.ones(len(data), dtype=bool)
+    for metric in metrics:
+        keep &= cube.lookup_flag(OBSERVED, metric, data["country"], data["year"])
+    return data[keep]
+
+def paged_table(frame, key, formats, gradient=None, cmap=None, vmin=None, vmax=None):
     """
-    ARIMA time series forecast using actual waste values to predict future waste.
-    Uses autoregressive patterns in the data rather than just year-based linear regression.
-    
-    Args:
-        df: DataFrame with waste data
-        country: Country name
-        years_ahead: Number of years to forecast
-        window_size: Number of recent years to use for training (default 5)
-    
-    Returns:
-        DataFrame with predictions and 'model_used' column
+    Filter, sort and paginate a table on the server; only the visible page is styled and sent.
+    Gradient colors are computed once over all matching rows so they stay consistent across pages.
     """
-    country_data = df[df["country"] == country].dropna(subset=["waste_per_capita_kg"])
-    country_data = country_data.sort_values("year")
-    
-    if len(country_data) < 3:
-        return None
-    
-    # Use only the most recent window_size years for better trend capture
-    if len(country_data) > window_size:
-        country_data = country_data.tail(window_size)
-    
-    y = country_data["waste_per_capita_kg"].values
-    last_year = int(country_data["year"].max())
-    
-    try:
-        # ARIMA(p,d,q): p=autoregressive order, d=differencing, q=moving average
-        # (1,1,1) is a good default for most time series with trends
-        model = ARIMA(y, order=(1, 1, 1))
-        fitted_model = model.fit()
-        
-        # Forecast future values
-        predictions = fitted_model.forecast(steps=years_ahead)
-        
-        # Ensure predictions are non-negative
-        predictions = np.maximum(predictions, 0)
-        
-        future_years = np.array(range(last_year + 1, last_year + years_ahead + 1))
-        
-        return pd.DataFrame({
-            "year": future_years,
-            "predicted_waste_pc": predictions,
-            "country": country,
-            "model_used": "ARIMA"
-        })
-    except Exception as e:
-        # Fallback to simple linear regression if ARIMA fails
-        X = country_data["year"].values.reshape(-1, 1)
-        model = LinearRegression()
-        model.fit(X, y)
-        
-        future_years = np.array(range(last_year + 1, last_year + years_ahead + 1)).reshape(-1, 1)
-        predictions = model.predict(future_years)
-        predictions = np.maximum(predictions, 0)
-        
-        return pd.DataFrame({
-            "year": future_years.flatten(),
-            "predicted_waste_pc": predictions,
-            "country": country,
-            "model_used": "Linear Regression (fallback)"
-        })
+    col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
+    with col1:
+        query = st.text_input("🔎 Filter countries", key=f"{key}_query")
+    with col2:
+        sort_by = st.selectbox("Sort by", ["(default order)"] + list(frame.columns), key=f"{key}_sort")
+    with col3:
+        descending = st.checkbox("Descending", key=f"{key}_desc")
+    
+    view = query_table(frame, query, sort_by=None if sort_by == "(default order)" else sort_by,
+                       ascending=not descending)
+    _, _, n_pages = page_bounds(len(view), 1)
+    # Keep the page number valid when filtering shrinks the table
+    if st.session_state.get(f"{key}_page", 1) > n_pages:
+        st.session_state[f"{key}_page"] = n_pages
+    with col4:
+        page_no = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1, key=f"{key}_page")
+    start, stop, _ = page_bounds(len(view), page_no)
+    
+    visible = view.iloc[start:stop]
+    styler = visible.style.format(formats, na_rep="–")
+    if gradient is not None:
+        colors = gradient_styles(view[gradient], cmap, vmin, vmax)[start:stop]
+        styler = styler.apply(lambda _: colors, subset=[gradient])
+    st.dataframe(styler, use_container_width=True, hide_index=True)
+    st.caption(f"Rows {start + 1 if stop else 0}-{stop} of {len(view)}"
+               + (f" (filtered from {len(frame)})" if len(view) != len(frame) else ""))
 
-def calculate_risk_score(recycling_rate, waste_pc, growth_rate):
-    """Calculate environmental risk score (0-100) for countries with recycling data"""
-    risk = 0
-    
-    if recycling_rate < 20:
-        risk += 40
-    elif recycling_rate < 30:
-        risk += 25
-    elif recycling_rate < 40:
-        risk += 10
-    
-    if waste_pc > 600:
-        risk += 30
-    elif waste_pc > 500:
-        risk += 20
-    elif waste_pc > 400:
-        risk += 10
-    
-    if growth_rate > 2:
-        risk += 30
-    elif growth_rate > 1:
-        risk += 15
-    elif growth_rate > 0:
-        risk += 5
-    
-    return min(risk, 100)
+def similar_countries_section():
+    """Nearest-neighbour search of lag-shifted waste per capita windows, with an overlay chart"""
+    st.subheader("🔎 Find Similar Countries")
+    st.caption("Which country went through the same waste per capita path earlier (or later)? "
+               "Every past stretch of every country is compared with the query country's latest years.")
+    
+    countries = sorted(cube.countries)
+    default = selected_countries[0] if selected_countries and selected_countries[0] in countries else countries[0]
+    col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
+    with col1:
+        query_country = st.selectbox("Query country", countries, index=countries.index(default), key="similar_query")
+    with col2:
+        scopes = ["Europe", "Africa", "All countries"]
+        scope = st.radio("Search among", scopes, index=0 if query_country in africa_list else 2,
+                         horizontal=True, key="similar_scope")
+    with col3:
+        window = st.slider("Window (years)", min_value=5, max_value=12, value=DEFAULT_WINDOW, key="similar_window")
+    with col4:
+        k = st.slider("Matches", min_value=3, max_value=10, value=5, key="similar_k")
+    shape_only = st.checkbox("Compare shape only (ignore level differences)", key="similar_shape")
+    
+    index = load_window_index(cube, window)
+    candidates = {"Europe": europe_list, "Africa": africa_list}.get(scope)
+    matches, query_end, elapsed_ms = index.search(query_country, k, candidates=candidates, shape_only=shape_only)
+    if query_end is None or len(matches) == 0:
+        st.info(f"No complete {window}-year stretch available for {query_country}")
+        return
+    
+    overlay = index.overlay(query_country, matches, query_end)
+    fig = go.Figure()
+    for i, (country, series) in enumerate(overlay[overlay["part"] != "query"].groupby("country", sort=False)):
+        color = px.colors.qualitative.Plotly[i % len(px.colors.qualitative.Plotly)]
+        for part, dash in (("match", None), ("after", "dot")):
+            segment = series[series["part"] == part]
+            if part == "after" and len(segment) > 0:
+                # Start the dotted continuation at the window's last point
+                segment = pd.concat([series[series["part"] == "match"].tail(1), segment])
+            fig.add_trace(go.Scatter(
+                x=segment["aligned_year"], y=segment["value"], mode="lines+markers",
+                name=country if part == "match" else f"{country} (after)",
+                legendgroup=country, showlegend=part == "match",
+                line=dict(color=color, dash=dash, width=2), marker=dict(size=5),
+                customdata=segment["year"],
+                hovertemplate=f"{country} %{{customdata}}: %{{y:,.0f}} kg<extra></extra>"
+            ))
+    query = overlay[overlay["part"] == "query"]
+    fig.add_trace(go.Scatter(
+        x=query["aligned_year"], y=query["value"], mode="lines+markers", name=f"{query_country} (query)",
+        line=dict(color="black", width=4), marker=dict(size=8),
+        hovertemplate=f"{query_country} %{{x}}: %{{y:,.0f}} kg<extra></extra>"
+    ))
+    fig.add_vrect(x0=query_end - window + 1, x1=query_end, fillcolor="gray", opacity=0.08, line_width=0)
+    fig.update_layout(
+        title=f"{query_country} {query_end - window + 1}-{query_end} vs. closest past stretches",
+        xaxis_title=f"Year on {query_country}'s timeline (matches shifted by their lag)",
+        yaxis_title="kg/cap/yr",
+        height=500,
+        hovermode="closest"
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.dataframe(
+        matches.rename(columns={"lag_years": "lag (years)"}).style.format({"distance": "{:.3f}"}),
+        use_container_width=True,
+        hide_index=True
+    )
+    st.caption(f"⚡ Searched {len(index.vectors)} indexed windows in {elapsed_ms:.1f} ms. "
+               "Dotted lines show what happened to each match after its matched window. "
+               "Distance = RMS difference of log values (≈ relative gap).")
 
-def calculate_risk_score_africa(waste_pc, growth_rate, waste_total_millions):
-    """Calculate environmental risk score (0-100) for African countries without recycling data"""
-    risk = 0
-    
-    # No recycling infrastructure assumed = base risk
-    risk += 35
-    
-    # High waste per capita
-    if waste_pc > 400:
-        risk += 25
-    elif waste_pc > 300:
-        risk += 15
-    elif waste_pc > 200:
-        risk += 5
-    
-    # High growth rate
-    if growth_rate > 3:
-        risk += 30
-    elif growth_rate > 2:
-        risk += 20
-    elif growth_rate > 1:
-        risk += 10
-    elif growth_rate > 0:
-        risk += 5
-    
-    # Large total waste volume (infrastructure pressure)
-    if waste_total_millions > 10:
-        risk += 10
-    elif waste_total_millions > 5:
-        risk += 5
-    
-    return min(risk, 100)
+# No-ops when serve.py already started them with the server
+start_metrics_server()
+warmup = start_warmup()
 
 with st.spinner("Loading data..."):
     df_recycling, df_waste, df_merged, europe_list, africa_list = load_data()
+    cube = load_cube(df_recycling, df_waste, tuple(europe_list), tuple(africa_list))
+    rank_tables = load_rank_tables(cube, tuple(europe_list), tuple(africa_list))
+    sector_cube = load_sector_cube(df_waste, tuple(europe_list), tuple(africa_list))
+    indicators = load_indicators(cube)
+    anomalies = load_anomalies(cube)
 
 st.markdown('<p class="main-title">🌍 Environmental Dashboard - Waste Management</p>', unsafe_allow_html=True)
 st.markdown('<p class="subtitle">Comparative Analysis: Europe & Africa</p>', unsafe_allow_html=True)
@@ -381,42 +274,38 @@ st.info(f"""
 - **Europe** ({len(europe_list)} countries): Recycling + Generation data (1990-2015)
 - **Africa** ({len(africa_list)} countries): Generation data only (2000-2021)
 - **ML Predictions**: Forecasting future waste trends
+- **KNN Imputation**: {int(df_waste["imputed"].sum())} country-years filled from similar countries (flagged in the data)
 """)
 
 st.sidebar.title("🎛️ Filters & Navigation")
 st.sidebar.markdown("---")
 
+def reset_filters():
+    """A new region starts from its default countries and years"""
+    for key in ("selected_countries", "year_range", "applied_filters"):
+        st.session_state.pop(key, None)
+
+
 region = st.sidebar.radio(
     "Analysis Region",
-    ["Europe (with recycling)", "Africa (generation)", "North-South Comparison"]
+    list(DEFAULT_SELECTIONS),
+    on_change=reset_filters
 )
 
-st.sidebar.markdown("### 📍 Countries to Analyze")
+batch_filters = st.sidebar.checkbox(
+    "Apply filters in one batch",
+    value=False,
+    help="Change countries and years freely, then recompute once with 'Apply filters' instead of after every click"
+)
 
 if "Europe" in region:
     available = europe_list
-    default_selection = ["France", "Germany", "Italy", "Spain"]
 elif "Africa" in region:
     available = africa_list
-    default_selection = ["Algeria", "Egypt", "Morocco", "Tunisia"]
 else:
     available = europe_list + africa_list
-    default_selection = ["France", "Germany", "Algeria", "Morocco"]
 
-default_selection = [c for c in default_selection if c in available][:4]
-
-selected_countries = st.sidebar.multiselect(
-    "Select countries (max 10)",
-    options=sorted(available),
-    default=default_selection,
-    max_selections=10
-)
-
-if not selected_countries:
-    st.warning("⚠️ Please select at least one country")
-    st.stop()
-
-st.sidebar.markdown("### 📅 Time Period")
+default_selection = [c for c in DEFAULT_SELECTIONS[region] if c in available][:4]
 
 if "Africa" in region and "Comparison" not in region:
     # Africa only - use waste data years (2000-2021)
@@ -434,11 +323,62 @@ else:
     available_years = sorted(df_waste["year"].dropna().unique())
     default_year_range = (2010, int(max(available_years)))
 
-year_range = st.sidebar.select_slider(
-    "Year range",
-    options=available_years,
-    value=default_year_range
-)
+# The keyed widgets keep their values when they move into or out of the form; the last
+# applied filters seed them should they ever be recreated
+previous = st.session_state.get("applied_filters")
+if previous is not None:
+    default_selection = [c for c in previous[0] if c in available]
+    default_year_range = previous[1]
+
+# In batch mode the widgets live in a form: edits are held client-side and only
+# the "Apply filters" click reruns the script with all of them at once
+filter_box = st.sidebar.form("filters") if batch_filters else st.sidebar
+
+with filter_box:
+    st.markdown("### 📍 Countries to Analyze")
+    
+    selected_countries = st.multiselect(
+        "Select countries (max 10)",
+        options=sorted(available),
+        default=default_selection,
+        max_selections=10,
+        key="selected_countries"
+    )
+    
+    st.markdown("### 📅 Time Period")
+    
+    year_range = st.select_slider(
+        "Year range",
+        options=available_years,
+        value=default_year_range,
+        key="year_range"
+    )
+    
+    applied = st.form_submit_button("✅ Apply filters", use_container_width=True) if batch_filters else False
+
+# Every country added/removed and every moved year bound would have been its own rerun
+st.session_state.setdefault("filter_applies", 0)
+st.session_state.setdefault("reruns_avoided", 0)
+if applied and previous is not None:
+    changes = len(set(previous[0]) ^ set(selected_countries)) + sum(
+        old != new for old, new in zip(previous[1], year_range)
+    )
+    st.session_state["filter_applies"] += 1
+    st.session_state["reruns_avoided"] += max(changes - 1, 0)
+st.session_state["applied_filters"] = (tuple(selected_countries), tuple(year_range))
+
+if batch_filters:
+    st.sidebar.caption(
+        f"🔁 {st.session_state['reruns_avoided']} reruns avoided over "
+        f"{st.session_state['filter_applies']} batched applies this session"
+    )
+
+if not warmup.ready:
+    st.sidebar.caption(f"🔥 Warming up caches in the background ({warmup.done}/{len(warmup.steps)} steps)")
+
+if not selected_countries:
+    st.warning("⚠️ Please select at least one country")
+    st.stop()
 
 st.sidebar.markdown("---")
 
@@ -448,7 +388,9 @@ if "Africa" in region:
         "Waste Production",
         "Geographic Analysis",
         "Rankings",
-        "Predictions & Risks"
+        "Predictions & Risks",
+        "What-If Scenarios",
+        "Data Vintages"
     ])
 else:
     page = st.sidebar.radio("📑 Navigation", [
@@ -457,7 +399,9 @@ else:
         "Advanced Analytics",
         "Geographic Analysis",
         "Rankings",
-        "Predictions & Risks"
+        "Predictions & Risks",
+        "What-If Scenarios",
+        "Data Vintages"
     ])
 
 st.sidebar.markdown("---")
@@ -486,6 +430,11 @@ df_merged_filt = df_merged[
     (df_merged["year"] <= year_range[1])
 ].copy()
 
+with st.sidebar:
+    st.markdown("---")
+    st.markdown("**📥 Export filtered data**")
+    export_buttons({"waste": df_waste_filt, "recycling": df_rec_filt}, "sidebar")
+
 # ============== PAGES ==============
 
 if page == "Overview & KPIs":
@@ -516,7 +465,7 @@ if page == "Overview & KPIs":
             """, unsafe_allow_html=True)
         
         with col2:
-            total_waste = latest["total_waste_tonnes"].sum()
+            total_waste = sector_cube.total(selected_countries, latest_year)
             st.markdown(f"""
             <div style="background: linear-gradient(135deg, #fbc2eb 0%, #a6c1ee 100%); 
                         padding: 20px; border-radius: 10px; text-align: center; color: white;">
@@ -698,16 +647,13 @@ if page == "Overview & KPIs":
             st.subheader("🔄 Waste Generation by Sector (Europe)")
             
             # Check if sector columns exist
-            sector_cols = [col for col in df_waste_filt.columns if col.endswith("_tonnes") and col != "total_waste_tonnes"]
+            sector_cols = [col for col in SECTOR_COLS if col in df_waste.columns]
             
             if len(sector_cols) > 0:
-                # Filter for European countries only
-                eu_waste_data = df_waste_filt[df_waste_filt["country"].isin(selected_countries)]
+                # Yearly sector sums for the selected countries, read from the precomputed prefix sums
+                sector_long = sector_cube.yearly_long(selected_countries, year_range[0], year_range[1], sector_cols)
                 
-                if len(eu_waste_data) > 0:
-                    # Prepare data for stacked area chart
-                    sector_data = eu_waste_data.groupby("year")[sector_cols].sum().reset_index()
-                    
+                if len(sector_long) > 0:
                     # Rename for better legend
                     sector_rename = {
                         "households_tonnes": "Households",
@@ -715,10 +661,6 @@ if page == "Overview & KPIs":
                         "manufacturing_tonnes": "Manufacturing",
                         "services_tonnes": "Services"
                     }
-                    
-                    # Melt for plotting
-                    sector_long = sector_data.melt(id_vars=["year"], value_vars=sector_cols, 
-                                                   var_name="sector", value_name="tonnes")
                     sector_long["sector"] = sector_long["sector"].map(lambda x: sector_rename.get(x, x.replace("_tonnes", "").title()))
                     
                     # Distinct colors for sectors - using color wheel for maximum contrast
@@ -799,7 +741,7 @@ if page == "Overview & KPIs":
                 eu_data = latest[latest["country"].isin(europe_countries)]
                 if len(eu_data) > 0:
                     eu_avg = eu_data["waste_per_capita_kg"].mean()
-                    eu_total = eu_data["total_waste_tonnes"].sum()
+                    eu_total = sector_cube.total(europe_countries, latest_year)
                     st.metric("Average per Capita", f"{eu_avg:.0f} kg/year")
                     st.metric("Total Waste", f"{eu_total/1_000_000:.1f} M tonnes")
                     st.metric("Countries", len(eu_data))
@@ -812,7 +754,7 @@ if page == "Overview & KPIs":
                 af_data = latest[latest["country"].isin(africa_countries)]
                 if len(af_data) > 0:
                     af_avg = af_data["waste_per_capita_kg"].mean()
-                    af_total = af_data["total_waste_tonnes"].sum()
+                    af_total = sector_cube.total(africa_countries, latest_year)
                     st.metric("Average per Capita", f"{af_avg:.0f} kg/year")
                     st.metric("Total Waste", f"{af_total/1_000_000:.1f} M tonnes")
                     st.metric("Countries", len(af_data))
@@ -897,6 +839,52 @@ elif page == "Advanced Analytics" and "Europe" in region:
             </div>
             """, unsafe_allow_html=True)
         
+        st.markdown("---")
+        st.subheader("🧬 Peer Groups")
+        st.caption("All countries grouped by their normalized waste per capita and recycling trajectories")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            method = st.selectbox("Distance", DISTANCE_METHODS,
+                                  help="DTW aligns series that follow the same path at a different pace")
+        with col2:
+            compare_by = st.radio("Compare by", ["Shape", "Level and shape"], horizontal=True,
+                                  help="Shape scales each country's own series; level keeps high and low producers apart")
+        with col3:
+            n_groups = st.slider("Number of peer groups", min_value=2, max_value=8, value=4)
+        
+        start = time.perf_counter()
+        distances = load_trajectory_distances(cube, method, "shape" if compare_by == "Shape" else "level")
+        groups = distances.groups(n_groups)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        
+        order = cube.country_index(groups["country"])
+        ordered = pd.DataFrame(distances.filled()[np.ix_(order, order)],
+                               index=groups["country"], columns=groups["country"])
+        fig = px.imshow(
+            ordered,
+            title=f"{method} Trajectory Distances (grouped by peer group)",
+            labels=dict(color="Distance"),
+            color_continuous_scale="Viridis_r",
+            aspect="auto"
+        )
+        fig.update_layout(height=650)
+        st.plotly_chart(fig, use_container_width=True)
+        
+        selected_groups = groups[groups["country"].isin(selected_countries)]
+        if len(selected_groups) > 0:
+            st.markdown("**Peer groups of the selected countries:** " + ", ".join(
+                f"{row.country} → group {row.group}" for row in selected_groups.itertuples()
+            ))
+        
+        with st.expander(f"👥 Group members ({len(distances.countries)} countries)"):
+            st.dataframe(
+                groups.style.format({"mean_distance": "{:.2f}"}),
+                use_container_width=True,
+                hide_index=True
+            )
+        st.caption(f"⚡ Distance matrix cached per method; grouping took {elapsed_ms:.0f} ms")
+        
         st.markdown("---")
         st.subheader("📈 Trend Analysis")
         
@@ -1017,20 +1005,24 @@ elif page == "Geographic Analysis":
             fig.update_layout(height=700, geo=dict(showframe=False, showcoastlines=True))
             st.plotly_chart(fig, use_container_width=True)
             
+            st.subheader("🎞️ Year by Year")
+            fig = animated_map(df_waste_filt, "waste_per_capita_kg", "Reds", "kg/capita/year")
+            fig.update_layout(title=f"Waste Generation per Capita, {year_range[0]}-{year_range[1]}",
+                              height=700, geo=dict(scope="africa", showframe=False, showcoastlines=True))
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption("▶ Play or drag the slider: all years are in the map already, so it animates without reloading.")
+            
             st.markdown("---")
             st.subheader("📍 Country Details")
             
             display_data = latest_data[["country", "waste_per_capita_kg", "total_waste_tonnes", "population_millions"]]
             display_data = display_data.sort_values("waste_per_capita_kg", ascending=False)
             
-            st.dataframe(
-                display_data.style.format({
-                    "waste_per_capita_kg": "{:.0f} kg",
-                    "total_waste_tonnes": "{:.0f}",
-                    "population_millions": "{:.1f}M"
-                }).background_gradient(subset=["waste_per_capita_kg"], cmap="Reds"),
-                use_container_width=True
-            )
+            paged_table(display_data, "geo_africa", {
+                "waste_per_capita_kg": "{:.0f} kg",
+                "total_waste_tonnes": "{:.0f}",
+                "population_millions": "{:.1f}M"
+            }, gradient="waste_per_capita_kg", cmap="Reds")
         else:
             st.warning("No geographic data available for selected period")
     
@@ -1051,6 +1043,13 @@ elif page == "Geographic Analysis":
             )
             fig.update_layout(height=700, geo=dict(showframe=False, showcoastlines=True))
             st.plotly_chart(fig, use_container_width=True)
+            
+            st.subheader("🎞️ Year by Year")
+            fig = animated_map(df_rec_filt, "recycling_rate", "RdYlGn", "Recycling Rate (%)")
+            fig.update_layout(title=f"Recycling Rate, {year_range[0]}-{year_range[1]}",
+                              height=700, geo=dict(scope="europe", showframe=False, showcoastlines=True))
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption("▶ Play or drag the slider: all years are in the map already, so it animates without reloading.")
     
     else:  # North-South Comparison
         st.markdown("""
@@ -1106,6 +1105,24 @@ elif page == "Geographic Analysis":
             
             st.plotly_chart(fig_combined, use_container_width=True)
             
+            st.subheader("🎞️ Year by Year")
+            fig = animated_map(df_waste_filt[df_waste_filt["waste_per_capita_kg"].notna()], "waste_per_capita_kg",
+                               "RdYlGn_r", "kg/capita/year")
+            fig.update_layout(title=f"Waste Generation per Capita - Europe & Africa, {year_range[0]}-{year_range[1]}",
+                              height=700, margin={"r": 0, "t": 50, "l": 0, "b": 90})
+            fig.update_geos(
+                projection_type="natural earth",
+                showcountries=True,
+                showcoastlines=True,
+                showland=True,
+                landcolor="rgb(243, 243, 243)",
+                coastlinecolor="rgb(204, 204, 204)",
+                lataxis_range=[-40, 75],
+                lonaxis_range=[-25, 55]
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption("▶ Play or drag the slider: all years are in the map already, so it animates without reloading.")
+            
             # Regional statistics below the map
             st.markdown("---")
             
@@ -1118,7 +1135,7 @@ elif page == "Geographic Analysis":
                     if len(eu_data) > 0:
                         st.metric("Countries", len(eu_data))
                         st.metric("Avg. Per Capita", f"{eu_data['waste_per_capita_kg'].mean():.0f} kg/year")
-                        st.metric("Total Waste", f"{eu_data['total_waste_tonnes'].sum()/1_000_000:.1f} M tonnes")
+                        st.metric("Total Waste", f"{sector_cube.total(europe_countries_sel, latest_year)/1_000_000:.1f} M tonnes")
                 else:
                     st.info("No European countries selected")
             
@@ -1129,7 +1146,7 @@ elif page == "Geographic Analysis":
                     if len(af_data) > 0:
                         st.metric("Countries", len(af_data))
                         st.metric("Avg. Per Capita", f"{af_data['waste_per_capita_kg'].mean():.0f} kg/year")
-                        st.metric("Total Waste", f"{af_data['total_waste_tonnes'].sum()/1_000_000:.1f} M tonnes")
+                        st.metric("Total Waste", f"{sector_cube.total(africa_countries_sel, latest_year)/1_000_000:.1f} M tonnes")
                 else:
                     st.info("No African countries selected")
             
@@ -1139,14 +1156,11 @@ elif page == "Geographic Analysis":
             display_data = latest_all[["country", "region", "waste_per_capita_kg", "total_waste_tonnes", "population_millions"]].copy()
             display_data = display_data.sort_values("waste_per_capita_kg", ascending=False)
             
-            st.dataframe(
-                display_data.style.format({
-                    "waste_per_capita_kg": "{:.0f} kg",
-                    "total_waste_tonnes": "{:.0f}",
-                    "population_millions": "{:.1f}M"
-                }).background_gradient(subset=["waste_per_capita_kg"], cmap="YlOrRd"),
-                use_container_width=True
-            )
+            paged_table(display_data, "geo_compare", {
+                "waste_per_capita_kg": "{:.0f} kg",
+                "total_waste_tonnes": "{:.0f}",
+                "population_millions": "{:.1f}M"
+            }, gradient="waste_per_capita_kg", cmap="YlOrRd")
         else:
             st.warning("No geographic data available for selected period")
 
@@ -1166,26 +1180,37 @@ elif page == "Predictions & Risks":
     </div>
     """, unsafe_allow_html=True)
     
-    # Forecasting parameters
-    col1, col2 = st.columns([3, 1])
-    with col1:
-        st.subheader("📈 Waste Production Forecasts")
-    with col2:
-        window_size = st.selectbox(
-            "Training Window (years)",
-            options=[3, 5, 7, 10],
-            index=1,
-            help="Number of recent years to use for prediction model. Smaller = follows recent trends, Larger = smoother predictions"
-        )
-    
-    forecast_data = []
-    for country in selected_countries:
-        pred = forecast_waste(df_waste, country, years_ahead=5, window_size=window_size)
-        if pred is not None:
-            forecast_data.append(pred)
-    
-    if forecast_data:
-        all_forecasts = pd.concat(forecast_data, ignore_index=True)
+    # Each section is a fragment: its widgets only rerun that section, not the whole page
+    @st.fragment
+    def forecast_section():
+        start = time.perf_counter()
+        
+        # Forecasting parameters
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.subheader("📈 Waste Production Forecasts")
+        with col2:
+            window_size = st.selectbox(
+                "Training Window (years)",
+                options=[3, 5, 7, 10],
+                index=1,
+                help="Number of recent years to use for prediction model. Smaller = follows recent trends, Larger = smoother predictions"
+            )
+            exclude_anomalies = st.checkbox(
+                "Exclude flagged anomalies",
+                value=False,
+                help="Leave out observations flagged as suspicious jumps when fitting the forecast models"
+            )
+        
+        excluded = ()
+        if exclude_anomalies:
+            flagged = anomalies.table("waste_per_capita_kg", selected_countries)
+            excluded = tuple((country, int(year)) for country, year in zip(flagged["country"], flagged["year"]))
+        all_forecasts = load_forecasts(df_waste, tuple(selected_countries), years_ahead=5, window_size=window_size,
+                                       excluded=excluded)
+        if all_forecasts is None:
+            st.info("Select countries with sufficient historical data for predictions")
+            return
         
         # Display model usage statistics
         model_counts = all_forecasts.groupby('model_used')['country'].nunique()
@@ -1217,42 +1242,176 @@ elif page == "Predictions & Risks":
         historical = df_waste_filt[df_waste_filt["waste_per_capita_kg"].notna()]
         
         fig = go.Figure()
-        
-        for country in selected_countries:
-            hist = historical[historical["country"] == country]
-            if len(hist) > 0:
-                fig.add_trace(go.Scatter(
-                    x=hist["year"],
-                    y=hist["waste_per_capita_kg"],
-                    mode="lines+markers",
-                    name=f"{country} (Historical)",
-                    line=dict(width=2)
-                ))
+        packed = len(selected_countries) >= PACKED_MIN_SERIES
+        
+        if packed:
+            # Many countries: a few WebGL traces per series kind instead of two SVG traces per country
+            colors = series_colors(selected_countries)
+            fig.add_traces(packed_traces(historical, "year", "waste_per_capita_kg", name="Historical", colors=colors))
+            fig.add_traces(packed_traces(all_forecasts, "year", "predicted_waste_pc", name="Predicted", dash="dash",
+                                         colors=colors, labels=True))
+        else:
+            for country in selected_countries:
+                hist = historical[historical["country"] == country]
+                if len(hist) > 0:
+                    fig.add_trace(go.Scatter(
+                        x=hist["year"],
+                        y=hist["waste_per_capita_kg"],
+                        mode="lines+markers",
+                        name=f"{country} (Historical)",
+                        line=dict(width=2)
+                    ))
             
-            pred = all_forecasts[all_forecasts["country"] == country]
-            if len(pred) > 0:
-                fig.add_trace(go.Scatter(
-                    x=pred["year"],
-                    y=pred["predicted_waste_pc"],
-                    mode="lines+markers",
-                    name=f"{country} (Predicted)",
-                    line=dict(dash="dash", width=2)
-                ))
+                pred = all_forecasts[all_forecasts["country"] == country]
+                if len(pred) > 0:
+                    fig.add_trace(go.Scatter(
+                        x=pred["year"],
+                        y=pred["predicted_waste_pc"],
+                        mode="lines+markers",
+                        name=f"{country} (Predicted)",
+                        line=dict(dash="dash", width=2)
+                    ))
+        add_anomaly_markers(fig, historical, "waste_per_capita_kg", "waste_per_capita_kg")
         
         fig.update_layout(
             title="Waste Production: Historical Data & 5-Year Forecast",
             xaxis_title="Year",
             yaxis_title="Waste per Capita (kg/year)",
             height=600,
-            hovermode="x unified"
+            hovermode="closest" if packed else "x unified"
         )
         st.plotly_chart(fig, use_container_width=True)
         
         st.markdown("---")
+        st.subheader("🏭 Sector Forecasts (Reconciled)")
+        
+        sector_scope = st.radio(
+            "Sector forecast scope",
+            ["Selected countries", "All countries in region"],
+            horizontal=True,
+            help="Sector forecasts are computed for every country in one pass; this only changes what is displayed"
+        )
+        sector_countries = selected_countries if sector_scope == "Selected countries" else sorted(available)
+        
+        # One pooled pass over every country; cached per training window
+        sector_fc = load_sector_forecasts(df_waste, tuple(sorted(europe_list + africa_list)),
+                                          years_ahead=5, window_size=window_size)
+        if excluded and sector_fc is not None:
+            # Split the selected countries' sectors from the ARIMA totals fitted without the anomalies
+            refit = forecast_sectors(df_waste, list(selected_countries), years_ahead=5, window_size=window_size,
+                                     totals=forecast_totals(df_waste, all_forecasts))
+            if refit is not None:
+                sector_fc = pd.concat([sector_fc[~sector_fc["country"].isin(refit["country"])], refit],
+                                      ignore_index=True)
+        
+        if sector_fc is not None:
+            sector_fc = sector_fc[sector_fc["country"].isin(sector_countries) &
+                                  (sector_fc["sector"] != "total_waste_tonnes")]
+            # Countries without any sector breakdown only have a total forecast
+            sector_fc = sector_fc.dropna(subset=["predicted_tonnes"])
+        
+        if sector_fc is not None and len(sector_fc) > 0:
+            sector_rename = {
+                "households_tonnes": "Households",
+                "construction_tonnes": "Construction",
+                "manufacturing_tonnes": "Manufacturing",
+                "services_tonnes": "Services"
+            }
+            sector_colors = {
+                "Households": "#E74C3C",
+                "Construction": "#F39C12",
+                "Manufacturing": "#3498DB",
+                "Services": "#9B59B6"
+            }
+            
+            horizon = sector_fc[sector_fc["year"] == sector_fc.groupby("country")["year"].transform("max")].copy()
+            horizon["sector"] = horizon["sector"].map(sector_rename)
+            
+            fig_sec = px.bar(
+                horizon,
+                x="predicted_tonnes",
+                y="country",
+                color="sector",
+                orientation="h",
+                title="Reconciled Sector Split of the 5-Year Forecast (final forecast year)",
+                labels={"predicted_tonnes": "Predicted Waste (Tonnes)", "country": "Country", "sector": "Sector"},
+                color_discrete_map=sector_colors
+            )
+            fig_sec.update_layout(height=max(400, horizon["country"].nunique() * 30), barmode="stack")
+            st.plotly_chart(fig_sec, use_container_width=True)
+            
+            st.markdown("""
+            <div class="success-box">
+                <h4>💡 How Sector Forecasts Are Reconciled</h4>
+                <p>Each sector gets its own trend forecast, then sectors are rescaled so they add up exactly 
+                to the ARIMA total waste forecast above (per capita × population). Countries without any sector 
+                breakdown are not shown.</p>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            with st.expander("📋 Sector forecast details"):
+                detail = sector_fc.pivot_table(index=["country", "year"], columns="sector",
+                                               values="predicted_tonnes").rename(columns=sector_rename)
+                st.dataframe(detail.style.format("{:,.0f}"), use_container_width=True)
+        else:
+            st.info("Sector breakdown data not available for the selected countries.")
+        
+        with st.expander("📥 Export forecasts"):
+            export_buttons({"forecasts": all_forecasts, "sector_forecasts": sector_fc}, "forecast")
+        
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        st.caption(f"⚡ Forecast section rerun in {elapsed_ms:.0f} ms (rest of the page untouched)")
+    
+    @st.fragment
+    def risk_section():
+        start = time.perf_counter()
+        
         st.subheader("⚠️ Environmental Risk Assessment")
         
+        observed_only = st.checkbox(
+            "Use observed values only",
+            value=False,
+            help="Exclude interpolated, extrapolated and KNN-imputed values from risk scoring"
+        )
+        
+        with st.expander("⚙️ Risk rules"):
+            st.caption("Edit thresholds and points. Within a factor the first matching row scores "
+                       "(like an if/elif chain); scores are capped at 100.")
+            rule_columns = {
+                "threshold": st.column_config.NumberColumn("threshold", required=True),
+                "points": st.column_config.NumberColumn("points", required=True),
+            }
+            # The edited tables outlive the editors, which reset whenever the Risk page is left;
+            # reopened editors start from the last edited tables
+            rules = st.session_state.setdefault("risk_rules", {"europe": EUROPE_RULES, "africa": AFRICA_RULES})
+            if "europe_rules" not in st.session_state:
+                st.session_state["risk_rule_base"] = dict(rules)
+            base_rules = st.session_state["risk_rule_base"]
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("**Europe (with recycling data)**")
+                europe_rules = st.data_editor(base_rules["europe"], key="europe_rules", disabled=["factor", "op"],
+                                              column_config=rule_columns, hide_index=True,
+                                              use_container_width=True)
+            with col2:
+                st.markdown("**Africa (without recycling data)**")
+                africa_rules = st.data_editor(base_rules["africa"], key="africa_rules", disabled=["factor", "op"],
+                                              column_config=rule_columns, hide_index=True,
+                                              use_container_width=True)
+            # A cleared cell comes back as NaN; those rows are left out instead of scoring as garbage
+            incomplete = sum(rules[["threshold", "points"]].isna().any(axis=1).sum()
+                             for rules in (europe_rules, africa_rules))
+            if incomplete:
+                st.error(f"{incomplete} rule(s) without a threshold or points value are ignored.")
+                europe_rules = europe_rules.dropna(subset=["threshold", "points"])
+                africa_rules = africa_rules.dropna(subset=["threshold", "points"])
+            st.session_state["risk_rules"] = {"europe": europe_rules, "africa": africa_rules}
+            st.caption("These rules also score the What-If Scenarios page.")
+        
         if "Europe" in region:
             valid_data = df_merged_filt.dropna(subset=["recycling_rate", "waste_per_capita_kg"])
+            if observed_only:
+                valid_data = observed_rows(valid_data, ["recycling_rate", "waste_per_capita_kg"])
             if len(valid_data) > 0:
                 risk_data = []
                 for country in selected_countries:
@@ -1270,7 +1429,7 @@ elif page == "Predictions & Risks":
                         else:
                             growth_rate = 0
                         
-                        risk_score = calculate_risk_score(latest_rec, latest_waste, growth_rate)
+                        risk_score = calculate_risk_score(latest_rec, latest_waste, growth_rate, europe_rules)
                         
                         risk_data.append({
                             "country": country,
@@ -1299,6 +1458,9 @@ elif page == "Predictions & Risks":
                     fig.update_layout(height=max(400, len(risk_df) * 40))
                     st.plotly_chart(fig, use_container_width=True)
                     
+                    with st.expander("📥 Export risk scores"):
+                        export_buttons({"risk_scores": risk_df}, "risk")
+                    
                     st.markdown("#### 📋 Detailed Risk Analysis")
                     
                     for _, row in risk_df.iterrows():
@@ -1317,6 +1479,8 @@ elif page == "Predictions & Risks":
             # Risk assessment for African countries (without recycling data)
             valid_data = df_waste_filt[df_waste_filt["waste_per_capita_kg"].notna() & 
                                        (df_waste_filt["waste_per_capita_kg"] > 0)]
+            if observed_only:
+                valid_data = observed_rows(valid_data, ["waste_per_capita_kg"])
             
             if len(valid_data) > 0:
                 risk_data = []
@@ -1335,7 +1499,7 @@ elif page == "Predictions & Risks":
                         else:
                             growth_rate = 0
                         
-                        risk_score = calculate_risk_score_africa(latest_waste, growth_rate, latest_total)
+                        risk_score = calculate_risk_score_africa(latest_waste, growth_rate, latest_total, africa_rules)
                         
                         risk_data.append({
                             "country": country,
@@ -1372,6 +1536,9 @@ elif page == "Predictions & Risks":
                     fig.update_layout(height=max(400, len(risk_df) * 40))
                     st.plotly_chart(fig, use_container_width=True)
                     
+                    with st.expander("📥 Export risk scores"):
+                        export_buttons({"risk_scores": risk_df}, "risk")
+                    
                     st.markdown("#### 📋 Detailed Risk Analysis")
                     
                     for _, row in risk_df.iterrows():
@@ -1408,6 +1575,8 @@ elif page == "Predictions & Risks":
             if europe_countries:
                 valid_eu = df_merged_filt[df_merged_filt["country"].isin(europe_countries)]
                 valid_eu = valid_eu.dropna(subset=["recycling_rate", "waste_per_capita_kg"])
+                if observed_only:
+                    valid_eu = observed_rows(valid_eu, ["recycling_rate", "waste_per_capita_kg"])
                 
                 for country in europe_countries:
                     country_data = valid_eu[valid_eu["country"] == country].sort_values("year")
@@ -1424,7 +1593,7 @@ elif page == "Predictions & Risks":
                         else:
                             growth_rate = 0
                         
-                        risk_score = calculate_risk_score(latest_rec, latest_waste, growth_rate)
+                        risk_score = calculate_risk_score(latest_rec, latest_waste, growth_rate, europe_rules)
                         
                         all_risks.append({
                             "country": country,
@@ -1437,6 +1606,8 @@ elif page == "Predictions & Risks":
                 valid_af = df_waste_filt[df_waste_filt["country"].isin(africa_countries)]
                 valid_af = valid_af[valid_af["waste_per_capita_kg"].notna() & 
                                    (valid_af["waste_per_capita_kg"] > 0)]
+                if observed_only:
+                    valid_af = observed_rows(valid_af, ["waste_per_capita_kg"])
                 
                 for country in africa_countries:
                     country_data = valid_af[valid_af["country"] == country].sort_values("year")
@@ -1453,7 +1624,7 @@ elif page == "Predictions & Risks":
                         else:
                             growth_rate = 0
                         
-                        risk_score = calculate_risk_score_africa(latest_waste, growth_rate, latest_total)
+                        risk_score = calculate_risk_score_africa(latest_waste, growth_rate, latest_total, africa_rules)
                         
                         all_risks.append({
                             "country": country,
@@ -1480,6 +1651,9 @@ elif page == "Predictions & Risks":
                 fig.update_layout(height=max(400, len(risk_df) * 40))
                 st.plotly_chart(fig, use_container_width=True)
                 
+                with st.expander("📥 Export risk scores"):
+                    export_buttons({"risk_scores": risk_df}, "risk")
+                
                 col1, col2 = st.columns(2)
                 
                 with col1:
@@ -1503,14 +1677,267 @@ elif page == "Predictions & Risks":
                         st.info("No African countries selected")
             else:
                 st.warning("Insufficient data for comparative risk assessment.")
+        
+        with st.expander("🎲 Sensitivity analysis of the risk rules"):
+            st.caption("Every country of the region is rescored under thousands of random variants of the "
+                       "rules above: thresholds shifted and points rescaled within the chosen bounds.")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                n_variants = st.slider("Rule variants", min_value=500, max_value=5000, value=2000, step=500)
+            with col2:
+                threshold_jitter = st.slider("Threshold shift (± % of spread)", min_value=0, max_value=50, value=15)
+            with col3:
+                weight_jitter = st.slider("Points change (± %)", min_value=0, max_value=50, value=25)
+            
+            sweep_start = time.perf_counter()
+            baseline = load_scenario_baseline(cube, tuple(europe_list), tuple(africa_list), tuple(year_range))
+            baseline = baseline[baseline["country"].isin(available)].reset_index(drop=True)
+            if len(baseline) == 0:
+                st.info("No country of this region has enough data in the selected period")
+            else:
+                stability = rule_sensitivity(baseline, europe_rules, africa_rules, n_variants,
+                                             threshold_jitter / 100, weight_jitter / 100)
+                sweep_ms = (time.perf_counter() - sweep_start) * 1000
+                
+                fig = go.Figure(go.Scatter(
+                    x=stability["rank_median"],
+                    y=stability["country"],
+                    mode="markers",
+                    marker=dict(
+                        size=10,
+                        color=stability["level_stability"],
+                        colorscale="RdYlGn",
+                        cmin=0.5,
+                        cmax=1,
+                        colorbar=dict(title="Level<br>stability")
+                    ),
+                    error_x=dict(
+                        type="data",
+                        symmetric=False,
+                        array=stability["rank_p95"] - stability["rank_median"],
+                        arrayminus=stability["rank_median"] - stability["rank_p5"],
+                        color="gray"
+                    ),
+                    customdata=stability[["rank", "risk_level", "level_stability"]],
+                    hovertemplate="%{y}: median rank %{x:.0f} (rule table rank %{customdata[0]}), "
+                                  "%{customdata[1]} in %{customdata[2]:.0%} of variants<extra></extra>"
+                ))
+                fig.update_layout(
+                    title="Risk Rank under Rule Variants (median, 5th-95th percentile)",
+                    xaxis_title="Risk rank (1 = highest risk)",
+                    yaxis=dict(autorange="reversed"),
+                    height=max(400, len(stability) * 22)
+                )
+                st.plotly_chart(fig, use_container_width=True)
+                
+                st.dataframe(
+                    stability.style.format({
+                        "level_stability": "{:.0%}",
+                        "p_high": "{:.0%}",
+                        "rank_p5": "{:.0f}",
+                        "rank_median": "{:.0f}",
+                        "rank_p95": "{:.0f}"
+                    }),
+                    use_container_width=True,
+                    hide_index=True
+                )
+                st.caption(f"⚡ {n_variants:,} rule variants x {len(stability)} countries scored in {sweep_ms:.0f} ms. "
+                           "Level stability = share of variants keeping the country's risk level.")
+        
+        with st.expander("🎯 Data uncertainty (Monte Carlo)"):
+            st.caption("The risk inputs are estimates: populations are a single static figure per country, "
+                       "and part of the waste and recycling values were filled rather than reported. "
+                       "Every draw perturbs all inputs with random errors of the size below and rescores every "
+                       "country, so ranks become distributions. Sizes are one standard deviation (1σ): about two "
+                       "draws in three stay within them, 95% within twice them.")
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                n_draws = st.slider("Draws", min_value=500, max_value=10000, value=2000, step=500)
+            with col2:
+                population_error = st.slider("Population error (1σ %)", min_value=0, max_value=20, value=5)
+            with col3:
+                waste_error = st.slider("Waste error (1σ %, observed / filled)", min_value=0, max_value=30, value=(5, 15))
+            with col4:
+                recycling_error = st.slider("Recycling error (1σ pp, observed / filled)", min_value=0, max_value=15,
+                                            value=(2, 5))
+            
+            draws_start = time.perf_counter()
+            baseline = load_scenario_baseline(cube, tuple(europe_list), tuple(africa_list), tuple(year_range), True)
+            baseline = baseline[baseline["country"].isin(available)].reset_index(drop=True)
+            if len(baseline) == 0:
+                st.info("No country of this region has enough data in the selected period")
+            else:
+                uncertainty, rank_share = monte_carlo_ranks(
+                    baseline, n_draws, population_error, waste_error[0], waste_error[1],
+                    recycling_error[0], recycling_error[1], europe_rules, africa_rules
+                )
+                draws_ms = (time.perf_counter() - draws_start) * 1000
+                
+                order = np.lexsort((uncertainty["rank"], uncertainty["rank_median"]))
+                uncertainty = uncertainty.iloc[order].reset_index(drop=True)
+                fig = go.Figure(go.Heatmap(
+                    z=rank_share[order],
+                    x=np.arange(1, len(order) + 1),
+                    y=uncertainty["country"],
+                    colorscale="Reds",
+                    zmin=0,
+                    zmax=1,
+                    colorbar=dict(title="Share of<br>draws", tickformat=".0%"),
+                    hovertemplate="%{y} at rank %{x}: %{z:.1%} of draws<extra></extra>"
+                ))
+                fig.add_trace(go.Scatter(
+                    x=uncertainty["rank"],
+                    y=uncertainty["country"],
+                    mode="markers",
+                    marker=dict(symbol="x", size=8, color="black"),
+                    name="Rank on reported data",
+                    hovertemplate="%{y}: rank %{x} on reported data<extra></extra>"
+                ))
+                fig.update_layout(
+                    title="Distribution of Risk Ranks under Data Uncertainty",
+                    xaxis_title="Risk rank (1 = highest risk)",
+                    yaxis=dict(autorange="reversed"),
+                    legend=dict(orientation="h", y=-0.1),
+                    height=max(400, len(uncertainty) * 22)
+                )
+                st.plotly_chart(fig, use_container_width=True)
+                
+                st.dataframe(
+                    uncertainty.style.format({
+                        "score_p5": "{:.0f}",
+                        "score_p95": "{:.0f}",
+                        "p_high": "{:.0%}",
+                        "rank_p5": "{:.0f}",
+                        "rank_median": "{:.0f}",
+                        "rank_p95": "{:.0f}"
+                    }),
+                    use_container_width=True,
+                    hide_index=True
+                )
+                filled = baseline[["waste_first_filled", "waste_last_filled", "recycling_filled"]].any(axis=1).sum()
+                st.caption(f"⚡ {n_draws:,} draws x {len(uncertainty)} countries scored in {draws_ms:.0f} ms. "
+                           f"{filled} of {len(baseline)} countries rely on filled values, which get the wider error.")
+        
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        st.caption(f"⚡ Risk section rerun in {elapsed_ms:.0f} ms (rest of the page untouched)")
+    
+    forecast_section()
+    st.markdown("---")
+    risk_section()
+
+elif page == "What-If Scenarios":
+    st.header("🧪 What-If Scenarios")
+    
+    st.markdown("""
+    <div class="insight-box">
+        <h4>🧪 Simulate Policy Changes</h4>
+        <p>Adjust recycling, waste production and growth for a country or a whole region. 
+        Risk scores and rankings of <strong>all countries</strong> are recomputed instantly.</p>
+        <ul>
+            <li><strong>Recycling rate:</strong> setting it for an African country switches it to the recycling-aware (European) risk model</li>
+            <li><strong>Waste per capita:</strong> relative change applied to per-capita and total waste</li>
+            <li><strong>Growth rate:</strong> replaces the observed compound annual growth of waste per capita</li>
+        </ul>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    baseline = load_scenario_baseline(cube, tuple(europe_list), tuple(africa_list), tuple(year_range))
+    
+    if len(baseline) == 0:
+        st.warning("Insufficient data for scenarios. Need at least 2 years of data per country.")
+        st.stop()
+    
+    rules = st.session_state.get("risk_rules", {"europe": EUROPE_RULES, "africa": AFRICA_RULES})
+    if not (rules["europe"].equals(EUROPE_RULES) and rules["africa"].equals(AFRICA_RULES)):
+        st.caption("⚙️ Scored with the risk rules edited on the Predictions & Risks page.")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        target = st.selectbox(
+            "Apply scenario to",
+            ["All countries", "Europe", "Africa"] + sorted(baseline["country"]),
+            index=3 + sorted(baseline["country"]).index("Algeria") if "Algeria" in set(baseline["country"]) else 0
+        )
+        waste_change = st.slider("Change in waste per capita (%)", -50, 50, 0, step=5)
+    with col2:
+        set_recycling = st.checkbox("Set recycling rate", value=True)
+        scenario_recycling = st.slider("Recycling rate (%)", 0, 80, 30, disabled=not set_recycling)
+    with col3:
+        set_growth = st.checkbox("Set growth rate", value=True)
+        scenario_growth = st.slider("Annual waste growth (%/year)", -5.0, 5.0, 1.0, step=0.5, disabled=not set_growth)
+    
+    if target == "All countries":
+        target_mask = np.ones(len(baseline), dtype=bool)
+    elif target in ("Europe", "Africa"):
+        target_mask = (baseline["region"] == target).to_numpy()
     else:
-        st.info("Select countries with sufficient historical data for predictions")
+        target_mask = (baseline["country"] == target).to_numpy()
+    
+    start = time.perf_counter()
+    result = apply_scenario(
+        baseline,
+        target_mask,
+        recycling_rate=scenario_recycling if set_recycling else None,
+        waste_change_pct=waste_change,
+        growth_rate=scenario_growth if set_growth else None,
+        europe_rules=rules["europe"],
+        africa_rules=rules["africa"]
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    st.caption(f"⚡ Risk scores and rankings of {len(result)} countries recomputed in {elapsed_ms:.1f} ms")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Average Risk Score", f"{result['scenario_score'].mean():.1f}/100",
+                  f"{result['scenario_score'].mean() - result['baseline_score'].mean():+.1f}", delta_color="inverse")
+    with col2:
+        high_now = int((result["scenario_level"] == "High").sum())
+        high_before = int((result["baseline_level"] == "High").sum())
+        st.metric("High-Risk Countries", high_now, f"{high_now - high_before:+d}", delta_color="inverse")
+    with col3:
+        st.metric("Countries Affected", int(target_mask.sum()))
+    
+    # Show the targeted countries plus the sidebar selection
+    shown = result[result["in_scenario"] | result["country"].isin(selected_countries)]
+    shown = shown.sort_values("scenario_score", ascending=False).head(25)
+    shown_long = shown.melt(id_vars=["country"], value_vars=["baseline_score", "scenario_score"],
+                            var_name="case", value_name="risk_score")
+    shown_long["case"] = shown_long["case"].map({"baseline_score": "Baseline", "scenario_score": "Scenario"})
+    
+    fig = px.bar(
+        shown_long,
+        x="risk_score",
+        y="country",
+        color="case",
+        barmode="group",
+        orientation="h",
+        title="Risk Score: Baseline vs Scenario",
+        labels={"risk_score": "Risk Score (0-100)", "country": "Country", "case": ""},
+        color_discrete_map={"Baseline": "#9E9E9E", "Scenario": "#F44336"}
+    )
+    fig.update_layout(height=max(400, len(shown) * 40), yaxis={"categoryorder": "total ascending"})
+    st.plotly_chart(fig, use_container_width=True)
+    
+    st.markdown("#### 📋 Scenario Ranking (1 = highest risk)")
+    table = result.sort_values(["scenario_rank", "country"])[[
+        "scenario_rank", "country", "region", "scenario_score", "baseline_score",
+        "score_change", "baseline_rank", "scenario_level"
+    ]]
+    st.dataframe(
+        table.style.format({
+            "scenario_score": "{:.0f}",
+            "baseline_score": "{:.0f}",
+            "score_change": "{:+.0f}"
+        }).background_gradient(subset=["scenario_score"], cmap="RdYlGn_r", vmin=0, vmax=100),
+        use_container_width=True,
+        hide_index=True
+    )
 
 elif page == "Temporal Trends":
     st.header("📈 Temporal Evolution")
     
     if len(df_rec_filt) > 0:
-        fig = px.line(
+        fig = line_chart(
             df_rec_filt,
             x="year",
             y="recycling_rate",
@@ -1520,6 +1947,8 @@ elif page == "Temporal Trends":
             markers=True
         )
         fig.add_hline(y=30, line_dash="dash", line_color="red", annotation_text="30% Target")
+        add_filled_markers(fig, df_rec_filt, "recycling_rate", "recycling_rate")
+        add_anomaly_markers(fig, df_rec_filt, "recycling_rate", "recycling_rate")
         fig.update_layout(height=500)
         st.plotly_chart(fig, use_container_width=True)
     
@@ -1530,7 +1959,7 @@ elif page == "Temporal Trends":
                                        (df_waste_filt["waste_per_capita_kg"] > 0)].copy()
         
         if len(df_waste_valid) > 0:
-            fig2 = px.line(
+            fig2 = line_chart(
                 df_waste_valid,
                 x="year",
                 y="waste_per_capita_kg",
@@ -1539,62 +1968,140 @@ elif page == "Temporal Trends":
                 labels={"year": "Year", "waste_per_capita_kg": "kg/cap/yr", "country": "Country"},
                 markers=True
             )
+            add_filled_markers(fig2, df_waste_valid, "waste_per_capita_kg", "waste_per_capita_kg")
+            add_anomaly_markers(fig2, df_waste_valid, "waste_per_capita_kg", "waste_per_capita_kg")
             fig2.update_layout(height=500)
             st.plotly_chart(fig2, use_container_width=True)
+            st.caption("○ Hollow markers = values filled by interpolation, extrapolation or KNN imputation (not observed); "
+                       "✕ red crosses = suspicious jumps (robust z-score above "
+                       f"{anomalies.threshold} on the change from the previous observation)")
+    
+    flagged = {
+        "Waste per Capita": anomalies.table("waste_per_capita_kg", selected_countries),
+        "Recycling Rate": anomalies.table("recycling_rate", selected_countries),
+    }
+    flagged = {label: table for label, table in flagged.items() if len(table) > 0}
+    if flagged:
+        with st.expander(f"🚩 Flagged anomalies ({sum(len(t) for t in flagged.values())})"):
+            for label, table in flagged.items():
+                st.markdown(f"**{label}**")
+                st.dataframe(
+                    table.style.format({
+                        "value": "{:,.1f}",
+                        "previous_value": "{:,.1f}",
+                        "robust_z": "{:+.1f}"
+                    }),
+                    use_container_width=True,
+                    hide_index=True
+                )
+    
+    st.markdown("---")
+    st.subheader("📐 Rolling Indicators")
+    
+    metric_options = {
+        "Waste per Capita": "waste_per_capita_kg",
+        "Total Waste": "total_waste_tonnes",
+        "Recycling Rate": "recycling_rate"
+    }
+    col1, col2 = st.columns(2)
+    with col1:
+        metric_label = st.selectbox("Metric", list(metric_options))
+    with col2:
+        indicator_label = st.selectbox("Indicator", list(INDICATOR_LABELS.values()), index=2)
+    indicator = {v: k for k, v in INDICATOR_LABELS.items()}[indicator_label]
+    
+    # Indicators are precomputed for every country at load time; this is a slice
+    ind_data = indicators.long(metric_options[metric_label], selected_countries, year_range)
+    ind_data = ind_data.dropna(subset=[indicator])
+    
+    if len(ind_data) > 0:
+        fig3 = line_chart(
+            ind_data,
+            x="year",
+            y=indicator,
+            color="country",
+            title=f"{metric_label}: {indicator_label}",
+            labels={"year": "Year", indicator: indicator_label, "country": "Country"},
+            markers=True
+        )
+        if indicator in ("yoy_change", "yoy_change_pct", "cagr_pct", "acceleration"):
+            fig3.add_hline(y=0, line_dash="dot", line_color="gray")
+        fig3.update_layout(height=450)
+        st.plotly_chart(fig3, use_container_width=True)
+    else:
+        st.info("Not enough history for this indicator in the selected period")
+    
+    st.markdown("---")
+    similar_countries_section()
 
 elif page == "Rankings":
     st.header("🏆 Rankings")
     
+    all_countries = st.checkbox(
+        "Show all countries in the region",
+        value=False,
+        help="Rank tables list every country of the region instead of only the selected ones"
+    )
+    rank_scope = europe_list + africa_list if all_countries else selected_countries
+    
     if "Africa" in region and "Comparison" not in region:
-        latest_yr = df_waste_filt["year"].max()
-        latest_data = df_waste_filt[df_waste_filt["year"] == latest_yr]
-        ranking = latest_data[["country", "waste_per_capita_kg", "total_waste_tonnes"]].dropna()
-        ranking = ranking.sort_values("waste_per_capita_kg")
+        latest_yr = rank_tables.latest_year("waste_per_capita_kg", "Africa", year_range)
+        if latest_yr is None:
+            st.warning("No ranking data for the selected period")
+            st.stop()
+        
+        # Ranks are materialized over all African countries; show the selected ones
+        ranking = rank_tables.ranking("waste_per_capita_kg", "Africa", latest_yr)
+        ranking = ranking[ranking["country"].isin(rank_scope)].copy()
+        ranking["rank_change"] = ranking["country"].map(
+            rank_tables.rank_change("waste_per_capita_kg", "Africa", year_range[0], latest_yr)
+        )
+        ranking = ranking[["rank", "country", "waste_per_capita_kg", "total_waste_tonnes", "rank_change"]]
         
         st.subheader(f"Production Ranking ({int(latest_yr)})")
+        st.caption(f"Rank among all {len(africa_list)} African countries (1 = lowest waste per capita); "
+                   f"change since {year_range[0]} (positive = improved)")
         
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            st.dataframe(
-                ranking.style.format({
-                    "waste_per_capita_kg": "{:.0f} kg",
-                    "total_waste_tonnes": "{:.0f}"
-                }),
-                use_container_width=True
-            )
+            paged_table(ranking, "rank_africa", {
+                "waste_per_capita_kg": "{:.0f} kg",
+                "total_waste_tonnes": "{:.0f}",
+                "rank_change": "{:+.0f}"
+            })
         
         with col2:
             st.markdown("### 🌿 Top 3 Lowest Producers")
             for i in range(min(3, len(ranking))):
                 row = ranking.iloc[i]
                 st.success(f"{i+1}. **{row['country']}** - {row['waste_per_capita_kg']:.0f} kg/yr")
+        
+        rank_metric, rank_region, rank_year = "waste_per_capita_kg", "Africa", latest_yr
     
     elif "Europe" in region and "Comparison" not in region:  # Europe only
-        # Use recycling data directly (already interpolated) and merge with waste data (also interpolated)
-        valid_rec = df_rec_filt.dropna(subset=["recycling_rate"])
-        valid_waste = df_waste_filt.dropna(subset=["waste_per_capita_kg"])
-        valid = pd.merge(valid_rec, valid_waste[["country", "year", "waste_per_capita_kg"]], 
-                        on=["country", "year"], how="inner")
+        best_yr = rank_tables.best_year(["recycling_rate", "waste_per_capita_kg"], "Europe", year_range)
         
-        if len(valid) > 0:
-            best_yr = valid.groupby("year")["country"].count().idxmax()
-            ranking = valid[valid["year"] == best_yr]
-            ranking = ranking[["country", "recycling_rate", "waste_per_capita_kg"]].copy()
-            ranking = ranking.sort_values("recycling_rate", ascending=False)
+        if best_yr is not None:
+            ranking = rank_tables.ranking("recycling_rate", "Europe", best_yr)
+            ranking = ranking[ranking["country"].isin(rank_scope)].copy()
+            ranking["rank_change"] = ranking["country"].map(
+                rank_tables.rank_change("recycling_rate", "Europe", year_range[0], best_yr)
+            )
+            ranking = ranking[["rank", "country", "recycling_rate", "waste_per_capita_kg", "rank_change"]]
             
             st.subheader(f"Recycling Ranking ({int(best_yr)})")
+            st.caption(f"Rank among all {len(europe_list)} European countries (1 = highest recycling rate); "
+                       f"change since {year_range[0]} (positive = improved)")
             
             col1, col2 = st.columns([2, 1])
             
             with col1:
-                st.dataframe(
-                    ranking.style.format({
-                        "recycling_rate": "{:.1f}%",
-                        "waste_per_capita_kg": "{:.0f} kg"
-                    }).background_gradient(subset=["recycling_rate"], cmap="RdYlGn"),
-                    use_container_width=True
-                )
+                paged_table(ranking, "rank_europe", {
+                    "recycling_rate": "{:.1f}%",
+                    "waste_per_capita_kg": "{:.0f} kg",
+                    "rank_change": "{:+.0f}"
+                }, gradient="recycling_rate", cmap="RdYlGn")
             
             with col2:
                 st.markdown("### 🏅 Podium")
@@ -1602,6 +2109,8 @@ elif page == "Rankings":
                 for i in range(min(3, len(ranking))):
                     row = ranking.iloc[i]
                     st.success(f"{medals[i]} **{row['country']}** - {row['recycling_rate']:.1f}%")
+        
+        rank_metric, rank_region, rank_year = "recycling_rate", "Europe", best_yr
     
     else:  # North-South Comparison
         st.markdown("""
@@ -1612,38 +2121,31 @@ elif page == "Rankings":
         </div>
         """, unsafe_allow_html=True)
         
-        latest_yr = df_waste_filt["year"].max()
-        latest_all = df_waste_filt[df_waste_filt["year"] == latest_yr].copy()
-        latest_all = latest_all[latest_all["waste_per_capita_kg"].notna()]
+        latest_yr = rank_tables.latest_year("waste_per_capita_kg", "Combined", year_range)
         
-        if len(latest_all) > 0:
-            # Add region column
-            latest_all["region"] = latest_all["country"].apply(
-                lambda x: "Europe" if x in europe_list else "Africa"
-            )
+        if latest_yr is not None:
+            ranking_all = rank_tables.ranking("waste_per_capita_kg", "Combined", latest_yr)
+            ranking_all = ranking_all[ranking_all["country"].isin(rank_scope)].copy()
             
-            # Merge with recycling data for Europe (if available for this year)
-            rec_latest = df_rec_filt[df_rec_filt["year"] == df_rec_filt["year"].max()]
-            if len(rec_latest) > 0:
-                latest_all = latest_all.merge(
-                    rec_latest[["country", "recycling_rate"]],
-                    on="country",
-                    how="left"
-                )
+            # Recycling rate from the latest recycling year in range (recycling data stops earlier)
+            rec_yr = rank_tables.latest_year("recycling_rate", "Europe", year_range)
+            if rec_yr is not None:
+                rec_latest = rank_tables.ranking("recycling_rate", "Europe", rec_yr).set_index("country")
+                ranking_all["recycling_rate"] = ranking_all["country"].map(rec_latest["recycling_rate"])
+            else:
+                ranking_all["recycling_rate"] = np.nan
             
             # Overall ranking by waste production
             st.subheader(f"🌍 Combined Ranking by Waste Production ({int(latest_yr)})")
-            ranking_all = latest_all[["country", "region", "waste_per_capita_kg", "recycling_rate", "total_waste_tonnes"]].copy()
+            st.caption("Rank among all European and African countries (1 = lowest waste per capita)")
+            ranking_all = ranking_all[["rank", "country", "region", "waste_per_capita_kg", "recycling_rate", "total_waste_tonnes"]]
             ranking_all = ranking_all.sort_values("waste_per_capita_kg", ascending=False)
             
-            st.dataframe(
-                ranking_all.style.format({
-                    "waste_per_capita_kg": "{:.0f} kg",
-                    "recycling_rate": "{:.1f}%",
-                    "total_waste_tonnes": "{:.0f}"
-                }).background_gradient(subset=["waste_per_capita_kg"], cmap="YlOrRd"),
-                use_container_width=True
-            )
+            paged_table(ranking_all, "rank_combined", {
+                "waste_per_capita_kg": "{:.0f} kg",
+                "recycling_rate": "{:.1f}%",
+                "total_waste_tonnes": "{:.0f}"
+            }, gradient="waste_per_capita_kg", cmap="YlOrRd")
             
             st.markdown("---")
             
@@ -1682,6 +2184,46 @@ elif page == "Rankings":
                     af_high = af_data.sort_values("waste_per_capita_kg", ascending=False).head(3)
                     for i, (_, row) in enumerate(af_high.iterrows()):
                         st.warning(f"{i+1}. **{row['country']}** - {row['waste_per_capita_kg']:.0f} kg/yr")
+        
+        rank_metric, rank_region, rank_year = "waste_per_capita_kg", "Combined", latest_yr
+    
+    if rank_year is not None:
+        st.markdown("---")
+        st.subheader(f"⚡ Momentum - All Countries ({int(rank_year)})")
+        st.caption(f"Precomputed indicators of {rank_metric.replace('_', ' ')} for every country in the region; "
+                   f"CAGR over the last {indicators.cagr_window} years, {indicators.ma_window}-year moving average")
+        
+        region_countries = {"Europe": europe_list, "Africa": africa_list, "Combined": europe_list + africa_list}[rank_region]
+        momentum = indicators.snapshot(rank_metric, rank_year, region_countries)
+        momentum = momentum.dropna(how="all").sort_values("cagr_pct", ascending=False)
+        momentum = momentum.rename(columns=INDICATOR_LABELS).reset_index()
+        
+        paged_table(momentum, "momentum", {label: "{:,.2f}" for label in INDICATOR_LABELS.values()})
+    
+    # Rank history is a direct lookup in the materialized tables
+    st.markdown("---")
+    st.subheader("📈 Rank History")
+    
+    history = pd.DataFrame({c: rank_tables.history(rank_metric, rank_region, c) for c in rank_scope
+                            if c in rank_tables.ranks[(rank_metric, rank_region)].index})
+    history = history.loc[year_range[0]:year_range[1]].dropna(how="all")
+    
+    if len(history) > 0:
+        history_long = history.reset_index(names="year").melt(id_vars="year", var_name="country", value_name="rank").dropna()
+        fig = line_chart(
+            history_long,
+            x="year",
+            y="rank",
+            color="country",
+            title="Rank Over Time (1 = best)",
+            labels={"year": "Year", "rank": "Rank", "country": "Country"},
+            markers=True
+        )
+        fig.update_yaxes(autorange="reversed")
+        fig.update_layout(height=450)
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No rank history for the selected countries and period")
 
 elif page == "Waste Production":
     st.header("📦 Waste Production - Detailed Analysis")
@@ -1729,11 +2271,11 @@ elif page == "Waste Production":
     st.subheader("🔄 Waste Generation by Sector (Stacked Area)")
     
     # Check if sector columns exist
-    sector_cols = [col for col in df_waste_filt.columns if col.endswith("_tonnes") and col != "total_waste_tonnes"]
+    sector_cols = [col for col in SECTOR_COLS if col in df_waste.columns]
     
     if len(sector_cols) > 0:
-        # Prepare data for stacked area chart
-        sector_data = df_waste_filt.groupby("year")[sector_cols].sum().reset_index()
+        # Yearly sector sums for the selected countries, read from the precomputed prefix sums
+        sector_long = sector_cube.yearly_long(selected_countries, year_range[0], year_range[1], sector_cols)
         
         # Rename for better legend
         sector_rename = {
@@ -1743,9 +2285,6 @@ elif page == "Waste Production":
             "services_tonnes": "Services"
         }
         
-        # Melt for plotting
-        sector_long = sector_data.melt(id_vars=["year"], value_vars=sector_cols, 
-                                       var_name="sector", value_name="tonnes")
         sector_long["sector"] = sector_long["sector"].map(lambda x: sector_rename.get(x, x.replace("_tonnes", "").title()))
         
         # Distinct colors for sectors - using color wheel for maximum contrast
@@ -1785,7 +2324,7 @@ elif page == "Waste Production":
     st.markdown("---")
     st.subheader("📈 Production Evolution by Country")
     
-    fig2 = px.line(
+    fig2 = line_chart(
         df_waste_filt,
         x="year",
         y="total_waste_tonnes",
@@ -1794,8 +2333,129 @@ elif page == "Waste Production":
         labels={"year": "Year", "total_waste_tonnes": "Tonnes", "country": "Country"},
         markers=True
     )
+    add_filled_markers(fig2, df_waste_filt, "total_waste_tonnes", "total_waste_tonnes")
+    add_anomaly_markers(fig2, df_waste_filt, "total_waste_tonnes", "total_waste_tonnes")
     fig2.update_layout(height=450)
     st.plotly_chart(fig2, use_container_width=True)
+    
+    st.markdown("---")
+    similar_countries_section()
+
+elif page == "Data Vintages":
+    st.header("🗂️ Data Vintages")
+    
+    st.markdown("""
+    <div class="insight-box">
+        <h4>🗂️ Why Compare Vintages?</h4>
+        <p><strong>Purpose:</strong> OWID revises historical values; see what changed since an earlier download</p>
+        <ul>
+            <li><strong>Revised values:</strong> Every cell whose value differs between the two vintages</li>
+            <li><strong>Rankings:</strong> Countries whose rank moved because of the revisions</li>
+            <li><strong>Forecasts:</strong> How the revisions shift the waste per capita forecast</li>
+        </ul>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    saved = list_vintages(Path(__file__).parent)
+    if not saved:
+        st.info("No saved vintages yet. Keep a copy of today's raw data with "
+                "`python vintages.py --save 2025-Q3` and compare it after the next data update.")
+    else:
+        names = tuple(saved) + (CURRENT,)
+        store = load_vintage_store(names)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            old = st.selectbox("Compare vintage", names, index=len(names) - 2)
+        with col2:
+            new = st.selectbox("Against", names, index=len(names) - 1)
+        
+        memory = store.memory()
+        metric_labels = {
+            "Waste per Capita": "waste_per_capita_kg",
+            "Total Waste": "total_waste_tonnes",
+            "Recycling Rate": "recycling_rate"
+        }
+        revised = {label: store.revised_countries(old, new, m, available) for label, m in metric_labels.items()}
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Vintages Loaded", len(names))
+        with col2:
+            st.metric("Revised Series", sum(len(c) for c in revised.values()))
+        with col3:
+            st.metric("Shared Storage", f"{memory['stored_bytes'] / 1024:,.0f} KB",
+                      delta=f"-{1 - memory['stored_bytes'] / memory['dense_bytes']:.0%} vs. full copies",
+                      delta_color="off")
+        st.caption(f"{memory['series']} series held in {memory['buffers']} distinct buffers; "
+                   "series unchanged between vintages are stored once")
+        
+        metric_label = st.selectbox("Metric", list(metric_labels), key="vintage_metric")
+        metric = metric_labels[metric_label]
+        
+        st.markdown("---")
+        st.subheader("✏️ Revised Values")
+        revisions = store.revisions(old, new, metric, available)
+        if len(revisions) == 0:
+            st.success(f"No {metric_label.lower()} value of this region changed between {old} and {new}")
+        else:
+            paged_table(revisions, "vintage_revisions",
+                        {"old": "{:,.2f}", "new": "{:,.2f}", "change": "{:+,.2f}", "change_pct": "{:+.1f}%"},
+                        gradient="change_pct", cmap="RdBu_r")
+            
+            shown = [c for c in selected_countries if c in revised[metric_label]] or revised[metric_label][:4]
+            ci = [store.countries.index(c) for c in shown]
+            fig = go.Figure()
+            for name, dash in ((old, "dot"), (new, None)):
+                values = store.values(name, metric)[ci]
+                for i, country in enumerate(shown):
+                    fig.add_trace(go.Scatter(
+                        x=store.years, y=values[i], mode="lines", name=f"{country} ({name})",
+                        legendgroup=country,
+                        line=dict(color=px.colors.qualitative.Plotly[i % 10], dash=dash, width=2)
+                    ))
+            fig.update_layout(
+                title=f"{metric_label}: {old} (dotted) vs. {new} (solid)",
+                xaxis_title="Year",
+                yaxis_title=metric_label,
+                height=450
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        
+        st.markdown("---")
+        st.subheader("🏆 Effect on Rankings")
+        ranked_years = [int(y) for y, col in zip(store.years, store.values(new, metric).T) if (~np.isnan(col)).any()]
+        rank_year = st.select_slider("Ranking year", options=ranked_years, value=ranked_years[-1],
+                                     key="vintage_rank_year")
+        rank_moves = store.rank_changes(old, new, metric, rank_year, available)
+        if len(rank_moves) == 0:
+            st.success(f"No rank changed in {rank_year} among the countries of this region")
+        else:
+            st.dataframe(
+                rank_moves.style.format({
+                    "old_value": "{:,.2f}", "new_value": "{:,.2f}",
+                    "old_rank": "{:.0f}", "new_rank": "{:.0f}", "rank_change": "{:+.0f}"
+                }, na_rep="–"),
+                use_container_width=True,
+                hide_index=True
+            )
+        
+        st.markdown("---")
+        st.subheader("🔮 Effect on Forecasts")
+        revised_waste = revised["Waste per Capita"]
+        if not revised_waste:
+            st.success("No waste per capita revision in this region, so forecasts are unchanged")
+        else:
+            with st.spinner(f"Forecasting {len(revised_waste)} revised countries under both vintages..."):
+                changes = load_vintage_forecast_changes(store, old, new, tuple(revised_waste))
+            st.dataframe(
+                changes.style.format({
+                    "old_forecast": "{:,.1f}", "new_forecast": "{:,.1f}", "change_pct": "{:+.1f}%"
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+            st.caption("Final-year waste per capita forecast (kg/cap/yr, 5-year window) under each vintage")
 
 else:
     st.info("🚧 Page under construction")
@@ -1808,3 +2468,9 @@ st.markdown("""
 <p>Powered by Machine Learning & Advanced Analytics</p>
 </div>
 """, unsafe_allow_html=True)
+
+# Reruns ended early by st.stop() (no data, no selection) are not counted
+metrics.reruns.inc(page)
+metrics.rerun_seconds.observe(time.perf_counter() - rerun_start, page)
+if os.environ.get("METRICS_FILE"):
+    metrics.write(os.environ["METRICS_FILE"])
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Headless batch mode: compute every page's outputs without a Streamlit server.
+
+    python batch.py --output output/batch --format parquet --workers 4
+
+Writes KPIs, rankings and risk tables for every region/year combination, plus
+ARIMA forecasts for every country and training window and the reconciled
+sector forecasts, one file per table.
+"""
+import argparse
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cube import build_cube, build_sector_cube
+from data_loader import prepare_datasets
+from forecasting import SECTOR_COLS, forecast_sectors, forecast_totals, forecast_waste
+from rankings import build_rank_tables
+from risk import risk_levels
+from scenarios import scenario_baseline, score_countries
+
+REGIONS = ["Europe (with recycling)", "Africa (generation)", "North-South Comparison"]
+WINDOW_SIZES = [3, 5, 7, 10]
+DEFAULT_START_YEAR = 2010
+
+# Per-process data, filled once by load_state (in the parent and in every worker)
+_state = {}
+
+
+def load_state(base_path=None):
+    """Load the datasets and derived structures the batch tables are computed from"""
+    df_recycling, df_waste, df_merged, europe, africa = prepare_datasets(base_path)
+    cube = build_cube(df_recycling, df_waste, europe, africa)
+    _state.update(
+        df_waste=df_waste,
+        europe=europe,
+        africa=africa,
+        cube=cube,
+        sector_cube=build_sector_cube(df_waste, europe, africa, SECTOR_COLS),
+        rank_tables=build_rank_tables(cube, europe, africa),
+    )
+    return _state
+
+
+def region_countries(region, europe, africa):
+    if "Europe" in region:
+        return list(europe)
+    if "Africa" in region and "Comparison" not in region:
+        return list(africa)
+    return list(europe) + list(africa)
+
+
+def rank_region(region):
+    return "Europe" if "Europe" in region else "Africa" if "Comparison" not in region else "Combined"
+
+
+def kpi_rows(region, year, start_year):
+    """Overview KPIs of one region for the reference year `year`, like the Overview page"""
+    cube = _state["cube"]
+    countries = region_countries(region, _state["europe"], _state["africa"])
+    idx = cube.country_index(countries)
+    y = int(year - cube.years[0])
+
+    waste_pc = cube.values[cube.metric_index("waste_per_capita_kg")][idx, y]
+    recycling = cube.values[cube.metric_index("recycling_rate")][idx, y]
+    has_waste = waste_pc > 0
+    if not has_waste.any():
+        return None
+
+    names = np.array(countries)
+    row = {
+        "region": region,
+        "year": int(year),
+        "start_year": int(start_year),
+        "countries_with_data": int(has_waste.sum()),
+        "avg_waste_per_capita_kg": float(waste_pc[has_waste].mean()),
+        "total_waste_tonnes": _state["sector_cube"].total(countries, year),
+        "highest_producer": names[has_waste][np.argmax(waste_pc[has_waste])],
+        "highest_waste_per_capita_kg": float(waste_pc[has_waste].max()),
+        "lowest_producer": names[has_waste][np.argmin(waste_pc[has_waste])],
+        "lowest_waste_per_capita_kg": float(waste_pc[has_waste].min()),
+        "avg_recycling_rate": np.nan,
+        "best_recycler": None,
+        "best_recycling_rate": np.nan,
+        "countries_above_30pct": 0,
+    }
+    has_rec = ~np.isnan(recycling)
+    if has_rec.any():
+        row.update(
+            avg_recycling_rate=float(recycling[has_rec].mean()),
+            best_recycler=names[has_rec][np.argmax(recycling[has_rec])],
+            best_recycling_rate=float(recycling[has_rec].max()),
+            countries_above_30pct=int((recycling[has_rec] > 30).sum()),
+        )
+    return pd.DataFrame([row])
+
+
+def ranking_rows(region, year):
+    """All materialized rankings of one region and year"""
+    tables = []
+    for metric in ["waste_per_capita_kg", "total_waste_tonnes", "recycling_rate"]:
+        table = _state["rank_tables"].ranking(metric, rank_region(region), year)
+        if len(table) > 0:
+            tables.append(table.assign(ranked_by=metric, year=int(year), view=region))
+    return pd.concat(tables, ignore_index=True) if tables else None
+
+
+def risk_rows(region, year, start_year):
+    """Risk table of one region for the period [start_year, year], scored with the default risk rules"""
+    countries = region_countries(region, _state["europe"], _state["africa"])
+    baseline = scenario_baseline(_state["cube"], _state["europe"], _state["africa"], (start_year, year))
+    baseline = baseline[baseline["country"].isin(countries)]
+    if len(baseline) == 0:
+        return None
+    scores = score_countries(baseline)
+    return baseline.assign(
+        view=region,
+        start_year=int(start_year),
+        year=int(year),
+        risk_score=scores,
+        risk_level=risk_levels(scores),
+    ).sort_values("risk_score", ascending=False)
+
+
+def region_task(region, years, start_year):
+    """Every region/year table of one region (runs in a worker process)"""
+    results = {"kpis": [], "rankings": [], "risk": []}
+    for year in years:
+        results["rankings"].append(ranking_rows(region, year))
+        if year >= start_year:
+            results["kpis"].append(kpi_rows(region, year, start_year))
+            results["risk"].append(risk_rows(region, year, start_year))
+    return {name: [f for f in frames if f is not None] for name, frames in results.items()}
+
+
+def forecast_task(country, window_size):
+    """ARIMA (or fallback) forecast of one country and training window (runs in a worker process)"""
+    pred = forecast_waste(_state["df_waste"], country, years_ahead=5, window_size=window_size)
+    if pred is None:
+        return {"forecasts": []}
+    return {"forecasts": [pred.assign(window_size=window_size)]}
+
+
+def _quiet_warnings():
+    """Ignore warnings like app.py does: statsmodels warns on every ARIMA fit that does not converge"""
+    warnings.filterwarnings("ignore")
+
+
+def _run(task):
+    kind, args = task
+    if not _state:
+        load_state()
+    return (region_task if kind == "region" else forecast_task)(*args)
+
+
+def write_table(frame, path, fmt):
+    """Write one output table as Parquet or CSV"""
+    path = path.with_suffix(".parquet" if fmt == "parquet" else ".csv")
+    if fmt == "parquet":
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+    return path
+
+
+def run_batch(output_dir, fmt="parquet", workers=None, start_year=DEFAULT_START_YEAR):
+    """Compute all batch tables in parallel and write them to `output_dir`"""
+    _quiet_warnings()
+    state = load_state()
+    years = [int(y) for y in state["cube"].years]
+    countries = list(state["europe"]) + list(state["africa"])
+
+    tasks = [("region", (region, years, start_year)) for region in REGIONS]
+    tasks += [("forecast", (country, window)) for country in countries for window in WINDOW_SIZES]
+
+    collected = {"kpis": [], "rankings": [], "risk": [], "forecasts": [], "sector_forecasts": []}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_quiet_warnings) as pool:
+        for result in pool.map(_run, tasks, chunksize=4):
+            for name, frames in result.items():
+                collected[name].extend(frames)
+
+    # Sector forecasts are one vectorized pass per window, split from that window's ARIMA totals
+    forecasts = pd.concat(collected["forecasts"], ignore_index=True) if collected["forecasts"] else None
+    for window in WINDOW_SIZES:
+        totals = None
+        if forecasts is not None:
+            totals = forecast_totals(state["df_waste"], forecasts[forecasts["window_size"] == window])
+        sector_fc = forecast_sectors(state["df_waste"], countries, years_ahead=5, window_size=window, totals=totals)
+        if sector_fc is not None:
+            collected["sector_forecasts"].append(sector_fc.assign(window_size=window))
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for name, frames in collected.items():
+        if frames:
+            written.append(write_table(pd.concat(frames, ignore_index=True), output_dir / name, fmt))
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute all dashboard outputs without Streamlit")
+    parser.add_argument("--output", default="output/batch", help="Output directory")
+    parser.add_argument("--format", choices=["parquet", "csv"], default="parquet", help="Output file format")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--start-year", type=int, default=DEFAULT_START_YEAR,
+                        help="First year of the period used for KPIs and risk growth rates")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = run_batch(args.output, args.format, args.workers, args.start_year)
+    for path in written:
+        print(f"✓ {path}")
+    print(f"Batch completed in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Reproducible data build: raw -> clean -> imputed -> aggregated -> forecasts.
+
+    python build.py            # rebuild only the stages whose inputs changed
+    python build.py --force    # rebuild everything
+
+Every stage is keyed by a content hash of its inputs (raw CSV bytes, the source
+of the modules it runs, the source of its own builder in this file and the keys
+of the stages it depends on). Stage results
+are cached in .build/ and skipped when their key is unchanged. The final
+artifact data/dashboard.pkl is what the dashboard loads at startup.
+"""
+import argparse
+import hashlib
+import inspect
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from data_loader import RECYCLING_FILE, WASTE_FILE, clean_datasets, merge_datasets
+from forecasting import SECTOR_COLS, forecast_sectors, forecast_totals, forecast_waste
+from imputation import IMPUTED_FILE, apply_imputed_values, impute_waste_per_capita
+
+BUILD_DIR = Path(".build")
+ARTIFACT_FILE = Path("data") / "dashboard.pkl"
+WINDOW_SIZES = [3, 5, 7, 10]
+YEARS_AHEAD = 5
+
+# stage -> (upstream stages, source files whose code the stage runs)
+STAGES = {
+    "raw": ([], []),
+    "clean": (["raw"], ["data_loader.py"]),
+    "imputed": (["clean"], ["imputation.py"]),
+    "aggregated": (["clean", "imputed"], ["data_loader.py", "imputation.py"]),
+    "forecasts": (["aggregated"], ["forecasting.py"]),
+}
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def stage_keys(base_path):
+    """Content hash of every stage, computed from inputs only (nothing is built)"""
+    base_path = Path(base_path)
+    keys = {}
+    for stage, (upstream, sources) in STAGES.items():
+        if stage == "raw":
+            inputs = [(base_path / f).read_bytes() for f in (RECYCLING_FILE, WASTE_FILE)]
+        else:
+            inputs = [keys[u] for u in upstream] + [(base_path / f).read_bytes() for f in sources]
+        params = (WINDOW_SIZES, YEARS_AHEAD) if stage == "forecasts" else ()
+        # Editing a builder invalidates its stage (and, through the keys, everything downstream)
+        keys[stage] = _digest(stage, params, inspect.getsource(BUILDERS[stage]), *inputs)
+    return keys
+
+
+def _build_clean(base_path, results):
+    df_recycling, df_waste, europe, africa = clean_datasets(base_path)
+    return {"df_recycling": df_recycling, "df_waste": df_waste, "europe": europe, "africa": africa}
+
+
+def _build_imputed(base_path, results):
+    clean = results["clean"]
+    imputed = impute_waste_per_capita(clean["df_waste"], clean["europe"], clean["africa"])
+    # Keep the standalone artifact in sync for prepare_datasets() without a build
+    out = Path(base_path) / IMPUTED_FILE
+    out.parent.mkdir(exist_ok=True)
+    imputed.to_csv(out, index=False)
+    return imputed
+
+
+def _build_aggregated(base_path, results):
+    clean = results["clean"]
+    df_waste = apply_imputed_values(clean["df_waste"], results["imputed"])
+    df_waste["waste_observed"] = df_waste["waste_observed"].fillna(False).astype(bool)
+    df_merged = merge_datasets(clean["df_recycling"], df_waste)
+    return (clean["df_recycling"], df_waste, df_merged, clean["europe"], clean["africa"])
+
+
+def _build_forecasts(base_path, results):
+    df_waste, europe, africa = results["aggregated"][1], results["aggregated"][3], results["aggregated"][4]
+    countries = list(europe) + list(africa)
+
+    waste, sectors = [], []
+    for window_size in WINDOW_SIZES:
+        window_waste = []
+        for country in countries:
+            pred = forecast_waste(df_waste, country, years_ahead=YEARS_AHEAD, window_size=window_size)
+            if pred is not None:
+                window_waste.append(pred.assign(window_size=window_size))
+        waste.extend(window_waste)
+        # Sectors are split from the ARIMA totals of the same window
+        totals = forecast_totals(df_waste, pd.concat(window_waste, ignore_index=True)) if window_waste else None
+        sector_fc = forecast_sectors(df_waste, countries, years_ahead=YEARS_AHEAD, window_size=window_size,
+                                     sector_cols=SECTOR_COLS, totals=totals)
+        if sector_fc is not None:
+            sectors.append(sector_fc.assign(window_size=window_size))
+
+    return {
+        "waste": pd.concat(waste, ignore_index=True),
+        "sectors": pd.concat(sectors, ignore_index=True),
+    }
+
+
+def _build_raw(base_path, results):
+    return None
+
+
+BUILDERS = {
+    "raw": _build_raw,
+    "clean": _build_clean,
+    "imputed": _build_imputed,
+    "aggregated": _build_aggregated,
+    "forecasts": _build_forecasts,
+}
+
+
+def run_build(base_path=None, force=False, log=print):
+    """Run the build DAG, skipping stages whose key is cached, and write the dashboard artifact"""
+    base_path = Path(base_path) if base_path is not None else Path(__file__).parent
+    cache_dir = base_path / BUILD_DIR
+    cache_dir.mkdir(exist_ok=True)
+    keys = stage_keys(base_path)
+
+    results = {}
+    for stage in STAGES:
+        cached = cache_dir / f"{stage}-{keys[stage][:16]}.pkl"
+        if cached.exists() and not force:
+            results[stage] = pd.read_pickle(cached)
+            log(f"✓ {stage:<11} cached   ({keys[stage][:12]})")
+            continue
+        start = time.perf_counter()
+        results[stage] = BUILDERS[stage](base_path, results)
+        pd.to_pickle(results[stage], cached)
+        # Older entries of this stage can never be hit again
+        for stale in cache_dir.glob(f"{stage}-*.pkl"):
+            if stale != cached:
+                stale.unlink()
+        log(f"⚙️ {stage:<11} built in {time.perf_counter() - start:.1f}s ({keys[stage][:12]})")
+
+    artifact = {
+        "keys": keys,
+        "datasets": results["aggregated"],
+        "forecasts": results["forecasts"]["waste"],
+        "sector_forecasts": results["forecasts"]["sectors"],
+    }
+    pd.to_pickle(artifact, base_path / ARTIFACT_FILE)
+    log(f"✓ artifact saved to {base_path / ARTIFACT_FILE}")
+    return artifact
+
+
+def load_artifact(base_path):
+    """
+    Load data/dashboard.pkl if it was built from the current raw data and code.
+
+    Returns:
+        The artifact dict, or None when it is missing, stale or unreadable
+    """
+    path = Path(base_path) / ARTIFACT_FILE
+    if not path.exists():
+        return None
+    try:
+        artifact = pd.read_pickle(path)
+    except Exception:
+        # e.g. written by an incompatible pandas version
+        return None
+    if artifact.get("keys") != stage_keys(base_path):
+        return None
+    return artifact
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the dashboard data artifact")
+    parser.add_argument("--force", action="store_true", help="Rebuild every stage, ignoring the cache")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    run_build(force=args.force)
+    print(f"Build completed in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# From this many series on, charts switch to packed WebGL traces
+PACKED_MIN_SERIES = 8
+PALETTE = px.colors.qualitative.Plotly
+
+
+def series_colors(groups):
+    """Palette color of every group, assigned in sorted order so that charts of the same groups agree"""
+    return {g: PALETTE[i % len(PALETTE)] for i, g in enumerate(sorted(groups))}
+
+
+def pack_series(data, x, y, group="country"):
+    """
+    Concatenate the series of every group into single x/y arrays, separated by NaN gaps.
+
+    Returns:
+        (xs, ys, groups) arrays with one entry per point (gaps included),
+        where `groups` names the series of each point
+    """
+    data = data[[group, x, y]].dropna(subset=[y]).sort_values([group, x], kind="stable")
+    codes, names = pd.factorize(data[group])
+    # A gap point before every group start breaks the line between two series
+    breaks = np.flatnonzero(np.diff(codes)) + 1
+
+    xs = np.insert(data[x].to_numpy(dtype=float), breaks, np.nan)
+    ys = np.insert(data[y].to_numpy(dtype=float), breaks, np.nan)
+    groups = np.insert(np.asarray(names, dtype=object)[codes], breaks, "")
+    return xs, ys, groups
+
+
+def packed_traces(data, x, y, group="country", name=None, dash=None, markers=True, y_format=",.1f",
+                  colors=None, labels=False):
+    """
+    Scattergl traces drawing every group's series in its own color.
+
+    Series sharing a palette color are packed into one trace, so there are at most
+    len(PALETTE) traces however many groups there are. The traces share one legend
+    entry (`name`); with `labels`, the last point of every series is labelled with
+    its group name in the series' color.
+
+    Args:
+        colors: dict group -> color (default: series_colors of the groups in data);
+            pass the same dict to charts that should agree on colors
+    """
+    data = data[[group, x, y]].dropna(subset=[y])
+    colors = colors or series_colors(data[group].unique())
+    name = name or y
+    color_of = data[group].map(colors)
+
+    traces = []
+    for color in dict.fromkeys(colors.values()):
+        xs, ys, groups = pack_series(data[color_of == color], x, y, group)
+        if len(xs) == 0:
+            continue
+        traces.append(go.Scattergl(
+            x=xs,
+            y=ys,
+            mode="lines+markers" if markers else "lines",
+            name=name,
+            legendgroup=name,
+            showlegend=not traces,
+            connectgaps=False,
+            customdata=groups,
+            line=dict(color=color, width=1.5, dash=dash),
+            marker=dict(color=color, size=6),
+            hovertemplate=f"%{{customdata}}<br>%{{x}}: %{{y:{y_format}}}<extra></extra>",
+        ))
+
+    if labels:
+        ends = data.sort_values(x).groupby(group).tail(1)
+        traces.append(go.Scattergl(
+            x=ends[x],
+            y=ends[y],
+            mode="text",
+            text=ends[group],
+            textposition="middle right",
+            textfont=dict(color=ends[group].map(colors).tolist(), size=10),
+            legendgroup=name,
+            showlegend=False,
+            hoverinfo="skip",
+        ))
+    return traces
+
+
+def line_chart(data, x, y, color="country", title=None, labels=None, markers=True):
+    """
+    px.line for a few series; packed WebGL traces (one per palette color, series
+    labelled at their last point) once there are PACKED_MIN_SERIES or more, so the
+    trace count stays bounded and the browser paints one canvas instead of one SVG
+    path per country and one node per marker.
+    """
+    if data[color].nunique() < PACKED_MIN_SERIES:
+        return px.line(data, x=x, y=y, color=color, title=title, labels=labels, markers=markers)
+
+    labels = labels or {}
+    fig = go.Figure(packed_traces(data, x, y, color, name=labels.get(y, y), markers=markers, labels=True))
+    fig.update_layout(
+        title=title,
+        xaxis_title=labels.get(x, x),
+        yaxis_title=labels.get(y, y),
+        hovermode="closest",
+        showlegend=False,
+    )
+    return fig
+
+
+def animated_choropleth(values, years, codes, names, title=None, colorscale="Reds", label=None,
+                        value_format=",.0f", frame_ms=400):
+    """
+    Choropleth with one frame per year, played and scrubbed in the browser.
+
+    The base trace carries locations and names once; every frame only carries its
+    year's values as a float32 array, and the color range is fixed over all years so
+    colors compare across frames. Countries and years without any value are dropped.
+
+    Args:
+        values: (country, year) array, NaN where a country has no value
+        years: Year of every column
+        codes: ISO3 code of every row
+        names: Country name of every row
+
+    Returns:
+        go.Figure with frames, a year slider and play/pause buttons, showing the first year
+    """
+    values = np.asarray(values, dtype=float)
+    keep = ~np.isnan(values).all(axis=1)
+    shown = ~np.isnan(values).all(axis=0)
+    values = values[np.ix_(keep, shown)].astype(np.float32)
+    codes = np.asarray(codes, dtype=object)[keep]
+    names = np.asarray(names, dtype=object)[keep]
+    years = [int(y) for y in np.asarray(years)[shown]]
+    zmin, zmax = (float(np.nanmin(values)), float(np.nanmax(values))) if values.size else (0.0, 1.0)
+
+    fig = go.Figure(
+        go.Choropleth(
+            locations=codes,
+            z=values[:, 0],
+            text=names,
+            zmin=zmin,
+            zmax=zmax,
+            colorscale=colorscale,
+            colorbar=dict(title=label),
+            hovertemplate=f"%{{text}}: %{{z:{value_format}}}<extra></extra>",
+        ),
+        frames=[go.Frame(name=str(y), data=[go.Choropleth(z=values[:, i])], traces=[0]) for i, y in enumerate(years)],
+    )
+
+    jump = {"mode": "immediate", "frame": {"duration": 0, "redraw": True}, "transition": {"duration": 0}}
+    fig.update_layout(
+        title=title,
+        updatemenus=[dict(
+            type="buttons",
+            direction="left",
+            x=0.0,
+            y=0.0,
+            xanchor="left",
+            yanchor="top",
+            pad={"t": 50, "r": 10},
+            buttons=[
+                dict(label="▶ Play", method="animate", args=[None, {
+                    "frame": {"duration": frame_ms, "redraw": True},
+                    "transition": {"duration": 0},
+                    "fromcurrent": True,
+                }]),
+                dict(label="⏸ Pause", method="animate", args=[[None], {**jump, "frame": {"duration": 0, "redraw": False}}]),
+            ],
+        )],
+        sliders=[dict(
+            active=0,
+            x=0.12,
+            y=0.0,
+            len=0.88,
+            pad={"t": 40},
+            currentvalue={"prefix": "Year: "},
+            steps=[dict(label=str(y), method="animate", args=[[str(y)], jump]) for y in years],
+        )],
+    )
+    return fig
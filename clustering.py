@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import AgglomerativeClustering
+
+TRAJECTORY_METRICS = ["waste_per_capita_kg", "recycling_rate"]
+DISTANCE_METHODS = ["Euclidean", "DTW"]
+# "shape" z-scores each country's own series, "level" z-scores each metric over all countries
+NORMALIZATIONS = ["shape", "level"]
+
+
+@dataclass(frozen=True)
+class TrajectoryDistances:
+    """
+    Pairwise distances between the normalized trajectories of all countries.
+
+    `distances[i, j]` is NaN when countries i and j share no metric with overlapping
+    data (e.g. two African countries never overlap on recycling, but still share
+    waste per capita). `trajectories` has shape (metric, country, year).
+    """
+    countries: tuple
+    years: np.ndarray
+    metrics: tuple
+    method: str
+    normalization: str
+    trajectories: np.ndarray
+    distances: np.ndarray
+
+    def filled(self):
+        """Distance matrix with pairs that cannot be compared set to the largest distance"""
+        finite = self.distances[np.isfinite(self.distances)]
+        fill = finite.max() if len(finite) else 0.0
+        return np.where(np.isfinite(self.distances), self.distances, fill)
+
+    def clusters(self, n_clusters):
+        """Average-linkage cluster label (0-based, largest group first) of every country"""
+        n_clusters = min(n_clusters, len(self.countries))
+        labels = AgglomerativeClustering(
+            n_clusters=n_clusters, metric="precomputed", linkage="average"
+        ).fit_predict(self.filled())
+        # Relabel so that group numbers are stable and ordered by size
+        sizes = np.bincount(labels, minlength=n_clusters)
+        order = np.argsort(-sizes, kind="stable")
+        return np.argsort(order)[labels]
+
+    def order(self, labels):
+        """Country order grouping clusters together, closest to its cluster's medoid first"""
+        dist = self.filled()
+        keys = np.zeros(len(labels))
+        for label in np.unique(labels):
+            members = np.flatnonzero(labels == label)
+            medoid = members[dist[np.ix_(members, members)].sum(axis=1).argmin()]
+            keys[members] = dist[medoid, members]
+        return np.lexsort((keys, labels))
+
+    def groups(self, n_clusters):
+        """Table of peer groups: group number, country and mean distance to the rest of its group"""
+        labels = self.clusters(n_clusters)
+        dist = self.filled()
+        same = labels[:, None] == labels[None, :]
+        np.fill_diagonal(same, False)
+        with np.errstate(invalid="ignore"):
+            spread = (dist * same).sum(axis=1) / same.sum(axis=1)
+        order = self.order(labels)
+        return pd.DataFrame({
+            "group": labels[order] + 1,
+            "country": np.array(self.countries)[order],
+            "mean_distance": spread[order],
+        })
+
+
+def normalized_trajectories(cube, metrics=TRAJECTORY_METRICS, normalization="shape"):
+    """
+    (metric, country, year) array of z-scored series, NaN where the cube has no value.
+
+    With "shape" every country's series is centred and scaled on its own, so countries
+    group by how they evolve; with "level" each metric is scaled over all countries, so
+    high and low producers stay apart.
+    """
+    values = np.stack([cube.values[cube.metric_index(m)] for m in metrics]).astype(float)
+    axis = (2,) if normalization == "shape" else (1, 2)
+    with warnings.catch_warnings():
+        # Countries without data for a metric yield all-NaN slices
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(values, axis=axis, keepdims=True)
+        std = np.nanstd(values, axis=axis, keepdims=True)
+    return (values - mean) / np.where(std > 0, std, 1.0)
+
+
+def euclidean_distances(trajectories):
+    """
+    Masked Euclidean distance between all pairs of countries in one matrix product.
+
+    Only (metric, year) cells observed for both countries count; the sum of squared
+    differences is divided by the number of shared cells, so pairs with short overlaps
+    are not favoured. Uses sum((x - y)^2) = x^2 . m_y + m_x . y^2 - 2 x . y.
+    """
+    n_countries = trajectories.shape[1]
+    flat = trajectories.transpose(1, 0, 2).reshape(n_countries, -1)
+    mask = ~np.isnan(flat)
+    x = np.where(mask, flat, 0.0)
+    m = mask.astype(float)
+
+    shared = m @ m.T
+    squared = (x * x) @ m.T + m @ (x * x).T - 2 * x @ x.T
+    with np.errstate(invalid="ignore", divide="ignore"):
+        distances = np.sqrt(np.clip(squared, 0, None) / shared)
+    distances[shared == 0] = np.nan
+    np.fill_diagonal(distances, 0.0)
+    return distances
+
+
+def _dtw_metric(series):
+    """
+    DTW distance between all pairs of (country, year) series of one metric.
+
+    Each series is reduced to its available values, so series covering different
+    year ranges are warped against each other. The dynamic programme runs over the
+    two time axes, with every step vectorized across all country pairs.
+    """
+    n_countries, n_years = series.shape
+    valid = ~np.isnan(series)
+    lengths = valid.sum(axis=1)
+    # Left-align the available values of every series
+    order = np.argsort(~valid, axis=1, kind="stable")
+    packed = np.take_along_axis(series, order, axis=1)
+
+    cost = np.abs(packed[:, None, :, None] - packed[None, :, None, :])  # (i, j, a, b)
+    acc = np.full((n_countries, n_countries, n_years + 1, n_years + 1), np.inf)
+    acc[:, :, 0, 0] = 0.0
+    for a in range(1, n_years + 1):
+        for b in range(1, n_years + 1):
+            best = np.minimum(np.minimum(acc[:, :, a - 1, b], acc[:, :, a, b - 1]), acc[:, :, a - 1, b - 1])
+            acc[:, :, a, b] = cost[:, :, a - 1, b - 1] + best
+
+    li, lj = np.meshgrid(lengths, lengths, indexing="ij")
+    distances = acc[np.arange(n_countries)[:, None], np.arange(n_countries)[None, :], li, lj]
+    # Normalize by the longest possible warping path so long series are not penalized
+    with np.errstate(invalid="ignore", divide="ignore"):
+        distances = distances / (li + lj)
+    distances[(li == 0) | (lj == 0)] = np.nan
+    return distances
+
+
+def dtw_distances(trajectories):
+    """Mean of per-metric DTW distances over the metrics both countries have data for"""
+    per_metric = np.stack([_dtw_metric(series) for series in trajectories])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        distances = np.nanmean(per_metric, axis=0)
+    np.fill_diagonal(distances, 0.0)
+    return distances
+
+
+def trajectory_distances(cube, method="Euclidean", normalization="shape", metrics=TRAJECTORY_METRICS):
+    """
+    Distance matrix between the trajectories of all countries of the cube.
+
+    Args:
+        cube: WasteCube with the dashboard values
+        method: "Euclidean" or "DTW"
+        normalization: "shape" or "level" (see normalized_trajectories)
+        metrics: Metrics making up a trajectory
+
+    Returns:
+        TrajectoryDistances
+    """
+    if method not in DISTANCE_METHODS:
+        raise ValueError(f"Unknown distance method: {method}")
+    trajectories = normalized_trajectories(cube, metrics, normalization)
+    distances = euclidean_distances(trajectories) if method == "Euclidean" else dtw_distances(trajectories)
+    return TrajectoryDistances(
+        countries=cube.countries,
+        years=cube.years,
+        metrics=tuple(metrics),
+        method=method,
+        normalization=normalization,
+        trajectories=trajectories,
+        distances=distances,
+    )
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+METRICS = ["waste_per_capita_kg", "total_waste_tonnes", "recycling_rate"]
+
+# Provenance flag planes, one bit per cell each
+OBSERVED = 0
+INTERPOLATED = 1
+EXTRAPOLATED = 2
+IMPUTED = 3
+PROVENANCE_LABELS = ["Observed", "Interpolated", "Extrapolated", "Imputed"]
+
+
+@dataclass(frozen=True)
+class WasteCube:
+    """
+    Dense metric x country x year arrays for the region countries.
+
+    `values` holds the (interpolated/imputed) numbers shown by the dashboard.
+    `provenance` holds one bit-packed plane per flag (OBSERVED, INTERPOLATED,
+    EXTRAPOLATED, IMPUTED) with shape (flag, metric, country, ceil(years / 8)),
+    so the origin of every value is kept without a second copy of the data.
+    """
+    countries: tuple
+    years: np.ndarray
+    metrics: tuple
+    values: np.ndarray
+    provenance: np.ndarray
+
+    def metric_index(self, metric):
+        return self.metrics.index(metric)
+
+    def country_index(self, countries):
+        lookup = {c: i for i, c in enumerate(self.countries)}
+        return np.array([lookup.get(c, -1) for c in countries])
+
+    def year_index(self, years):
+        return np.asarray(years, dtype=int) - int(self.years[0])
+
+    def flag(self, flag, metric):
+        """Unpacked boolean (country, year) array of one provenance flag"""
+        packed = self.provenance[flag, self.metric_index(metric)]
+        return np.unpackbits(packed, axis=-1, count=len(self.years)).astype(bool)
+
+    def observed_mask(self, metric):
+        return self.flag(OBSERVED, metric)
+
+    def filled_mask(self, metric):
+        """Cells holding a value that was not observed (interpolated, extrapolated or imputed)"""
+        return ~np.isnan(self.values[self.metric_index(metric)]) & ~self.observed_mask(metric)
+
+    def provenance_codes(self, metric):
+        """(country, year) int array: index into PROVENANCE_LABELS, or -1 where there is no value"""
+        codes = np.full((len(self.countries), len(self.years)), -1, dtype=np.int8)
+        # Later flags win, so imputed cells are reported as imputed even if also extrapolated
+        for flag in (OBSERVED, INTERPOLATED, EXTRAPOLATED, IMPUTED):
+            codes[self.flag(flag, metric)] = flag
+        return codes
+
+    def lookup_flag(self, flag, metric, countries, years):
+        """Vectorized flag lookup for parallel arrays of countries and years (False when outside the cube)"""
+        ci = self.country_index(countries)
+        yi = self.year_index(years)
+        inside = (ci >= 0) & (yi >= 0) & (yi < len(self.years))
+        result = np.zeros(len(ci), dtype=bool)
+        result[inside] = self.flag(flag, metric)[ci[inside], yi[inside]]
+        return result
+
+    def lookup_provenance(self, metric, countries, years):
+        """Provenance labels for parallel arrays of countries and years"""
+        ci = self.country_index(countries)
+        yi = self.year_index(years)
+        inside = (ci >= 0) & (yi >= 0) & (yi < len(self.years))
+        codes = np.full(len(ci), -1, dtype=np.int8)
+        codes[inside] = self.provenance_codes(metric)[ci[inside], yi[inside]]
+        labels = np.array(PROVENANCE_LABELS + ["Missing"])
+        return labels[codes]
+
+
+def _wide(df, value_col, countries, years):
+    return (df.pivot_table(index="country", columns="year", values=value_col, aggfunc="first", dropna=False)
+              .reindex(index=countries, columns=years))
+
+
+def _span_flags(observed, has_value):
+    """Split filled cells into interpolated (inside the observed span) and extrapolated (outside it)"""
+    n_years = observed.shape[1]
+    any_obs = observed.any(axis=1, keepdims=True)
+    first = np.where(any_obs, np.argmax(observed, axis=1)[:, None], n_years)
+    last = np.where(any_obs, n_years - 1 - np.argmax(observed[:, ::-1], axis=1)[:, None], -1)
+    cols = np.arange(n_years)[None, :]
+    inside = (cols >= first) & (cols <= last)
+    filled = has_value & ~observed
+    return filled & inside, filled & ~inside
+
+
+def build_cube(df_recycling, df_waste, europe, africa):
+    """
+    Build the WasteCube from the prepared datasets.
+
+    Relies on the `waste_observed`, `recycling_observed` and `imputed` columns set by
+    data_loader.prepare_datasets to tell real observations from filled values.
+    """
+    countries = list(europe) + list(africa)
+    all_years = pd.concat([df_waste["year"], df_recycling["year"]]).dropna().astype(int)
+    years = np.arange(all_years.min(), all_years.max() + 1)
+
+    waste = df_waste[df_waste["country"].isin(countries)]
+    sources = {
+        "waste_per_capita_kg": (waste, "waste_observed"),
+        "total_waste_tonnes": (waste, "waste_observed"),
+        "recycling_rate": (df_recycling, "recycling_observed"),
+    }
+
+    values = np.full((len(METRICS), len(countries), len(years)), np.nan)
+    flags = np.zeros((len(PROVENANCE_LABELS),) + values.shape, dtype=bool)
+    imputed = _wide(waste, "imputed", countries, years).fillna(False).to_numpy(dtype=bool)
+
+    for m, metric in enumerate(METRICS):
+        frame, observed_col = sources[metric]
+        values[m] = _wide(frame, metric, countries, years).to_numpy(dtype=float)
+        has_value = ~np.isnan(values[m])
+        observed = _wide(frame, observed_col, countries, years).fillna(False).to_numpy(dtype=bool) & has_value
+
+        flags[OBSERVED, m] = observed
+        flags[INTERPOLATED, m], flags[EXTRAPOLATED, m] = _span_flags(observed, has_value)
+        if metric != "recycling_rate":
+            flags[IMPUTED, m] = imputed & has_value
+
+    return WasteCube(
+        countries=tuple(countries),
+        years=years,
+        metrics=tuple(METRICS),
+        values=values,
+        provenance=np.packbits(flags, axis=-1),
+    )
+
+
+@dataclass(frozen=True)
+class SectorCube:
+    """
+    Cumulative sector totals along years for O(1) year-range aggregates.
+
+    `prefix[s, c, i]` is the sum of sector `s` for country `c` over the first `i` years
+    (missing values count as 0, like groupby().sum()), `region_prefix[region]` the same
+    already summed over a region's countries, and `present` the cumulative number of
+    years for which a country has a data row.
+    """
+    countries: tuple
+    years: np.ndarray
+    sectors: tuple
+    prefix: np.ndarray
+    present: np.ndarray
+    regions: dict
+    region_prefix: dict
+
+    def _span(self, year_from, year_to):
+        start = int(np.clip(year_from - self.years[0], 0, len(self.years)))
+        stop = int(np.clip(year_to - self.years[0] + 1, start, len(self.years)))
+        return start, stop
+
+    def _rows(self, countries):
+        lookup = {c: i for i, c in enumerate(self.countries)}
+        return np.array([lookup[c] for c in countries if c in lookup], dtype=int)
+
+    def _prefix_for(self, countries):
+        """(sector, year + 1) prefix sums for a country subset, using a region's precomputed sums when possible"""
+        key = frozenset(countries)
+        for region, members in self.regions.items():
+            if key == members:
+                return self.region_prefix[region]
+        return self.prefix[:, self._rows(countries)].sum(axis=1)
+
+    def range_total(self, countries, year_from, year_to):
+        """Total per sector over [year_from, year_to] for the countries"""
+        start, stop = self._span(year_from, year_to)
+        prefix = self._prefix_for(countries)
+        return pd.Series(prefix[:, stop] - prefix[:, start], index=list(self.sectors))
+
+    def total(self, countries, year, sector="total_waste_tonnes"):
+        """Sum of one sector in a single year"""
+        return float(self.range_total(countries, year, year)[sector])
+
+    def shares(self, countries, year_from, year_to, sectors=None):
+        """Share of each sector in the combined total of `sectors` over the year range"""
+        totals = self.range_total(countries, year_from, year_to)
+        totals = totals[list(sectors)] if sectors is not None else totals
+        whole = totals.sum()
+        return totals / whole if whole > 0 else totals * np.nan
+
+    def average(self, countries, year_from, year_to):
+        """Average yearly total per sector over the years with data in the range"""
+        start, stop = self._span(year_from, year_to)
+        rows = self._rows(countries)
+        n_years = int(((self.present[rows, start + 1:stop + 1] - self.present[rows, start:stop]).sum(axis=0) > 0).sum())
+        totals = self.range_total(countries, year_from, year_to)
+        return totals / n_years if n_years > 0 else totals * np.nan
+
+    def yearly_long(self, countries, year_from, year_to, sectors=None):
+        """Long (year, sector, tonnes) frame of yearly sums, only for years where the countries have data"""
+        start, stop = self._span(year_from, year_to)
+        rows = self._rows(countries)
+        prefix = self._prefix_for(countries)[:, start:stop + 1]
+        yearly = np.diff(prefix, axis=-1)
+        has_row = (np.diff(self.present[rows, start:stop + 1], axis=-1).sum(axis=0) > 0)
+
+        sectors = list(sectors) if sectors is not None else list(self.sectors)
+        s_idx = [self.sectors.index(s) for s in sectors]
+        years = self.years[start:stop][has_row]
+        values = yearly[s_idx][:, has_row]
+        return pd.DataFrame({
+            "year": np.tile(years, len(sectors)),
+            "sector": np.repeat(sectors, len(years)),
+            "tonnes": values.ravel(),
+        })
+
+
+def build_sector_cube(df_waste, europe, africa, sector_cols):
+    """Precompute prefix sums of every sector (and the total) along years for all region countries"""
+    countries = list(europe) + list(africa)
+    sectors = list(sector_cols) + ["total_waste_tonnes"]
+    waste = df_waste[df_waste["country"].isin(countries)]
+    years = np.arange(int(waste["year"].min()), int(waste["year"].max()) + 1)
+
+    values = np.stack([_wide(waste, s, countries, years).to_numpy(dtype=float) for s in sectors])
+    zeros = np.zeros(values.shape[:-1] + (1,))
+    prefix = np.concatenate([zeros, np.nancumsum(values, axis=-1)], axis=-1)
+
+    rows = waste.groupby(["country", "year"]).size().unstack().reindex(index=countries, columns=years)
+    present = np.concatenate([np.zeros((len(countries), 1)), np.cumsum(rows.notna().to_numpy(), axis=-1)], axis=-1)
+
+    regions = {"Europe": frozenset(europe), "Africa": frozenset(africa), "All": frozenset(countries)}
+    lookup = {c: i for i, c in enumerate(countries)}
+    region_prefix = {
+        region: prefix[:, [lookup[c] for c in members]].sum(axis=1)
+        for region, members in regions.items()
+    }
+
+    return SectorCube(
+        countries=tuple(countries),
+        years=years,
+        sectors=tuple(sectors),
+        prefix=prefix,
+        present=present,
+        regions=regions,
+        region_prefix=region_prefix,
+    )
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import numpy as np
+from pathlib import Path
+from imputation import apply_imputed_values, impute_waste_per_capita, load_imputed_values
+
+
+RECYCLING_FILE = Path("municipal-waste-recycling-rate") / "municipal-waste-recycling-rate.csv"
+WASTE_FILE = Path("total-waste-generation") / "total-waste-generation.csv"
+
+
+def prepare_datasets(base_path=None, impute=True):
+    """
+    Load the raw OWID CSVs, harmonise columns and fill yearly gaps.
+    
+    Args:
+        base_path: Project root containing the raw data folders (default: this file's folder)
+        impute: Merge the precomputed KNN imputation (see imputation.py) into the waste data
+    
+    Returns:
+        (df_recycling, df_waste, df_merged, europe, africa)
+    """
+    base_path = Path(base_path) if base_path is not None else Path(__file__).parent
+    
+    df_rec_clean, df_was, europe, africa = clean_datasets(base_path)
+    if impute:
+        # KNN-imputed cells are precomputed offline; only fall back to imputing here if the artifact is missing
+        imputed = load_imputed_values(base_path)
+        if imputed is None:
+            imputed = impute_waste_per_capita(df_was, europe, africa)
+        df_was = apply_imputed_values(df_was, imputed)
+    df_was["waste_observed"] = df_was["waste_observed"].fillna(False).astype(bool)
+    
+    return df_rec_clean, df_was, merge_datasets(df_rec_clean, df_was), europe, africa
+
+
+def clean_datasets(base_path):
+    """
+    Clean stage of the build: harmonised and gap-filled data before KNN imputation.
+    
+    Returns:
+        (df_recycling, df_waste, europe, africa)
+    """
+    base_path = Path(base_path)
+    
+    df_rec = pd.read_csv(base_path / RECYCLING_FILE)
+    df_was = pd.read_csv(base_path / WASTE_FILE)
+    
+    df_rec = df_rec.rename(columns={
+        "Entity": "country", "Code": "country_code", "Year": "year",
+        "Variable:% Recycling - MUNW": "recycling_rate"
+    })
+    df_rec["year"] = df_rec["year"].astype(int)
+    df_rec["recycling_observed"] = df_rec["recycling_rate"].notna()
+    
+    df_was = df_was.rename(columns={"Entity": "country", "Code": "country_code", "Year": "year"})
+    df_was["year"] = df_was["year"].astype(int)
+    
+    waste_cols = {}
+    for col in df_was.columns:
+        if "households" in col.lower() or "activities of households" in col.lower():
+            waste_cols[col] = "households_tonnes"
+        elif "construction" in col.lower():
+            waste_cols[col] = "construction_tonnes"
+        elif "manufacturing" in col.lower():
+            waste_cols[col] = "manufacturing_tonnes"
+        elif "other service" in col.lower():
+            waste_cols[col] = "services_tonnes"
+    
+    df_was = df_was.rename(columns=waste_cols)
+    wcols = [c for c in df_was.columns if c.endswith("_tonnes")]
+    
+    if wcols:
+        df_was["total_waste_tonnes"] = df_was[wcols].sum(axis=1, skipna=True)
+    else:
+        numeric_cols = df_was.select_dtypes(include=[np.number]).columns
+        numeric_cols = [c for c in numeric_cols if c not in ["year"]]
+        if len(numeric_cols) > 0:
+            df_was["total_waste_tonnes"] = df_was[numeric_cols].sum(axis=1, skipna=True)
+        else:
+            df_was["total_waste_tonnes"] = 0
+    
+    # Expanded to 27 European countries with recycling data
+    europe = ["France", "Germany", "Italy", "Spain", "Belgium", "Netherlands",
+              "Austria", "Denmark", "Sweden", "Finland", "Norway", "Switzerland",
+              "Poland", "Portugal", "Greece", "Ireland", "Czechia",
+              "United Kingdom", "Luxembourg", "Slovenia", "Slovakia",
+              "Estonia", "Hungary", "Iceland", "Latvia", "Lithuania", "Turkey"]
+    
+    # Expanded to 22 African countries with waste data
+    africa = ["Algeria", "Egypt", "Morocco", "Tunisia", "South Africa",
+              "Kenya", "Ghana", "Botswana", "Mauritius", "Benin",
+              "Burkina Faso", "Burundi", "Cape Verde", "Guinea", "Lesotho",
+              "Madagascar", "Niger", "Sudan", "Tanzania", "Togo", "Zambia", "Zimbabwe"]
+    
+    europe = [c for c in europe if c in df_rec["country"].unique()]
+    africa = [c for c in africa if c in df_was["country"].unique()]
+    
+    pop_dict = {
+        # European countries (27 total)
+        "France": 67.4, "Germany": 83.2, "Italy": 59.6, "Spain": 47.4,
+        "Belgium": 11.5, "Netherlands": 17.4, "Austria": 8.9, "Denmark": 5.8,
+        "Sweden": 10.4, "Finland": 5.5, "Norway": 5.4, "Switzerland": 8.6,
+        "Poland": 38.0, "Portugal": 10.3, "Greece": 10.7, "Ireland": 5.0,
+        "Czechia": 10.7, "United Kingdom": 67.1, "Luxembourg": 0.63,
+        "Slovenia": 2.1, "Slovakia": 5.5,
+        "Estonia": 1.3, "Hungary": 9.7, "Iceland": 0.37, "Latvia": 1.9,
+        "Lithuania": 2.8, "Turkey": 84.3,
+        # African countries (22 total)
+        "Algeria": 43.9, "Egypt": 102.3, "Morocco": 36.9, "Tunisia": 11.8,
+        "South Africa": 59.3, "Kenya": 53.8, "Ghana": 31.1, "Botswana": 2.4,
+        "Mauritius": 1.3, "Benin": 12.1,
+        "Burkina Faso": 20.9, "Burundi": 11.9, "Cape Verde": 0.56, "Guinea": 13.1,
+        "Lesotho": 2.1, "Madagascar": 27.7, "Niger": 24.2, "Sudan": 43.8,
+        "Tanzania": 59.7, "Togo": 8.3, "Zambia": 18.4, "Zimbabwe": 14.9
+    }
+    
+    df_was["population_millions"] = df_was["country"].map(pop_dict)
+    mask = df_was["population_millions"].notna() & (df_was["total_waste_tonnes"] > 0)
+    df_was.loc[mask, "waste_per_capita_kg"] = (
+        df_was.loc[mask, "total_waste_tonnes"] * 1000 / 
+        (df_was.loc[mask, "population_millions"] * 1_000_000)
+    )
+    # Remember which values are real observations before any gap filling
+    df_was["waste_observed"] = df_was["waste_per_capita_kg"].notna()
+    
+    africa_data = df_was[df_was["country"].isin(africa)].copy()
+    
+    if len(africa_data) > 0:
+        for country in africa:
+            country_data = africa_data[africa_data["country"] == country].copy()
+            if len(country_data) > 0:
+                year_min = africa_data["year"].min()
+                year_max = africa_data["year"].max()
+                
+                full_years = pd.DataFrame({
+                    "year": range(year_min, year_max + 1),
+                    "country": country
+                })
+                
+                country_full = pd.merge(full_years, country_data, 
+                                       on=["year", "country"], how="left")
+                
+                country_full["country_code"] = country_data["country_code"].iloc[0] if len(country_data) > 0 else None
+                country_full["population_millions"] = pop_dict.get(country)
+                
+                if country_full["total_waste_tonnes"].notna().sum() >= 2:
+                    country_full["total_waste_tonnes"] = country_full["total_waste_tonnes"].interpolate(
+                        method="linear", limit_direction="both"
+                    )
+                    
+                    if country_full["population_millions"].iloc[0] > 0:
+                        mask_calc = country_full["total_waste_tonnes"].notna()
+                        country_full.loc[mask_calc, "waste_per_capita_kg"] = (
+                            country_full.loc[mask_calc, "total_waste_tonnes"] * 1000 / 
+                            (country_full.loc[mask_calc, "population_millions"] * 1_000_000)
+                        )
+                
+                df_was = df_was[df_was["country"] != country]
+                df_was = pd.concat([df_was, country_full], ignore_index=True)
+    
+    # Interpolate waste data for European countries (fill missing odd years)
+    europe_data = df_was[df_was["country"].isin(europe)].copy()
+    
+    if len(europe_data) > 0:
+        for country in europe:
+            country_data = europe_data[europe_data["country"] == country].copy()
+            if len(country_data) > 0 and len(country_data) >= 2:
+                year_min = country_data["year"].min()
+                year_max = country_data["year"].max()
+                
+                # Create full year range
+                full_years = pd.DataFrame({
+                    "year": range(year_min, year_max + 1),
+                    "country": country
+                })
+                
+                country_full = pd.merge(full_years, country_data, 
+                                       on=["year", "country"], how="left")
+                
+                country_full["country_code"] = country_data["country_code"].iloc[0] if len(country_data) > 0 else None
+                country_full["population_millions"] = pop_dict.get(country)
+                
+                # Interpolate total waste
+                if country_full["total_waste_tonnes"].notna().sum() >= 2:
+                    country_full["total_waste_tonnes"] = country_full["total_waste_tonnes"].interpolate(
+                        method="linear", limit_direction="both"
+                    )
+                    
+                    # Recalculate waste per capita
+                    if country_full["population_millions"].iloc[0] and country_full["population_millions"].iloc[0] > 0:
+                        mask_calc = country_full["total_waste_tonnes"].notna()
+                        country_full.loc[mask_calc, "waste_per_capita_kg"] = (
+                            country_full.loc[mask_calc, "total_waste_tonnes"] * 1000 / 
+                            (country_full.loc[mask_calc, "population_millions"] * 1_000_000)
+                        )
+                
+                # Remove old data and add interpolated data
+                df_was = df_was[df_was["country"] != country]
+                df_was = pd.concat([df_was, country_full], ignore_index=True)
+    
+    df_was["imputed"] = False
+    
+    rec_list = []
+    for country in europe:
+        cdata = df_rec[df_rec["country"] == country].copy()
+        if len(cdata) > 0:
+            yrs = range(cdata["year"].min(), cdata["year"].max() + 1)
+            full_df = pd.DataFrame({"year": list(yrs), "country": country})
+            merged = pd.merge(full_df, cdata, on=["country", "year"], how="left")
+            merged["country_code"] = merged["country_code"].ffill().bfill()
+            merged["recycling_rate"] = merged["recycling_rate"].interpolate(method="linear")
+            merged["recycling_observed"] = merged["recycling_observed"].fillna(False).astype(bool)
+            rec_list.append(merged)
+    
+    df_rec_clean = pd.concat(rec_list, ignore_index=True) if rec_list else pd.DataFrame()
+    
+    return df_rec_clean, df_was, europe, africa
+
+
+def merge_datasets(df_rec_clean, df_was):
+    """Outer join of recycling and waste data on country and year"""
+    return pd.merge(df_rec_clean, 
+                    df_was[["country", "year", "total_waste_tonnes", "waste_per_capita_kg"]],
+                    on=["country", "year"], how="outer")
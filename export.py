@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Export of dashboard frames as Parquet, Arrow IPC or CSV.
+
+Frames are converted to Arrow and written one row batch at a time, so no
+intermediate Arrow table of the whole frame is built. The output itself is
+complete in its sink: a file on disk, or the in-memory buffer of export_file()
+that the dashboard's download buttons serve.
+
+    python export.py --dataset waste --format Parquet --output output/waste.parquet
+"""
+import argparse
+import io
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+# Format -> (file extension, MIME type)
+FORMATS = {
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+    "Arrow IPC": (".arrow", "application/vnd.apache.arrow.file"),
+    "CSV": (".csv", "text/csv"),
+}
+BATCH_ROWS = 65_536
+
+
+def record_batches(frame, schema, batch_rows=BATCH_ROWS):
+    """Arrow record batches of `batch_rows` rows each, converted lazily from the frame"""
+    for start in range(0, len(frame), batch_rows):
+        # Via a table: Arrow-backed string columns arrive chunked, which RecordBatch.from_pandas rejects
+        chunk = pa.Table.from_pandas(frame.iloc[start:start + batch_rows], schema=schema, preserve_index=False)
+        yield from chunk.to_batches()
+
+
+def write_frame(frame, sink, fmt, batch_rows=BATCH_ROWS):
+    """
+    Write a frame to a path or binary file object, batch by batch.
+
+    Args:
+        frame: DataFrame to export (its index is not written)
+        sink: Path or writable binary file object
+        fmt: One of FORMATS
+        batch_rows: Rows converted and written per batch
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    schema = pa.Schema.from_pandas(frame, preserve_index=False)
+    if fmt == "Parquet":
+        writer = pq.ParquetWriter(sink, schema)
+    elif fmt == "Arrow IPC":
+        writer = pa.ipc.new_file(sink, schema)
+    else:
+        writer = pa_csv.CSVWriter(sink, schema)
+    with writer:
+        for batch in record_batches(frame, schema, batch_rows):
+            writer.write_batch(batch)
+
+
+def export_file(frame, fmt, batch_rows=BATCH_ROWS):
+    """In-memory export file, rewound for reading (e.g. by st.download_button)"""
+    buffer = io.BytesIO()
+    write_frame(frame, buffer, fmt, batch_rows)
+    buffer.seek(0)
+    return buffer
+
+
+def main():
+    from data_loader import prepare_datasets
+
+    parser = argparse.ArgumentParser(description="Export the prepared waste and recycling data")
+    parser.add_argument("--format", choices=list(FORMATS), default="Parquet")
+    parser.add_argument("--dataset", choices=["waste", "recycling"], default="waste")
+    parser.add_argument("--output", type=Path, help="Output file (default: output/<dataset><extension>)")
+    args = parser.parse_args()
+
+    df_recycling, df_waste, _, _, _ = prepare_datasets(Path(__file__).parent)
+    frame = df_waste if args.dataset == "waste" else df_recycling
+    output = args.output or Path("output") / f"{args.dataset}{FORMATS[args.format][0]}"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    write_frame(frame, output, args.format)
+    print(f"✓ {len(frame):,} rows written to {output}")
+
+
+if __name__ == "__main__":
+    main()
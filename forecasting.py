@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from statsmodels.tsa.arima.model import ARIMA
+
+import metrics
+
+SECTOR_COLS = ["households_tonnes", "construction_tonnes", "manufacturing_tonnes", "services_tonnes"]
+
+
+def forecast_waste(df, country, years_ahead=5, window_size=5):
+    """
+    ARIMA time series forecast using actual waste values to predict future waste.
+    Uses autoregressive patterns in the data rather than just year-based linear regression.
+
+    Args:
+        df: DataFrame with waste data
+        country: Country name
+        years_ahead: Number of years to forecast
+        window_size: Number of recent years to use for training (default 5)
+
+    Returns:
+        DataFrame with predictions and 'model_used' column
+    """
+    country_data = df[df["country"] == country].dropna(subset=["waste_per_capita_kg"])
+    country_data = country_data.sort_values("year")
+
+    if len(country_data) < 3:
+        return None
+
+    # Use only the most recent window_size years for better trend capture
+    if len(country_data) > window_size:
+        country_data = country_data.tail(window_size)
+
+    y = country_data["waste_per_capita_kg"].values
+    last_year = int(country_data["year"].max())
+
+    start = time.perf_counter()
+    try:
+        # ARIMA(p,d,q): p=autoregressive order, d=differencing, q=moving average
+        # (1,1,1) is a good default for most time series with trends
+        model = ARIMA(y, order=(1, 1, 1))
+        fitted_model = model.fit()
+
+        # Forecast future values
+        predictions = fitted_model.forecast(steps=years_ahead)
+
+        # Ensure predictions are non-negative
+        predictions = np.maximum(predictions, 0)
+
+        future_years = np.array(range(last_year + 1, last_year + years_ahead + 1))
+
+        result = pd.DataFrame({
+            "year": future_years,
+            "predicted_waste_pc": predictions,
+            "country": country,
+            "model_used": "ARIMA"
+        })
+    except Exception as e:
+        # Fallback to simple linear regression if ARIMA fails
+        X = country_data["year"].values.reshape(-1, 1)
+        model = LinearRegression()
+        model.fit(X, y)
+
+        future_years = np.array(range(last_year + 1, last_year + years_ahead + 1)).reshape(-1, 1)
+        predictions = model.predict(future_years)
+        predictions = np.maximum(predictions, 0)
+
+        result = pd.DataFrame({
+            "year": future_years.flatten(),
+            "predicted_waste_pc": predictions,
+            "country": country,
+            "model_used": "Linear Regression (fallback)"
+        })
+
+    model_used = result["model_used"].iloc[0]
+    metrics.arima_fit_seconds.observe(time.perf_counter() - start, model_used)
+    metrics.forecasts.inc(model_used)
+    return result
+
+
+def _panel(df, countries, value_cols):
+    """Pivot long country/year rows into a (country, column, year) array."""
+    subset = df[df["country"].isin(countries)]
+    years = np.arange(int(subset["year"].min()), int(subset["year"].max()) + 1)
+    wide = subset.pivot_table(index="country", columns="year", values=value_cols,
+                              aggfunc="mean", dropna=False)
+    wide = wide.reindex(index=list(countries),
+                        columns=pd.MultiIndex.from_product([value_cols, years]))
+    values = wide.to_numpy(dtype=float).reshape(len(countries), len(value_cols), len(years))
+    return years, values
+
+
+def _masked_trend(x, Y, window_size):
+    """
+    Least-squares line through the last `window_size` observed points of every
+    row of Y at once. NaNs are treated as missing observations.
+
+    Returns:
+        (slope, intercept, n_points) arrays with one entry per row
+    """
+    observed = ~np.isnan(Y)
+    # Count observations from the right so each row keeps only its most recent ones
+    recent_rank = np.cumsum(observed[..., ::-1], axis=-1)[..., ::-1]
+    used = observed & (recent_rank <= window_size)
+
+    w = used.astype(float)
+    xs = np.broadcast_to(x, Y.shape)
+    y0 = np.where(used, Y, 0.0)
+
+    n = w.sum(axis=-1)
+    sx = (w * xs).sum(axis=-1)
+    sy = y0.sum(axis=-1)
+    sxx = (w * xs * xs).sum(axis=-1)
+    sxy = (y0 * xs).sum(axis=-1)
+
+    denom = n * sxx - sx ** 2
+    slope = np.divide(n * sxy - sx * sy, denom, out=np.zeros_like(n), where=denom > 0)
+    intercept = np.divide(sy - slope * sx, n, out=np.full_like(n, np.nan), where=n > 0)
+    return slope, intercept, n
+
+
+def forecast_totals(df, forecasts):
+    """
+    Total waste in tonnes implied by per-capita forecasts (forecast_waste output).
+
+    Each country's latest known population is carried over the forecast horizon.
+
+    Returns:
+        DataFrame (country, year, predicted_tonnes)
+    """
+    population = df.dropna(subset=["population_millions"]).sort_values("year").groupby("country")["population_millions"].last()
+    # kg per person * million people / 1000 kg per tonne
+    tonnes = forecasts["predicted_waste_pc"] * forecasts["country"].map(population) * 1000
+    return pd.DataFrame({
+        "country": forecasts["country"],
+        "year": forecasts["year"].astype(int),
+        "predicted_tonnes": tonnes,
+    }).dropna(subset=["predicted_tonnes"]).reset_index(drop=True)
+
+
+def forecast_sectors(df, countries, years_ahead=5, window_size=5, sector_cols=None, totals=None):
+    """
+    Hierarchical sector forecast for many countries in one vectorized pass.
+
+    Every series (total + each sector, for every country) gets a linear trend
+    fitted on its last `window_size` observations, all solved together with
+    closed-form least squares. Sector forecasts are then reconciled top-down:
+    each sector keeps its forecast share but is rescaled so that the sectors
+    sum exactly to the total forecast. Shares only use the sectors a country
+    actually reports.
+
+    The total forecast is `totals` where given - normally the ARIMA forecast of
+    forecast_waste converted to tonnes by forecast_totals - and the linear
+    trend of total_waste_tonnes for the country-years it does not cover.
+
+    Args:
+        df: DataFrame with waste data (total_waste_tonnes + sector columns)
+        countries: Countries to forecast
+        years_ahead: Number of years to forecast
+        window_size: Number of recent observations per series used for the trend
+        sector_cols: Sector columns forming the bottom level (default SECTOR_COLS)
+        totals: Optional DataFrame (country, year, predicted_tonnes) of total forecasts
+
+    Returns:
+        Long DataFrame (country, year, sector, predicted_tonnes) where sector
+        "total_waste_tonnes" holds the total forecast, or None if nothing to forecast
+    """
+    sector_cols = [c for c in (sector_cols or SECTOR_COLS) if c in df.columns]
+    countries = [c for c in countries if c in set(df["country"])]
+    if not countries or not sector_cols:
+        return None
+
+    value_cols = ["total_waste_tonnes"] + sector_cols
+    years, values = _panel(df, countries, value_cols)
+
+    # Centre years for numerical stability of the normal equations
+    x0 = years.mean()
+    slope, intercept, n_points = _masked_trend(years - x0, values, window_size)
+
+    # Forecast horizon starts after each country's last observed total
+    has_total = ~np.isnan(values[:, 0, :])
+    last_idx = len(years) - 1 - np.argmax(has_total[:, ::-1], axis=1)
+    last_year = np.where(has_total.any(axis=1), years[last_idx], -1)
+    future = last_year[:, None] + np.arange(1, years_ahead + 1)[None, :]
+
+    # (country, level, horizon) base forecasts, clipped at zero like forecast_waste
+    base = intercept[..., None] + slope[..., None] * (future[:, None, :] - x0)
+    base = np.maximum(base, 0)
+
+    total = base[:, 0, :]
+    if totals is not None:
+        given = totals.set_index(["country", "year"])["predicted_tonnes"]
+        keys = pd.MultiIndex.from_arrays([np.repeat(countries, years_ahead), future.ravel()])
+        given = given.reindex(keys).to_numpy(dtype=float).reshape(total.shape)
+        total = np.where(np.isnan(given), total, given)
+    sectors = np.where((n_points[:, 1:] > 0)[..., None], base[:, 1:, :], 0.0)
+    sector_sum = sectors.sum(axis=1, keepdims=True)
+    shares = np.divide(sectors, sector_sum, out=np.full_like(sectors, np.nan), where=sector_sum > 0)
+    reconciled = shares * total[:, None, :]
+
+    levels = np.concatenate([total[:, None, :], reconciled], axis=1)
+    valid = (last_year >= 0) & (n_points[:, 0] > 0)
+    if not valid.any():
+        return None
+    levels, future = levels[valid], future[valid]
+    kept = np.array(countries)[valid]
+
+    n_c, n_l, n_h = levels.shape
+    result = pd.DataFrame({
+        "country": np.repeat(kept, n_l * n_h),
+        "year": np.repeat(future[:, None, :], n_l, axis=1).ravel(),
+        "sector": np.tile(np.repeat(value_cols, n_h), n_c),
+        "predicted_tonnes": levels.ravel(),
+    })
+    return result.dropna(subset=["predicted_tonnes"]).reset_index(drop=True)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Offline KNN imputation of the country x year waste-per-capita matrix.
+
+Run once at build time to refresh the stored artifact:
+
+    python imputation.py
+
+The dashboard then merges data/imputed_waste.csv instead of imputing per request.
+"""
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from sklearn.impute import KNNImputer
+from sklearn.preprocessing import StandardScaler
+
+IMPUTED_FILE = Path("data") / "imputed_waste.csv"
+
+
+def impute_waste_per_capita(df_waste, europe, africa, n_neighbors=5):
+    """
+    Fill the gaps left by per-country interpolation using KNN across countries.
+
+    Each region's country x year matrix of waste per capita is standardized per
+    year and imputed with distance-weighted KNN, so a country with a single
+    observation borrows the trajectory of its most similar peers. Countries
+    without any observation are left empty rather than invented.
+
+    Args:
+        df_waste: Interpolated waste data (country, year, waste_per_capita_kg, population_millions)
+        europe: European country names
+        africa: African country names
+        n_neighbors: Number of neighbouring countries used per imputed cell
+
+    Returns:
+        DataFrame (country, year, waste_per_capita_kg, total_waste_tonnes) of imputed cells only
+    """
+    imputed_parts = []
+    for countries in (europe, africa):
+        region = df_waste[df_waste["country"].isin(countries)]
+        matrix = region.pivot_table(index="country", columns="year",
+                                    values="waste_per_capita_kg", aggfunc="mean")
+        matrix = matrix[matrix.notna().any(axis=1)]
+        if matrix.shape[0] < 2 or not matrix.isna().any().any():
+            continue
+
+        scaler = StandardScaler()
+        scaled = scaler.fit_transform(matrix.to_numpy())
+        # Years with a single reporting country have no spread to standardize
+        scaled = np.where(np.isfinite(scaled), scaled, np.nan)
+        filled = KNNImputer(n_neighbors=min(n_neighbors, matrix.shape[0] - 1),
+                            weights="distance", keep_empty_features=True).fit_transform(scaled)
+        filled = scaler.inverse_transform(filled)
+
+        gaps = matrix.isna().to_numpy()
+        rows, cols = np.nonzero(gaps)
+        imputed_parts.append(pd.DataFrame({
+            "country": matrix.index.to_numpy()[rows],
+            "year": matrix.columns.to_numpy()[cols].astype(int),
+            "waste_per_capita_kg": np.maximum(filled[rows, cols], 0),
+        }))
+
+    if not imputed_parts:
+        return pd.DataFrame(columns=["country", "year", "waste_per_capita_kg", "total_waste_tonnes"])
+
+    imputed = pd.concat(imputed_parts, ignore_index=True)
+    population = df_waste.groupby("country")["population_millions"].first()
+    imputed["total_waste_tonnes"] = (
+        imputed["waste_per_capita_kg"] * imputed["country"].map(population) * 1_000_000 / 1000
+    )
+    return imputed.dropna(subset=["waste_per_capita_kg"]).sort_values(["country", "year"]).reset_index(drop=True)
+
+
+def apply_imputed_values(df_waste, imputed):
+    """
+    Merge imputed cells into the waste data and flag them with `imputed=True`.
+
+    Only cells that are still empty are filled: the artifact is a snapshot, and
+    after a data refresh a stored estimate must not replace a reported value.
+    """
+    if imputed is None or len(imputed) == 0:
+        return df_waste
+
+    df_waste = df_waste.copy()
+    if "imputed" not in df_waste.columns:
+        df_waste["imputed"] = False
+
+    keys = pd.MultiIndex.from_frame(df_waste[["country", "year"]])
+    new_keys = pd.MultiIndex.from_frame(imputed[["country", "year"]])
+    existing = new_keys.isin(keys)
+
+    # Cells whose row already exists (e.g. empty African years) are updated in place
+    lookup = imputed[existing].set_index(["country", "year"])
+    hit = keys.isin(lookup.index) & df_waste["waste_per_capita_kg"].isna().to_numpy()
+    for col in ["waste_per_capita_kg", "total_waste_tonnes"]:
+        df_waste.loc[hit, col] = lookup[col].reindex(keys[hit]).to_numpy()
+    df_waste.loc[hit, "imputed"] = True
+
+    # Cells without a row get one, carrying over the country's static attributes
+    missing = imputed[~existing].copy()
+    if len(missing) > 0:
+        static = df_waste.groupby("country")[["country_code", "population_millions"]].first()
+        missing = missing.join(static, on="country")
+        missing["imputed"] = True
+        df_waste = pd.concat([df_waste, missing], ignore_index=True)
+
+    return df_waste
+
+
+def load_imputed_values(base_path):
+    """Read the precomputed imputation artifact, or None if it has not been built"""
+    path = Path(base_path) / IMPUTED_FILE
+    if not path.exists():
+        return None
+    return pd.read_csv(path)
+
+
+def main():
+    from data_loader import prepare_datasets
+
+    base_path = Path(__file__).parent
+    _, df_waste, _, europe, africa = prepare_datasets(base_path, impute=False)
+    imputed = impute_waste_per_capita(df_waste, europe, africa)
+
+    out = base_path / IMPUTED_FILE
+    out.parent.mkdir(exist_ok=True)
+    imputed.to_csv(out, index=False)
+    print(f"✓ {len(imputed)} imputed cells for {imputed['country'].nunique()} countries saved to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+INDICATORS = ["yoy_change", "yoy_change_pct", "cagr_pct", "moving_average", "acceleration"]
+INDICATOR_LABELS = {
+    "yoy_change": "YoY Change",
+    "yoy_change_pct": "YoY Change (%)",
+    "cagr_pct": "CAGR (%/yr)",
+    "moving_average": "Moving Average",
+    "acceleration": "Acceleration",
+}
+
+
+@dataclass(frozen=True)
+class Indicators:
+    """
+    Rolling indicators for every metric, country and year of the data cube.
+
+    `values` has shape (indicator, metric, country, year) following INDICATORS and
+    the cube's metrics. Years without enough history hold NaN.
+    """
+    countries: tuple
+    years: np.ndarray
+    metrics: tuple
+    values: np.ndarray
+    ma_window: int
+    cagr_window: int
+
+    def long(self, metric, countries=None, year_range=None):
+        """Long frame (country, year, <indicators>) for one metric"""
+        countries = list(countries) if countries is not None else list(self.countries)
+        lookup = {c: i for i, c in enumerate(self.countries)}
+        rows = [lookup[c] for c in countries if c in lookup]
+        cols = np.ones(len(self.years), dtype=bool)
+        if year_range is not None:
+            cols = (self.years >= year_range[0]) & (self.years <= year_range[1])
+
+        block = self.values[:, self.metrics.index(metric)][:, rows][:, :, cols]
+        frame = pd.DataFrame({
+            "country": np.repeat(np.array(self.countries)[rows], cols.sum()),
+            "year": np.tile(self.years[cols], len(rows)),
+        })
+        for i, name in enumerate(INDICATORS):
+            frame[name] = block[i].ravel()
+        return frame
+
+    def snapshot(self, metric, year, countries=None):
+        """Indicators of one year, one row per country"""
+        return self.long(metric, countries, (year, year)).drop(columns="year").set_index("country")
+
+
+def _shift(values, periods):
+    """Shift along the year axis, filling the gap with NaN"""
+    shifted = np.full_like(values, np.nan)
+    shifted[..., periods:] = values[..., :-periods]
+    return shifted
+
+
+def compute_indicators(cube, ma_window=3, cagr_window=5):
+    """
+    Compute all rolling indicators for the whole cube in one pass.
+
+    - yoy_change: absolute change vs the previous year
+    - yoy_change_pct: relative change vs the previous year (%)
+    - cagr_pct: compound annual growth over the trailing `cagr_window` years (%)
+    - moving_average: trailing mean over `ma_window` years (needs a full window)
+    - acceleration: change of the YoY change (second difference)
+    """
+    values = cube.values
+    previous = _shift(values, 1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        yoy = values - previous
+        yoy_pct = np.where(previous > 0, yoy / previous * 100, np.nan)
+
+        start = _shift(values, cagr_window)
+        cagr = np.where((start > 0) & (values >= 0), ((values / start) ** (1 / cagr_window) - 1) * 100, np.nan)
+
+    # Strided view (..., year, window) over the trailing windows; incomplete windows stay NaN
+    moving = np.full_like(values, np.nan)
+    moving[..., ma_window - 1:] = sliding_window_view(values, ma_window, axis=-1).mean(axis=-1)
+
+    acceleration = yoy - _shift(yoy, 1)
+
+    return Indicators(
+        countries=cube.countries,
+        years=cube.years,
+        metrics=cube.metrics,
+        values=np.stack([yoy, yoy_pct, cagr, moving, acceleration]),
+        ma_window=ma_window,
+        cagr_window=cagr_window,
+    )
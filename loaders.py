@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Cached loaders shared by the dashboard script and the serve.py launcher.
+
+They live in a module rather than in app.py so that a process can fill the same
+Streamlit caches before the first browser session runs the script.
+"""
+import functools
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+import metrics
+from anomalies import detect_anomalies, without_anomalies
+from build import WINDOW_SIZES, YEARS_AHEAD, load_artifact
+from charts import animated_choropleth, line_chart
+from clustering import DISTANCE_METHODS, trajectory_distances
+from cube import build_cube, build_sector_cube
+from data_loader import prepare_datasets
+from forecasting import SECTOR_COLS, forecast_sectors, forecast_totals, forecast_waste
+from indicators import compute_indicators
+from metrics import cached
+from rankings import build_rank_tables
+from scenarios import scenario_baseline
+from similarity import DEFAULT_WINDOW, build_window_index
+from vintages import CURRENT, build_vintage_store, forecast_changes, load_vintage
+from warmup import WarmUp
+
+
+@st.cache_resource
+def start_metrics_server():
+    """Prometheus endpoint on METRICS_PORT, started once per server process"""
+    port = os.environ.get("METRICS_PORT")
+    return metrics.serve(port) if port else None
+
+
+@cached(st.cache_resource)
+def load_build():
+    """Prebuilt artifact from build.py, or None if it is missing or stale"""
+    return load_artifact(Path(__file__).parent)
+
+
+@cached(st.cache_data)
+def load_data():
+    build = load_build()
+    if build is not None:
+        return build["datasets"]
+    return prepare_datasets(Path(__file__).parent)
+
+
+def prebuilt_forecasts(table, countries, years_ahead, window_size):
+    """Rows of a prebuilt forecast table, or None if the build does not cover these parameters"""
+    build = load_build()
+    if build is None or years_ahead != YEARS_AHEAD or window_size not in WINDOW_SIZES:
+        return None
+    forecasts = build[table]
+    forecasts = forecasts[(forecasts["window_size"] == window_size) & forecasts["country"].isin(countries)]
+    return forecasts.drop(columns="window_size").reset_index(drop=True)
+
+
+@cached(st.cache_resource)
+def load_cube(_df_recycling, _df_waste, europe, africa):
+    """Shared read-only data cube with bit-packed provenance flags"""
+    return build_cube(_df_recycling, _df_waste, europe, africa)
+
+
+@cached(st.cache_resource)
+def load_sector_cube(_df_waste, europe, africa):
+    """Prefix sums of sector totals along years for O(1) year-range aggregates"""
+    return build_sector_cube(_df_waste, europe, africa, SECTOR_COLS)
+
+
+@cached(st.cache_resource)
+def load_indicators(_cube):
+    """YoY, CAGR, moving average and acceleration for every country and metric"""
+    return compute_indicators(_cube)
+
+
+@cached(st.cache_resource)
+def load_anomalies(_cube):
+    """Robust z-scores of every observed change, computed once for all series"""
+    return detect_anomalies(_cube)
+
+
+@cached(st.cache_resource)
+def load_trajectory_distances(_cube, method, normalization):
+    """Pairwise trajectory distances between all countries, computed once per method"""
+    return trajectory_distances(_cube, method, normalization)
+
+
+@cached(st.cache_resource)
+def load_window_index(_cube, window):
+    """Every complete window of every country's waste per capita, indexed once per window length"""
+    return build_window_index(_cube, window=window)
+
+
+@cached(st.cache_data)
+@cached(st.cache_resource)
+def load_vintage_store(names):
+    """All vintages in one store; series that were not revised share a single buffer"""
+    # Saved vintages are prepared only to build the store, so their frames are not kept around
+    base_path = Path(__file__).parent
+    return build_vintage_store({name: load_data() if name == CURRENT else load_vintage(base_path, name)
+                                for name in names})
+
+
+@cached(st.cache_data)
+def load_vintage_forecast_changes(_store, old, new, countries, window_size=5):
+    """Forecasts of the revised countries under both vintages, fitted on the store's series"""
+    metric = "waste_per_capita_kg"
+    return forecast_changes(_store.frame(old, metric, countries), _store.frame(new, metric, countries),
+                            list(countries), window_size=window_size)
+
+
+@cached(st.cache_resource)
+def load_rank_tables(_cube, europe, africa):
+    """Rank tables for every metric, region and year, materialized once per data load"""
+    return build_rank_tables(_cube, europe, africa)
+
+
+@cached(st.cache_data)
+def load_scenario_baseline(_cube, europe, africa, year_range, detail=False):
+    """Latest values and growth rates of all countries for the what-if simulator"""
+    return scenario_baseline(_cube, europe, africa, year_range, detail)
+
+
+@cached(st.cache_data)
+def load_animated_map(_cube, metric, countries, codes, year_range, colorscale, label):
+    """Year-by-year choropleth of one metric, its frames cut once from the cube per selection"""
+    idx = _cube.country_index(countries)
+    in_range = (_cube.years >= year_range[0]) & (_cube.years <= year_range[1])
+    values = _cube.values[_cube.metric_index(metric)][np.ix_(idx, in_range)]
+    return animated_choropleth(values, _cube.years[in_range], codes, countries, colorscale=colorscale, label=label)
+
+
+@cached(st.cache_data)
+def load_forecasts(_df, countries, years_ahead=5, window_size=5, excluded=()):
+    """ARIMA forecasts for the given countries, cached per window size and set of excluded (country, year) points"""
+    if excluded:
+        _df = without_anomalies(_df, excluded)
+    else:
+        prebuilt = prebuilt_forecasts("forecasts", countries, years_ahead, window_size)
+        if prebuilt is not None:
+            return prebuilt if len(prebuilt) > 0 else None
+
+    forecast_data = []
+    for country in countries:
+        pred = forecast_waste(_df, country, years_ahead=years_ahead, window_size=window_size)
+        if pred is not None:
+            forecast_data.append(pred)
+    return pd.concat(forecast_data, ignore_index=True) if forecast_data else None
+
+
+@cached(st.cache_data)
+def load_sector_forecasts(_df, countries, years_ahead=5, window_size=5):
+    """Sector forecasts for all given countries, reconciled to their ARIMA totals and cached per window size"""
+    prebuilt = prebuilt_forecasts("sector_forecasts", countries, years_ahead, window_size)
+    if prebuilt is not None:
+        return prebuilt if len(prebuilt) > 0 else None
+    forecasts = load_forecasts(_df, countries, years_ahead=years_ahead, window_size=window_size, excluded=())
+    totals = forecast_totals(_df, forecasts) if forecasts is not None else None
+    return forecast_sectors(_df, list(countries), years_ahead=years_ahead, window_size=window_size, totals=totals)
+
+
+DEFAULT_SELECTIONS = {
+    "Europe (with recycling)": ["France", "Germany", "Italy", "Spain"],
+    "Africa (generation)": ["Algeria", "Egypt", "Morocco", "Tunisia"],
+    "North-South Comparison": ["France", "Germany", "Algeria", "Morocco"],
+}
+
+
+def warmup_steps():
+    """(name, callable) steps filling what first visitors hit: data, default forecasts and common figures"""
+    def data():
+        df_recycling, df_waste, _, europe, africa = load_data()
+        cube = load_cube(df_recycling, df_waste, tuple(europe), tuple(africa))
+        load_rank_tables(cube, tuple(europe), tuple(africa))
+        load_sector_cube(df_waste, tuple(europe), tuple(africa))
+        load_indicators(cube)
+        load_anomalies(cube)
+
+    def default_selection(region, europe, africa):
+        available = europe if "Europe" in region else africa if "Africa" in region else europe + africa
+        return tuple([c for c in DEFAULT_SELECTIONS[region] if c in available][:4])
+
+    def forecasts(window_size):
+        _, df_waste, _, europe, africa = load_data()
+        for region in DEFAULT_SELECTIONS:
+            # Same arguments as the Predictions page, so the cache keys match
+            load_forecasts(df_waste, default_selection(region, europe, africa), years_ahead=5,
+                           window_size=window_size, excluded=())
+        load_sector_forecasts(df_waste, tuple(sorted(europe + africa)), years_ahead=5, window_size=window_size)
+
+    def analytics():
+        df_recycling, df_waste, _, europe, africa = load_data()
+        cube = load_cube(df_recycling, df_waste, tuple(europe), tuple(africa))
+        load_trajectory_distances(cube, DISTANCE_METHODS[0], "shape")
+        load_window_index(cube, DEFAULT_WINDOW)
+
+    def figures():
+        # The first figure of a process pays for loading Plotly's validators and templates
+        _, df_waste, _, europe, africa = load_data()
+        for region in DEFAULT_SELECTIONS:
+            waste = df_waste[df_waste["country"].isin(default_selection(region, europe, africa))]
+            line_chart(waste, x="year", y="waste_per_capita_kg", color="country").to_json()
+        px.bar(df_waste.head(10), x="country", y="total_waste_tonnes").to_json()
+
+    return ([("data", data)]
+            + [(f"forecasts ({w}-year window)", functools.partial(forecasts, w)) for w in WINDOW_SIZES]
+            + [("analytics", analytics), ("figures", figures)])
+
+
+@st.cache_resource
+def start_warmup():
+    """Background cache warm-up, started once per server process; readiness is served on /ready"""
+    warmup = WarmUp(warmup_steps()).start()
+    metrics.set_readiness(warmup.status)
+    return warmup
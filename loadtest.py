@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent-session load test for the dashboard, driven by Streamlit's AppTest.
+
+    python loadtest.py --sessions 1 4 8 16 --actions 15
+
+Each simulated session is an AppTest instance running in its own thread of this
+process, like sessions share one Streamlit server process (and its caches). A
+session clicks through random regions, pages and forecast windows; every
+interaction is one timed script rerun. For each concurrency level the report
+gives p50/p95 rerun latency, throughput and resident memory per session.
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+APP_FILE = Path(__file__).parent / "app.py"
+REGIONS = ["Europe (with recycling)", "Africa (generation)", "North-South Comparison"]
+WINDOW_SIZES = [3, 5, 7, 10]
+
+
+def rss_mb():
+    """Resident memory of this process in MB (NaN if it cannot be read)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        return int(statm.read_text().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    return float("nan")
+
+
+def _widget(at, kind, label):
+    matches = [w for w in getattr(at, kind) if w.label == label]
+    return matches[0] if matches else None
+
+
+def _step(at, rng):
+    """Perform one random user interaction and return its name (the rerun is not run yet)"""
+    nav = _widget(at, "radio", "📑 Navigation")
+    window = _widget(at, "selectbox", "Training Window (years)")
+    choice = rng.random()
+    if window is not None and choice < 0.4:
+        window.set_value(rng.choice([w for w in WINDOW_SIZES if w != window.value]))
+        return "forecast window"
+    if choice < 0.75 and nav is not None:
+        nav.set_value(rng.choice([p for p in nav.options if p != nav.value]))
+        return "page"
+    region = _widget(at, "radio", "Analysis Region")
+    region.set_value(rng.choice([r for r in REGIONS if r != region.value]))
+    return "region"
+
+
+def run_session(seed, n_actions, timeout=300):
+    """Simulate one user session; returns a list of (action, latency_s, error)"""
+    rng = random.Random(seed)
+    records = []
+    at = AppTest.from_file(str(APP_FILE), default_timeout=timeout)
+
+    start = time.perf_counter()
+    at.run()
+    records.append(("session start", time.perf_counter() - start, bool(at.exception)))
+
+    for _ in range(n_actions):
+        action = _step(at, rng)
+        start = time.perf_counter()
+        at.run()
+        records.append((action, time.perf_counter() - start, bool(at.exception)))
+    return records
+
+
+def run_load(n_sessions, n_actions, seed=0):
+    """Run `n_sessions` concurrent sessions and summarise their reruns"""
+    results = [None] * n_sessions
+
+    def worker(i):
+        try:
+            results[i] = run_session(seed + i, n_actions)
+        except Exception:
+            results[i] = [("crash", float("nan"), True)]
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    rss_after = rss_mb()
+
+    records = [r for session in results for r in session]
+    latencies = np.array([lat for _, lat, _ in records if not np.isnan(lat)]) * 1000
+    by_action = {}
+    for action, lat, _ in records:
+        by_action.setdefault(action, []).append(lat * 1000)
+
+    return {
+        "sessions": n_sessions,
+        "reruns": len(latencies),
+        "errors": sum(err for _, _, err in records),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "max_ms": float(latencies.max()),
+        "throughput": len(latencies) / wall,
+        "wall_s": wall,
+        "rss_per_session_mb": (rss_after - rss_before) / n_sessions,
+        "p50_by_action_ms": {a: float(np.nanpercentile(v, 50)) for a, v in sorted(by_action.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the dashboard with concurrent simulated sessions")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 8],
+                        help="Concurrency levels to test (one run per value)")
+    parser.add_argument("--actions", type=int, default=15, help="Interactions per session")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the random click paths")
+    args = parser.parse_args()
+
+    # Warm the process-wide caches once, like a server that has already served a user
+    print("Warming up caches...")
+    run_session(args.seed, 0)
+    print(f"Baseline RSS: {rss_mb():.0f} MB\n")
+
+    header = f"{'sessions':>8} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'reruns/s':>9} {'MB/session':>11} {'errors':>7}"
+    print(header)
+    print("-" * len(header))
+    reports = []
+    for n in args.sessions:
+        report = run_load(n, args.actions, args.seed)
+        reports.append(report)
+        print(f"{n:>8} {report['reruns']:>7} {report['p50_ms']:>8.0f} {report['p95_ms']:>8.0f} "
+              f"{report['max_ms']:>8.0f} {report['throughput']:>9.2f} "
+              f"{report['rss_per_session_mb']:>11.1f} {report['errors']:>7}")
+
+    print("\np50 latency by interaction (ms):")
+    for report in reports:
+        breakdown = ", ".join(f"{a} {v:.0f}" for a, v in report["p50_by_action_ms"].items())
+        print(f"  {report['sessions']:>3} sessions: {breakdown}")
+
+
+if __name__ == "__main__":
+    main()
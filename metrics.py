@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Process-wide counters and histograms, exported in the Prometheus text format.
+
+    METRICS_PORT=9464 streamlit run app.py      # serve http://localhost:9464/metrics
+    METRICS_FILE=output/metrics.prom streamlit run app.py   # or rewrite a file after every rerun
+
+GET /ready on the same port reports the cache warm-up (see warmup.py).
+The file variant suits node_exporter's textfile collector. Metrics live in this
+module, so every session of a Streamlit server (and every thread of batch jobs)
+reports into the same registry.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Prometheus client default buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIX = "dashboard_"
+
+
+def rss_bytes():
+    """Resident memory of this process in bytes (None if it cannot be read)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        return int(statm.read_text().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    return None
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.label_names = PREFIX + name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name + "_total", _labels(self.label_names, k), v) for k, v in sorted(self._values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations in seconds"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.label_names = PREFIX + name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *labels):
+        with self._lock:
+            counts, total = self._values.get(labels, ([0] * (len(self.buckets) + 1), 0.0))
+            # Bucket i counts observations <= buckets[i]; the last one is +Inf
+            index = next((i for i, b in enumerate(self.buckets) if seconds <= b), len(self.buckets))
+            counts[index] += 1
+            self._values[labels] = (counts, total + seconds)
+
+    def time(self, *labels):
+        """Context manager observing the duration of its block"""
+        return _Timer(self, labels)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    samples.append((self.name + "_bucket",
+                                    _labels(self.label_names + ("le",), key + (le,)), cumulative))
+                samples.append((self.name + "_sum", _labels(self.label_names, key), total))
+                samples.append((self.name + "_count", _labels(self.label_names, key), cumulative))
+        return samples
+
+
+class Gauge:
+    """Value read at export time from a callback (None = no sample)"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, read):
+        self.name, self.help, self.label_names = PREFIX + name, help, ()
+        self.read = read
+
+    def samples(self):
+        value = self.read()
+        return [] if value is None else [(self.name, "", value)]
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram, self.labels = histogram, labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+reruns = Counter("reruns", "Completed script reruns by page", ["page"])
+rerun_seconds = Histogram("rerun_duration_seconds", "Script rerun duration by page", ["page"])
+arima_fit_seconds = Histogram("arima_fit_duration_seconds", "Duration of forecast_waste model fits", ["model"])
+forecasts = Counter("forecasts", "forecast_waste results by model (fallback = ARIMA failed)", ["model"])
+cache_calls = Counter("cache_calls", "Calls of cached loaders", ["function"])
+cache_misses = Counter("cache_misses", "Calls of cached loaders that ran the function body", ["function"])
+memory = Gauge("resident_memory_bytes", "Resident memory of the dashboard process", rss_bytes)
+# Callable returning a status dict with a "ready" key, see set_readiness()
+_readiness = None
+warmup_ready = Gauge("warmup_ready", "1 once the background cache warm-up has finished",
+                     lambda: None if _readiness is None else int(_readiness()["ready"]))
+
+REGISTRY = [reruns, rerun_seconds, arima_fit_seconds, forecasts, cache_calls, cache_misses, memory, warmup_ready]
+
+
+def set_readiness(status):
+    """Report readiness on GET /ready from `status()`, a dict with at least a boolean "ready" key"""
+    global _readiness
+    _readiness = status
+
+
+def cached(cache, name=None):
+    """
+    Apply a caching decorator (st.cache_data, st.cache_resource, functools.cache...)
+    and count calls and misses; hits are calls minus misses.
+
+        @cached(st.cache_data)
+        def load_data(): ...
+    """
+    def decorate(func):
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            cache_misses.inc(label)
+            return func(*args, **kwargs)
+
+        cached_body = cache(body)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            cache_calls.inc(label)
+            return cached_body(*args, **kwargs)
+
+        call.clear = getattr(cached_body, "clear", None)
+        return call
+    return decorate
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {value!r}")
+    return "\n".join(lines) + "\n"
+
+
+def write(path):
+    """Atomically rewrite a .prom file (for node_exporter's textfile collector)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(render(), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/ready":
+            # Ready by default when nothing registered a warm-up
+            status = _readiness() if _readiness is not None else {"ready": True}
+            self._send(200 if status["ready"] else 503, json.dumps(status), "application/json")
+        elif path in ("/", "/metrics"):
+            self._send(200, render(), "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self.send_error(404)
+
+    def _send(self, code, text, content_type):
+        body = text.encode()
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        # Scrapes every few seconds would flood the Streamlit log
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """
+    Serve /metrics (and /ready) from a daemon thread.
+
+    Returns:
+        The server, or None if the port is already taken (e.g. by another process
+        of the same deployment)
+    """
+    try:
+        server = ThreadingHTTPServer((host, int(port)), _Handler)
+    except OSError:
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-server").start()
+    return server
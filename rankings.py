@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from dataclasses import dataclass
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+# Ranking direction per metric: True = lower value is better (rank 1)
+RANK_ASCENDING = {
+    "waste_per_capita_kg": True,
+    "total_waste_tonnes": True,
+    "recycling_rate": False,
+}
+REGIONS = ["Europe", "Africa", "Combined"]
+
+
+@dataclass(frozen=True)
+class RankTables:
+    """
+    Rankings materialized for every metric, region and year.
+
+    `ranks[(metric, region)]` is a (country, year) DataFrame of ranks (1 = best, NaN = no data),
+    `tables[(metric, region, year)]` the ready-to-display ranking of that year and
+    `coverage[(metrics, region)]` the number of countries with data for all `metrics` per year.
+    """
+    ranks: dict
+    tables: dict
+    coverage: dict
+
+    def ranking(self, metric, region, year):
+        """Ranking table of one year, sorted best first (empty if the year has no data)"""
+        return self.tables.get((metric, region, int(year)), _EMPTY)
+
+    def rank_change(self, metric, region, year_from, year_to):
+        """Positive values mean the country climbed the ranking between the two years"""
+        ranks = self.ranks[(metric, region)]
+        return ranks[int(year_from)] - ranks[int(year_to)]
+
+    def history(self, metric, region, country):
+        """Rank of one country over all years"""
+        return self.ranks[(metric, region)].loc[country]
+
+    def best_year(self, metrics, region, year_range):
+        """Year in the range with the most countries having data for every metric"""
+        counts = self.coverage[(tuple(sorted(metrics)), region)].loc[year_range[0]:year_range[1]]
+        if len(counts) == 0 or counts.max() == 0:
+            return None
+        return int(counts.idxmax())
+
+    def latest_year(self, metric, region, year_range):
+        """Latest year in the range with data for the metric"""
+        counts = self.coverage[((metric,), region)].loc[year_range[0]:year_range[1]]
+        years = counts.index[counts > 0]
+        return int(years.max()) if len(years) > 0 else None
+
+
+_EMPTY = pd.DataFrame(columns=["rank", "country", "region", *RANK_ASCENDING])
+
+
+def build_rank_tables(cube, europe, africa):
+    """Precompute every ranking from the data cube in a few vectorized passes"""
+    region_of = {c: "Europe" for c in europe}
+    region_of.update({c: "Africa" for c in africa})
+    members = {"Europe": list(europe), "Africa": list(africa), "Combined": list(europe) + list(africa)}
+    years = [int(y) for y in cube.years]
+    metrics = list(RANK_ASCENDING)
+
+    ranks, tables, coverage = {}, {}, {}
+    for region, countries in members.items():
+        idx = cube.country_index(countries)
+        values = {m: cube.values[cube.metric_index(m)][idx] for m in metrics}
+
+        for m in metrics:
+            frame = pd.DataFrame(values[m], index=countries, columns=years)
+            ranks[(m, region)] = frame.rank(axis=0, method="min", ascending=RANK_ASCENDING[m])
+
+        has = {m: ~np.isnan(values[m]) for m in metrics}
+        for k in range(1, len(metrics) + 1):
+            for combo in combinations(sorted(metrics), k):
+                joint = np.logical_and.reduce([has[m] for m in combo])
+                coverage[(combo, region)] = pd.Series(joint.sum(axis=0), index=years)
+
+        for y, year in enumerate(years):
+            snapshot = pd.DataFrame({"country": countries, "region": [region_of[c] for c in countries]})
+            for m in metrics:
+                snapshot[m] = values[m][:, y]
+            for m in metrics:
+                r = ranks[(m, region)][year].to_numpy()
+                if np.isnan(r).all():
+                    continue
+                table = snapshot[~np.isnan(r)].assign(rank=r[~np.isnan(r)].astype(int))
+                table = table.sort_values(["rank", "country"])[["rank", "country", "region", *metrics]]
+                tables[(m, region, year)] = table.reset_index(drop=True)
+
+    return RankTables(ranks=ranks, tables=tables, coverage=coverage)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+MAX_SCORE = 100
+RULE_COLUMNS = ["factor", "op", "threshold", "points"]
+OPS = {">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal}
+
+# Risk rules, one row per threshold. Within a factor the first matching row (in table
+# order) scores, like an if/elif chain; a factor with op "always" adds its points to everyone.
+EUROPE_RULES = pd.DataFrame([
+    ("recycling_rate", "<", 20, 40),
+    ("recycling_rate", "<", 30, 25),
+    ("recycling_rate", "<", 40, 10),
+    ("waste_pc", ">", 600, 30),
+    ("waste_pc", ">", 500, 20),
+    ("waste_pc", ">", 400, 10),
+    ("growth_rate", ">", 2, 30),
+    ("growth_rate", ">", 1, 15),
+    ("growth_rate", ">", 0, 5),
+], columns=RULE_COLUMNS)
+
+AFRICA_RULES = pd.DataFrame([
+    # No recycling infrastructure assumed = base risk
+    ("base", "always", 0, 35),
+    ("waste_pc", ">", 400, 25),
+    ("waste_pc", ">", 300, 15),
+    ("waste_pc", ">", 200, 5),
+    ("growth_rate", ">", 3, 30),
+    ("growth_rate", ">", 2, 20),
+    ("growth_rate", ">", 1, 10),
+    ("growth_rate", ">", 0, 5),
+    # Large total waste volume (infrastructure pressure)
+    ("waste_total_millions", ">", 10, 10),
+    ("waste_total_millions", ">", 5, 5),
+], columns=RULE_COLUMNS)
+
+
+def rule_scores(rules, inputs, thresholds=None, points=None):
+    """
+    Evaluate a rule table for all countries and any number of rule variants at once.
+
+    Args:
+        rules: Rule table (RULE_COLUMNS)
+        inputs: dict factor -> array of values, one per country, or (variant, country)
+            arrays when the inputs themselves vary (e.g. Monte Carlo draws)
+        thresholds, points: (variant, rule) arrays overriding the table's columns
+            (default: the table itself as a single variant)
+
+    Returns:
+        (variant, country) int array of scores capped at MAX_SCORE
+
+    Raises:
+        ValueError: If a threshold or points value is missing
+    """
+    factors = rules["factor"].to_numpy()
+    ops = rules["op"].to_numpy()
+    if thresholds is None:
+        thresholds = rules["threshold"].to_numpy(dtype=float)[None, :]
+    if points is None:
+        points = rules["points"].to_numpy(dtype=float)[None, :]
+    if np.isnan(thresholds).any() or np.isnan(points).any():
+        raise ValueError("Risk rules need a threshold and points value in every row")
+    inputs = {factor: np.atleast_2d(np.asarray(values, dtype=float)) for factor, values in inputs.items()}
+    n_variants = max([len(thresholds), len(points)] + [len(v) for v in inputs.values()])
+    n_countries = next(iter(inputs.values())).shape[1]
+
+    matches = np.zeros((n_variants, len(rules), n_countries), dtype=bool)
+    for r, (factor, op) in enumerate(zip(factors, ops)):
+        if op == "always":
+            matches[:, r] = True
+        else:
+            # NaN inputs never match, like the scalar comparisons
+            matches[:, r] = OPS[op](inputs[factor], thresholds[:, r, None])
+
+    # Only the first matching rule of each factor scores
+    first = np.zeros_like(matches)
+    for factor in pd.unique(factors):
+        rows = np.flatnonzero(factors == factor)
+        hits = matches[:, rows]
+        first[:, rows] = hits & (np.cumsum(hits, axis=1) == 1)
+
+    scores = (first * points[:, :, None]).sum(axis=1)
+    return np.minimum(np.round(scores), MAX_SCORE).astype(int)
+
+
+def rule_variants(rules, n_variants, threshold_jitter=0.15, weight_jitter=0.25, seed=0):
+    """
+    Random threshold/points combinations around a rule table; variant 0 is the table itself.
+
+    Thresholds of a factor move together by up to ±threshold_jitter of the factor's
+    threshold spread (so their order is kept); every rule's points are scaled by up to
+    ±weight_jitter independently.
+
+    Returns:
+        (thresholds, points) arrays of shape (n_variants, rule)
+    """
+    rng = np.random.default_rng(seed)
+    factors = rules["factor"].to_numpy()
+    base_thresholds = rules["threshold"].to_numpy(dtype=float)
+    base_points = rules["points"].to_numpy(dtype=float)
+
+    spread = np.ones(len(rules))
+    shift_group = np.zeros(len(rules), dtype=int)
+    for g, factor in enumerate(pd.unique(factors)):
+        rows = factors == factor
+        values = base_thresholds[rows]
+        spread[rows] = np.ptp(values) if rows.sum() > 1 else max(abs(values[0]), 1.0)
+        shift_group[rows] = g
+
+    shifts = rng.uniform(-threshold_jitter, threshold_jitter, (n_variants, shift_group.max() + 1))
+    thresholds = base_thresholds + shifts[:, shift_group] * spread
+    points = base_points * rng.uniform(1 - weight_jitter, 1 + weight_jitter, (n_variants, len(rules)))
+    thresholds[0], points[0] = base_thresholds, base_points
+    return thresholds, points
+
+
+def calculate_risk_score(recycling_rate, waste_pc, growth_rate, rules=EUROPE_RULES):
+    """Calculate environmental risk score (0-100) for countries with recycling data"""
+    return int(risk_scores([recycling_rate], [waste_pc], [growth_rate], rules)[0])
+
+
+def calculate_risk_score_africa(waste_pc, growth_rate, waste_total_millions, rules=AFRICA_RULES):
+    """Calculate environmental risk score (0-100) for African countries without recycling data"""
+    return int(risk_scores_africa([waste_pc], [growth_rate], [waste_total_millions], rules)[0])
+
+
+def risk_scores(recycling_rate, waste_pc, growth_rate, rules=EUROPE_RULES):
+    """Risk scores (0-100) for arrays of countries with recycling data"""
+    inputs = {"recycling_rate": recycling_rate, "waste_pc": waste_pc, "growth_rate": growth_rate}
+    return rule_scores(rules, inputs)[0]
+
+
+def risk_scores_africa(waste_pc, growth_rate, waste_total_millions, rules=AFRICA_RULES):
+    """Risk scores (0-100) for arrays of countries without recycling data"""
+    inputs = {"waste_pc": waste_pc, "growth_rate": growth_rate, "waste_total_millions": waste_total_millions}
+    return rule_scores(rules, inputs)[0]
+
+
+def risk_levels(scores):
+    """Map risk scores to High / Medium / Low labels"""
+    scores = np.asarray(scores, dtype=float)
+    return np.where(scores > 60, "High", np.where(scores > 30, "Medium", "Low"))
+
+
+def growth_rates(first, last, years_span):
+    """Compound annual growth rate in % between two values (0 where undefined), like the risk loops"""
+    first, last, years_span = (np.asarray(a, dtype=float) for a in (first, last, years_span))
+    ok = (years_span > 0) & (first > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = ((last / first) ** (1 / years_span) - 1) * 100
+    return np.where(ok, rate, 0.0)
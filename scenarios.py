@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from risk import (AFRICA_RULES, EUROPE_RULES, growth_rates, risk_levels, risk_scores, risk_scores_africa,
+                  rule_scores, rule_variants)
+
+
+def scenario_baseline(cube, europe, africa, year_range, detail=False):
+    """
+    Latest values and growth rates of every country, as used by the risk assessment.
+
+    For each country the first and last year within `year_range` with usable data
+    (waste per capita > 0, plus a recycling rate for European countries) give the
+    latest values and the compound annual growth of waste per capita.
+
+    Args:
+        detail: Also return the first-year waste per capita, the growth span and
+            whether the values used were filled rather than observed (for monte_carlo_ranks)
+
+    Returns:
+        DataFrame with one row per country that has at least 2 usable years
+    """
+    countries = list(europe) + list(africa)
+    years = cube.years
+    in_range = (years >= year_range[0]) & (years <= year_range[1])
+
+    idx = cube.country_index(countries)
+    waste_pc = cube.values[cube.metric_index("waste_per_capita_kg")][idx]
+    total = cube.values[cube.metric_index("total_waste_tonnes")][idx]
+    recycling = cube.values[cube.metric_index("recycling_rate")][idx]
+
+    is_europe = np.isin(countries, list(europe))
+    usable = in_range[None, :] & (waste_pc > 0)
+    usable &= ~is_europe[:, None] | ~np.isnan(recycling)
+
+    n_years = len(years)
+    rows = np.arange(len(countries))
+    first = np.argmax(usable, axis=1)
+    last = n_years - 1 - np.argmax(usable[:, ::-1], axis=1)
+
+    baseline = pd.DataFrame({
+        "country": countries,
+        "region": np.where(is_europe, "Europe", "Africa"),
+        "recycling_rate": np.where(is_europe, recycling[rows, last], np.nan),
+        "waste_per_capita": waste_pc[rows, last],
+        "total_waste_millions": total[rows, last] / 1_000_000,
+        "growth_rate": growth_rates(waste_pc[rows, first], waste_pc[rows, last], years[last] - years[first]),
+    })
+    if detail:
+        waste_filled = cube.filled_mask("waste_per_capita_kg")[idx]
+        baseline["waste_per_capita_first"] = waste_pc[rows, first]
+        baseline["growth_years"] = years[last] - years[first]
+        baseline["waste_first_filled"] = waste_filled[rows, first]
+        baseline["waste_last_filled"] = waste_filled[rows, last]
+        baseline["recycling_filled"] = is_europe & cube.filled_mask("recycling_rate")[idx][rows, last]
+    return baseline[usable.sum(axis=1) >= 2].reset_index(drop=True)
+
+
+def score_countries(frame, europe_rules=EUROPE_RULES, africa_rules=AFRICA_RULES):
+    """Risk scores for a baseline-shaped frame; countries with a recycling rate use the recycling model"""
+    has_recycling = frame["recycling_rate"].notna().to_numpy()
+    scores = np.where(
+        has_recycling,
+        risk_scores(frame["recycling_rate"], frame["waste_per_capita"], frame["growth_rate"], europe_rules),
+        risk_scores_africa(frame["waste_per_capita"], frame["growth_rate"], frame["total_waste_millions"],
+                           africa_rules),
+    )
+    return scores
+
+
+def rank_by_risk(scores):
+    """(variant, country) ranks, 1 = highest risk; ties share the best rank like rank(method="min")"""
+    return 1 + (scores[:, None, :] > scores[:, :, None]).sum(axis=2)
+
+
+def rule_sensitivity(baseline, europe_rules=EUROPE_RULES, africa_rules=AFRICA_RULES, n_variants=2000,
+                     threshold_jitter=0.15, weight_jitter=0.25, seed=0):
+    """
+    How stable each country's risk level and rank are when the rule thresholds and points move.
+
+    All countries are scored under `n_variants` random rule variants (see rule_variants)
+    in one array pass per model, then ranked together variant by variant.
+
+    Returns:
+        DataFrame with the baseline score, level and rank of every country, the share of
+        variants keeping its level, the share scoring it High and its rank percentiles
+    """
+    has_recycling = baseline["recycling_rate"].notna().to_numpy()
+    europe = rule_variants(europe_rules, n_variants, threshold_jitter, weight_jitter, seed)
+    africa = rule_variants(africa_rules, n_variants, threshold_jitter, weight_jitter, seed + 1)
+
+    scores = np.where(
+        has_recycling[None, :],
+        rule_scores(europe_rules, {
+            "recycling_rate": baseline["recycling_rate"],
+            "waste_pc": baseline["waste_per_capita"],
+            "growth_rate": baseline["growth_rate"],
+        }, *europe),
+        rule_scores(africa_rules, {
+            "waste_pc": baseline["waste_per_capita"],
+            "growth_rate": baseline["growth_rate"],
+            "waste_total_millions": baseline["total_waste_millions"],
+        }, *africa),
+    )
+    levels = risk_levels(scores)
+    ranks = rank_by_risk(scores)
+
+    return pd.DataFrame({
+        "country": baseline["country"].to_numpy(),
+        "region": baseline["region"].to_numpy(),
+        "risk_score": scores[0],
+        "risk_level": levels[0],
+        "level_stability": (levels == levels[0]).mean(axis=0),
+        "p_high": (levels == "High").mean(axis=0),
+        "rank": ranks[0],
+        "rank_p5": np.percentile(ranks, 5, axis=0),
+        "rank_median": np.median(ranks, axis=0),
+        "rank_p95": np.percentile(ranks, 95, axis=0),
+    }).sort_values(["rank", "country"]).reset_index(drop=True)
+
+
+def monte_carlo_ranks(baseline, n_draws=2000, population_error=5.0, waste_error=5.0, filled_waste_error=15.0,
+                      recycling_error=2.0, filled_recycling_error=5.0, europe_rules=EUROPE_RULES,
+                      africa_rules=AFRICA_RULES, seed=0):
+    """
+    Risk ranks under random measurement error of the input data.
+
+    Each draw perturbs every country's inputs at once: a population factor
+    (waste per capita is total waste / population, so it moves both years alike and
+    leaves growth unchanged), independent waste errors on the first and last year
+    (which move growth), and an additive recycling error. Filled values (interpolated,
+    extrapolated or imputed) get the wider error. All draws are scored as
+    (draw, country) arrays in one pass per model and ranked together draw by draw.
+
+    Args:
+        baseline: Frame from scenario_baseline(..., detail=True)
+        n_draws: Number of Monte Carlo draws
+        population_error: Population error, % (1 sigma, log-normal)
+        waste_error, filled_waste_error: Waste error of observed / filled values, % (1 sigma, log-normal)
+        recycling_error, filled_recycling_error: Recycling rate error of observed / filled
+            values, percentage points (1 sigma)
+
+    Returns:
+        (summary, rank_share) where summary has the baseline score and rank of every
+        country, its score and rank percentiles and the share of draws scoring it High,
+        and rank_share[c, r] is the share of draws placing country c at rank r + 1
+        (both in baseline row order)
+    """
+    rng = np.random.default_rng(seed)
+    n_countries = len(baseline)
+    shape = (n_draws, n_countries)
+
+    def waste_sigma(filled):
+        return np.where(baseline[filled].to_numpy(dtype=bool), filled_waste_error, waste_error) / 100
+
+    population = np.exp(rng.normal(0, population_error / 100, shape))
+    last = np.exp(rng.normal(0, 1, shape) * waste_sigma("waste_last_filled"))
+    first = np.exp(rng.normal(0, 1, shape) * waste_sigma("waste_first_filled"))
+    recycling = baseline["recycling_rate"].to_numpy(dtype=float) + rng.normal(0, 1, shape) * np.where(
+        baseline["recycling_filled"].to_numpy(dtype=bool), filled_recycling_error, recycling_error)
+
+    waste_pc = baseline["waste_per_capita"].to_numpy(dtype=float) * last / population
+    waste_pc_first = baseline["waste_per_capita_first"].to_numpy(dtype=float) * first / population
+    inputs = {
+        "recycling_rate": np.clip(recycling, 0, 100),
+        "waste_pc": waste_pc,
+        "growth_rate": growth_rates(waste_pc_first, waste_pc, baseline["growth_years"].to_numpy()[None, :]),
+        "waste_total_millions": baseline["total_waste_millions"].to_numpy(dtype=float) * last,
+    }
+    has_recycling = baseline["recycling_rate"].notna().to_numpy()
+    scores = np.where(
+        has_recycling[None, :],
+        rule_scores(europe_rules, {f: inputs[f] for f in ("recycling_rate", "waste_pc", "growth_rate")}),
+        rule_scores(africa_rules, {f: inputs[f] for f in ("waste_pc", "growth_rate", "waste_total_millions")}),
+    )
+    ranks = rank_by_risk(scores)
+    # Histogram of every country's ranks in one bincount over (country, rank) cells
+    cells = np.arange(n_countries)[None, :] * n_countries + ranks - 1
+    rank_share = np.bincount(cells.ravel(), minlength=n_countries ** 2).reshape(n_countries, n_countries) / n_draws
+    base_scores = score_countries(baseline, europe_rules, africa_rules)
+
+    summary = pd.DataFrame({
+        "country": baseline["country"].to_numpy(),
+        "region": baseline["region"].to_numpy(),
+        "risk_score": base_scores,
+        "risk_level": risk_levels(base_scores),
+        "score_p5": np.percentile(scores, 5, axis=0),
+        "score_p95": np.percentile(scores, 95, axis=0),
+        "p_high": (risk_levels(scores) == "High").mean(axis=0),
+        "rank": rank_by_risk(base_scores[None, :])[0],
+        "rank_p5": np.percentile(ranks, 5, axis=0),
+        "rank_median": np.median(ranks, axis=0),
+        "rank_p95": np.percentile(ranks, 95, axis=0),
+    })
+    return summary, rank_share
+
+
+def apply_scenario(baseline, target_mask, recycling_rate=None, waste_change_pct=0.0, growth_rate=None,
+                   europe_rules=EUROPE_RULES, africa_rules=AFRICA_RULES):
+    """
+    Recompute risk scores and ranks for all countries under a what-if scenario.
+
+    Args:
+        baseline: Frame from scenario_baseline
+        target_mask: Boolean array selecting the countries the scenario applies to
+        recycling_rate: Recycling rate (%) to assume, or None to keep observed values.
+            Setting it for an African country switches it to the recycling-aware model.
+        waste_change_pct: Relative change applied to waste per capita and total waste
+        growth_rate: Annual waste growth (%) to assume, or None to keep observed growth
+        europe_rules, africa_rules: Rule tables for countries with / without recycling data
+
+    Returns:
+        DataFrame with baseline and scenario scores, levels and ranks (1 = highest risk)
+    """
+    target_mask = np.asarray(target_mask, dtype=bool)
+    scenario = baseline.copy()
+
+    factor = 1 + waste_change_pct / 100
+    scenario["waste_per_capita"] = np.where(target_mask, scenario["waste_per_capita"] * factor, scenario["waste_per_capita"])
+    scenario["total_waste_millions"] = np.where(target_mask, scenario["total_waste_millions"] * factor, scenario["total_waste_millions"])
+    if recycling_rate is not None:
+        scenario["recycling_rate"] = np.where(target_mask, recycling_rate, scenario["recycling_rate"])
+    if growth_rate is not None:
+        scenario["growth_rate"] = np.where(target_mask, growth_rate, scenario["growth_rate"])
+
+    base_scores = score_countries(baseline, europe_rules, africa_rules)
+    new_scores = score_countries(scenario, europe_rules, africa_rules)
+
+    result = scenario.assign(
+        baseline_score=base_scores,
+        scenario_score=new_scores,
+        score_change=new_scores - base_scores,
+        baseline_level=risk_levels(base_scores),
+        scenario_level=risk_levels(new_scores),
+        baseline_rank=pd.Series(base_scores).rank(method="min", ascending=False).astype(int).to_numpy(),
+        scenario_rank=pd.Series(new_scores).rank(method="min", ascending=False).astype(int).to_numpy(),
+        in_scenario=target_mask,
+    )
+    return result
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+Launch the dashboard with the metrics endpoint and the cache warm-up started with the process.
+
+    python serve.py                        # instead of: streamlit run app.py
+    METRICS_PORT=9464 python serve.py --server.port 8501 --server.headless true
+
+Extra arguments are passed on to `streamlit run`. The metrics endpoint comes up
+with the server, before any browser session, and GET /ready answers 503 until the
+warm-up finished, so a deploy's health check (or `python warmup.py --wait ...`)
+does not depend on someone opening the page.
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+from streamlit import runtime
+from streamlit.web import cli
+
+from warmup import THREAD_NAME, quiet_context_warnings
+
+
+def _start_when_running(poll=0.05):
+    # The cached loaders must be created once the runtime exists, so they use its cache storage
+    while not runtime.exists():
+        time.sleep(poll)
+    import loaders
+    loaders.start_metrics_server()
+    loaders.start_warmup()
+
+
+def main():
+    quiet_context_warnings()
+    threading.Thread(target=_start_when_running, daemon=True, name=THREAD_NAME).start()
+    sys.argv = ["streamlit", "run", str(Path(__file__).parent / "app.py"), *sys.argv[1:]]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
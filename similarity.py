@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+SIMILARITY_METRIC = "waste_per_capita_kg"
+DEFAULT_WINDOW = 8
+
+
+@dataclass(frozen=True)
+class WindowIndex:
+    """
+    Every complete `window`-year stretch of every country's series, stacked in one array.
+
+    `vectors[w]` holds the log values of window w, which belongs to country
+    `owners[w]` and starts in year `starts[w]`. Windows are compared in log space,
+    so a match means similar relative levels and growth, not just a similar shape.
+    """
+    countries: tuple
+    years: np.ndarray
+    metric: str
+    window: int
+    values: np.ndarray
+    owners: np.ndarray
+    starts: np.ndarray
+    vectors: np.ndarray
+
+    def query_window(self, country, end_year=None):
+        """Log values of a country's window ending in `end_year` (default: its latest complete window)"""
+        mine = np.flatnonzero(self.owners == self.countries.index(country))
+        if len(mine) == 0:
+            return None, None
+        if end_year is None:
+            w = mine[-1]
+        else:
+            w = mine[self.starts[mine] + self.window - 1 == end_year]
+            if len(w) == 0:
+                return None, None
+            w = w[0]
+        return self.vectors[w], int(self.starts[w] + self.window - 1)
+
+    def search(self, country, k=5, end_year=None, candidates=None, shape_only=False):
+        """
+        Top-k countries whose past stretch is closest to the query country's window.
+
+        Every window of every candidate is scored in one vectorized pass and the
+        best window per country is kept, so the k results are k different countries.
+
+        Args:
+            country: Query country
+            k: Number of matches
+            end_year: Last year of the query window (default: latest complete window)
+            candidates: Countries to search (default: all other countries)
+            shape_only: Remove each window's mean so only the trajectory shape counts
+
+        Returns:
+            (matches, query_end, elapsed_ms) where matches has columns country,
+            start_year, end_year, lag_years (query end - match end) and distance
+        """
+        start = time.perf_counter()
+        query, query_end = self.query_window(country, end_year)
+        if query is None:
+            return pd.DataFrame(columns=["country", "start_year", "end_year", "lag_years", "distance"]), None, 0.0
+
+        keep = self.owners != self.countries.index(country)
+        if candidates is not None:
+            allowed = np.isin(np.array(self.countries), list(candidates))
+            keep &= allowed[self.owners]
+        vectors, owners, starts = self.vectors[keep], self.owners[keep], self.starts[keep]
+
+        if shape_only:
+            vectors = vectors - vectors.mean(axis=1, keepdims=True)
+            query = query - query.mean()
+        distances = np.sqrt(np.mean((vectors - query) ** 2, axis=1))
+
+        # Best window per country: sort by (country, distance) and keep each country's first
+        order = np.lexsort((distances, owners))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = owners[order][1:] != owners[order][:-1]
+        best = order[first]
+        best = best[np.argsort(distances[best], kind="stable")][:k]
+
+        ends = starts[best] + self.window - 1
+        matches = pd.DataFrame({
+            "country": np.array(self.countries)[owners[best]],
+            "start_year": starts[best],
+            "end_year": ends,
+            "lag_years": query_end - ends,
+            "distance": distances[best],
+        })
+        return matches, query_end, (time.perf_counter() - start) * 1000
+
+    def overlay(self, country, matches, query_end):
+        """
+        Long frame for an overlay chart: the query window and each match's series,
+        shifted by its lag so that matched windows line up with the query years.
+        Match rows after the matched window show what happened next.
+        """
+        frames = []
+        ci = self.countries.index(country)
+        query_years = np.arange(query_end - self.window + 1, query_end + 1)
+        frames.append(pd.DataFrame({
+            "country": country,
+            "aligned_year": query_years,
+            "year": query_years,
+            "value": self.values[ci, query_years - int(self.years[0])],
+            "part": "query",
+        }))
+        for row in matches.itertuples():
+            mi = self.countries.index(row.country)
+            series = self.values[mi]
+            years = self.years[row.start_year - int(self.years[0]):]
+            values = series[row.start_year - int(self.years[0]):]
+            present = ~np.isnan(values)
+            frames.append(pd.DataFrame({
+                "country": row.country,
+                "aligned_year": years[present] + row.lag_years,
+                "year": years[present],
+                "value": values[present],
+                "part": np.where(years[present] <= row.end_year, "match", "after"),
+            }))
+        return pd.concat(frames, ignore_index=True)
+
+
+def build_window_index(cube, metric=SIMILARITY_METRIC, window=DEFAULT_WINDOW):
+    """
+    Index all complete windows of one metric for every country of the cube.
+
+    Args:
+        cube: WasteCube with the dashboard values
+        metric: Metric to compare (must be positive, it is compared in log space)
+        window: Window length in years
+
+    Returns:
+        WindowIndex
+    """
+    values = cube.values[cube.metric_index(metric)].astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logs = np.where(values > 0, np.log(values), np.nan)
+
+    # (country, start, window) view without copying, then keep the gap-free windows
+    windows = sliding_window_view(logs, window, axis=1)
+    complete = ~np.isnan(windows).any(axis=2)
+    owners, start_idx = np.nonzero(complete)
+    return WindowIndex(
+        countries=cube.countries,
+        years=cube.years,
+        metric=metric,
+        window=window,
+        values=values,
+        owners=owners,
+        starts=cube.years[start_idx],
+        vectors=np.ascontiguousarray(windows[owners, start_idx]),
+    )
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Static HTML snapshot of the dashboard for read-only sharing.
+
+    python snapshot.py --output output/snapshot --workers 4
+
+Every region x page is rendered headless with Streamlit's AppTest using the
+default country selection and year range, then written as a standalone HTML
+page: Markdown and KPI cards as HTML, tables as HTML tables and Plotly figures
+inlined as JSON (plotly.js is written once to assets/). The result can be
+served by any static file server without running Python per viewer.
+"""
+import argparse
+import html
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+from markdown_it import MarkdownIt
+from plotly.offline import get_plotlyjs
+from streamlit.testing.v1 import AppTest
+
+APP_FILE = Path(__file__).parent / "app.py"
+REGIONS = ["Europe (with recycling)", "Africa (generation)", "North-South Comparison"]
+NAV_LABEL = "📑 Navigation"
+ALERT_COLORS = {"info": "#e8f1fb", "success": "#e8f6ec", "warning": "#fff6e0", "error": "#fdecea"}
+
+md = MarkdownIt("commonmark", {"html": True}).enable("table")
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{assets}/plotly.min.js"></script>
+<style>
+body {{ font-family: "Source Sans Pro", sans-serif; margin: 0; color: #31333f; }}
+nav {{ background: #f0f2f6; padding: 12px 24px; font-size: 0.95rem; }}
+nav a {{ margin-right: 14px; color: #1f77b4; text-decoration: none; }}
+nav a.current {{ font-weight: bold; color: #31333f; }}
+main {{ max-width: 1200px; margin: 0 auto; padding: 16px 24px; }}
+.row {{ display: flex; gap: 16px; }}
+.col {{ flex: 1; min-width: 0; }}
+.metric {{ padding: 8px 0; }} .metric .label {{ font-size: 0.9rem; color: #555; }}
+.metric .value {{ font-size: 1.8rem; }} .metric .delta {{ font-size: 0.9rem; color: #09ab3b; }}
+.alert {{ padding: 12px 16px; border-radius: 8px; margin: 8px 0; }}
+.caption {{ color: #777; font-size: 0.85rem; }}
+table.dataframe {{ border-collapse: collapse; width: 100%; font-size: 0.9rem; }}
+table.dataframe th, table.dataframe td {{ border: 1px solid #e6e6e6; padding: 4px 8px; text-align: right; }}
+table.dataframe th {{ background: #fafafa; }}
+footer {{ color: #888; font-size: 0.8rem; padding: 16px 24px; }}
+</style>
+</head>
+<body>
+<nav>{nav}</nav>
+<main>
+{body}
+</main>
+<footer>{footer}</footer>
+</body>
+</html>
+"""
+
+
+def slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def page_path(region, page):
+    return Path(slug(region)) / f"{slug(page)}.html"
+
+
+def open_page(region, page=None, timeout=300):
+    """Run the app headless and navigate to a region (and page)"""
+    at = AppTest.from_file(str(APP_FILE), default_timeout=timeout)
+    at.run()
+    at.sidebar.radio[0].set_value(region).run()
+    if page is not None:
+        [r for r in at.sidebar.radio if r.label == NAV_LABEL][0].set_value(page).run()
+    return at
+
+
+class _Renderer:
+    """Turns an AppTest element tree into HTML"""
+
+    def __init__(self):
+        self.n_figures = 0
+
+    def node(self, node):
+        kind = getattr(node, "type", None)
+        children = list(getattr(node, "children", {}).values())
+        if kind in ("markdown", "latex"):
+            return md.render(node.value)
+        if kind in ("title", "header", "subheader"):
+            level = {"title": 1, "header": 2, "subheader": 3}[kind]
+            return f"<h{level}>{md.renderInline(node.value)}</h{level}>"
+        if kind == "caption":
+            return f'<p class="caption">{md.renderInline(node.value)}</p>'
+        if kind in ALERT_COLORS:
+            return f'<div class="alert" style="background: {ALERT_COLORS[kind]}">{md.render(node.value)}</div>'
+        if kind == "metric":
+            delta = f'<div class="delta">{html.escape(node.delta)}</div>' if node.delta else ""
+            return (f'<div class="metric"><div class="label">{html.escape(node.label)}</div>'
+                    f'<div class="value">{html.escape(node.value)}</div>{delta}</div>')
+        if kind == "plotly_chart":
+            return self.figure(node.proto.spec)
+        if kind in ("dataframe", "table"):
+            return node.value.to_html(index=False, na_rep="–", classes="dataframe", border=0,
+                                      float_format=lambda v: f"{v:,.2f}")
+        if kind == "column":
+            return f'<div class="col">{self.nodes(children)}</div>'
+        if kind == "expandable":
+            label = md.renderInline(node.proto.expandable.label)
+            return f"<details><summary>{label}</summary>{self.nodes(children)}</details>"
+        if children and all(getattr(c, "type", None) == "column" for c in children):
+            return f'<div class="row">{self.nodes(children)}</div>'
+        if children:
+            return self.nodes(children)
+        # Widgets and anything else interactive has no static equivalent
+        return ""
+
+    def nodes(self, nodes):
+        return "\n".join(self.node(n) for n in nodes)
+
+    def figure(self, spec):
+        self.n_figures += 1
+        fig_id = f"fig-{self.n_figures}"
+        figure = json.loads(spec)
+        payload = json.dumps({"data": figure.get("data", []), "layout": figure.get("layout", {})})
+        # Keep "</script>" inside figure text from closing the script tag
+        payload = payload.replace("</", "<\\/")
+        return (f'<div id="{fig_id}"></div>\n<script>(function() {{ var f = {payload}; '
+                f'Plotly.newPlot("{fig_id}", f.data, f.layout, {{responsive: true}}); }})();</script>')
+
+
+def render_page(region, page, pages_by_region):
+    """Render one region/page to a standalone HTML document"""
+    at = open_page(region, page)
+    if at.exception:
+        raise RuntimeError(f"{region} / {page}: {at.exception[0].message}")
+
+    countries = [w for w in at.sidebar.multiselect if w.label.startswith("Select countries")][0].value
+    years = [w for w in at.sidebar.select_slider if w.label == "Year range"][0].value
+
+    here = page_path(region, page)
+    links = []
+    for r, pages in pages_by_region.items():
+        target = page_path(r, page if page in pages else pages[0])
+        css = ' class="current"' if r == region else ""
+        links.append(f'<a{css} href="../{target.as_posix()}">{html.escape(r)}</a>')
+    links.append("|")
+    for p in pages_by_region[region]:
+        css = ' class="current"' if p == page else ""
+        links.append(f'<a{css} href="../{page_path(region, p).as_posix()}">{html.escape(p)}</a>')
+
+    footer = (f"Static snapshot generated on {date.today().isoformat()} from the default selection: "
+              f"{html.escape(', '.join(countries))}, {int(years[0])}-{int(years[1])}.")
+    return here, PAGE_TEMPLATE.format(
+        title=html.escape(f"{page} - {region}"),
+        assets="../assets",
+        nav=" ".join(links),
+        body=_Renderer().nodes(at.main.children.values()),
+        footer=footer,
+    )
+
+
+def list_pages():
+    """Navigation pages of every region, as the app shows them"""
+    pages = {}
+    for region in REGIONS:
+        at = open_page(region)
+        pages[region] = list([r for r in at.sidebar.radio if r.label == NAV_LABEL][0].options)
+    return pages
+
+
+def _render_task(args):
+    return render_page(*args)
+
+
+def export_snapshot(output_dir, workers=None):
+    """Render every region x page in parallel and write the static site to `output_dir`"""
+    output_dir = Path(output_dir)
+    (output_dir / "assets").mkdir(parents=True, exist_ok=True)
+    (output_dir / "assets" / "plotly.min.js").write_text(get_plotlyjs(), encoding="utf-8")
+
+    written = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        # AppTest runs the app as __main__, so even the page listing stays out of this process
+        pages_by_region = pool.submit(list_pages).result()
+        tasks = [(region, page, pages_by_region) for region, pages in pages_by_region.items() for page in pages]
+        for path, document in pool.map(_render_task, tasks):
+            target = output_dir / path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(document, encoding="utf-8")
+            written.append(path)
+
+    index = "\n".join(
+        f"<h3>{html.escape(region)}</h3><ul>" + "".join(
+            f'<li><a href="{page_path(region, p).as_posix()}">{html.escape(p)}</a></li>' for p in pages
+        ) + "</ul>"
+        for region, pages in pages_by_region.items()
+    )
+    (output_dir / "index.html").write_text(PAGE_TEMPLATE.format(
+        title="Environmental Dashboard - Snapshot",
+        assets="assets",
+        nav="<b>🌍 Environmental Dashboard - Waste Management</b>",
+        body=f"<h1>Static Snapshot</h1>{index}",
+        footer=f"Generated on {date.today().isoformat()}.",
+    ), encoding="utf-8")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export every dashboard page as static HTML")
+    parser.add_argument("--output", default="output/snapshot", help="Output directory")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    written = export_snapshot(args.output, args.workers)
+    print(f"✓ {len(written)} pages written to {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    # AppTest replaces __main__ in the worker processes; run from the importable module so
+    # the pool pickles snapshot._render_task rather than __main__._render_task
+    from snapshot import main
+    main()
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+from matplotlib import colormaps
+
+PAGE_SIZE = 15
+
+
+def gradient_styles(values, cmap, vmin=None, vmax=None):
+    """
+    CSS cell styles for a numeric column, computed for all rows in one vectorized pass.
+
+    Gives the same colors as Styler.background_gradient (including the dark/light
+    text switch), but NaN cells are left unstyled instead of painted black.
+
+    Args:
+        values: Numeric values of the column
+        cmap: Matplotlib colormap name
+        vmin, vmax: Color range (default: min/max of the values)
+
+    Returns:
+        Array of CSS strings, one per value
+    """
+    values = np.asarray(values, dtype=float)
+    styles = np.full(len(values), "", dtype=object)
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return styles
+
+    lo = np.nanmin(values) if vmin is None else vmin
+    hi = np.nanmax(values) if vmax is None else vmax
+    norm = (values[valid] - lo) / (hi - lo) if hi > lo else np.full(valid.sum(), 0.5)
+    rgb = colormaps[cmap](np.clip(norm, 0, 1))[:, :3]
+
+    # Relative luminance (WCAG), same threshold as pandas for switching to light text
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    luminance = linear @ np.array([0.2126, 0.7152, 0.0722])
+    text = np.where(luminance < 0.408, "#f1f1f1", "#000000")
+
+    packed = (np.round(rgb * 255).astype(int) * np.array([1 << 16, 1 << 8, 1])).sum(axis=1)
+    background = np.char.mod("#%06x", packed)
+    styles[valid] = np.char.add(np.char.add(np.char.add("background-color: ", background), ";color: "), text)
+    return styles
+
+
+def query_table(frame, query="", search_col="country", sort_by=None, ascending=True):
+    """Server-side filter (case-insensitive substring on `search_col`) and stable sort"""
+    if query:
+        frame = frame[frame[search_col].astype(str).str.contains(query, case=False, regex=False)]
+    if sort_by is not None:
+        frame = frame.sort_values(sort_by, ascending=ascending, kind="stable", na_position="last")
+    return frame
+
+
+def page_bounds(n_rows, page, page_size=PAGE_SIZE):
+    """(start, stop, n_pages) of a 1-based page, clamped to the available pages"""
+    n_pages = max(1, -(-n_rows // page_size))
+    page = min(max(int(page), 1), n_pages)
+    start = (page - 1) * page_size
+    return start, min(start + page_size, n_rows), n_pages
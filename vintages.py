@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Dataset vintages: frozen copies of the raw OWID files, compared side by side.
+
+    python vintages.py --save 2025-Q3    # keep today's raw data as a vintage
+    python vintages.py --list
+
+A vintage is a folder vintages/<name>/ with the same layout as the project root
+(the two raw CSV folders, plus data/imputed_waste.csv when it was saved). Each
+vintage goes through the same preparation as the live data, and the resulting
+series are stored once: a series that was not revised between vintages points to
+the same read-only buffer in every vintage.
+"""
+import argparse
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cube import build_cube
+from data_loader import RECYCLING_FILE, WASTE_FILE, prepare_datasets
+from forecasting import forecast_waste
+from imputation import IMPUTED_FILE
+from rankings import RANK_ASCENDING
+
+VINTAGE_DIR = Path("vintages")
+CURRENT = "current"
+
+
+def list_vintages(base_path):
+    """Names of the saved vintages, oldest name first (vintage names sort chronologically)"""
+    root = Path(base_path) / VINTAGE_DIR
+    if not root.exists():
+        return []
+    return sorted(
+        d.name for d in root.iterdir()
+        if (d / RECYCLING_FILE).exists() and (d / WASTE_FILE).exists()
+    )
+
+
+def save_vintage(base_path, name):
+    """Copy the current raw files (and KNN imputation) to vintages/<name>/"""
+    base_path = Path(base_path)
+    target = base_path / VINTAGE_DIR / name
+    if target.exists():
+        raise FileExistsError(f"Vintage '{name}' already exists")
+    for file in (RECYCLING_FILE, WASTE_FILE, IMPUTED_FILE):
+        if (base_path / file).exists():
+            (target / file).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(base_path / file, target / file)
+    return target
+
+
+def load_vintage(base_path, name):
+    """Prepared datasets of a saved vintage, like prepare_datasets() returns for the live data"""
+    return prepare_datasets(Path(base_path) / VINTAGE_DIR / name)
+
+
+@dataclass(frozen=True)
+class VintageStore:
+    """
+    Deduplicated (vintage, metric, country) series over a common year axis.
+
+    `buffers` holds every distinct series once as a read-only array;
+    `refs[v, m, c]` is the buffer index of that series in vintage v
+    (-1 when the country is not in the vintage). Unrevised series share a buffer.
+    """
+    names: tuple
+    countries: tuple
+    years: np.ndarray
+    metrics: tuple
+    buffers: tuple
+    refs: np.ndarray
+
+    def values(self, vintage, metric):
+        """(country, year) array of one vintage and metric (NaN where missing)"""
+        refs = self.refs[self.names.index(vintage), self.metrics.index(metric)]
+        out = np.full((len(self.countries), len(self.years)), np.nan)
+        for c in np.flatnonzero(refs >= 0):
+            out[c] = self.buffers[refs[c]]
+        return out
+
+    def frame(self, vintage, metric, countries=None):
+        """Long (country, year, metric) rows of one vintage, read from the shared buffers"""
+        countries = self.countries if countries is None else [c for c in countries if c in self.countries]
+        values = self.values(vintage, metric)[[self.countries.index(c) for c in countries]]
+        rows, cols = np.nonzero(~np.isnan(values))
+        return pd.DataFrame({
+            "country": np.array(countries, dtype=object)[rows],
+            "year": self.years[cols],
+            metric: values[rows, cols],
+        })
+
+    def memory(self):
+        """Bytes held by the shared buffers vs. a dense copy of every vintage"""
+        itemsize = self.buffers[0].itemsize if self.buffers else 8
+        n_series = int((self.refs >= 0).sum())
+        return {
+            "series": n_series,
+            "buffers": len(self.buffers),
+            "stored_bytes": sum(b.nbytes for b in self.buffers),
+            "dense_bytes": n_series * len(self.years) * itemsize,
+        }
+
+    def revised_countries(self, old, new, metric, countries=None):
+        """Countries whose series differs between two vintages (found by buffer identity, no value scan)"""
+        m = self.metrics.index(metric)
+        changed = self.refs[self.names.index(old), m] != self.refs[self.names.index(new), m]
+        revised = [self.countries[c] for c in np.flatnonzero(changed)]
+        return revised if countries is None else [c for c in revised if c in countries]
+
+    def revisions(self, old, new, metric, countries=None):
+        """
+        Cells whose value differs between two vintages, optionally restricted to `countries`.
+
+        Returns:
+            DataFrame with country, year, old and new value, change and change_pct
+            (a value that appears or disappears has NaN on the other side)
+        """
+        revised = self.revised_countries(old, new, metric, countries)
+        columns = ["country", "year", "old", "new", "change", "change_pct"]
+        if not revised:
+            return pd.DataFrame(columns=columns)
+        ci = [self.countries.index(c) for c in revised]
+        before = self.values(old, metric)[ci]
+        after = self.values(new, metric)[ci]
+        differs = ~((before == after) | (np.isnan(before) & np.isnan(after)))
+        rows, cols = np.nonzero(differs)
+        frame = pd.DataFrame({
+            "country": np.array(revised)[rows],
+            "year": self.years[cols],
+            "old": before[rows, cols],
+            "new": after[rows, cols],
+        })
+        frame["change"] = frame["new"] - frame["old"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frame["change_pct"] = frame["change"] / frame["old"].abs() * 100
+        return frame[columns]
+
+    def rank_changes(self, old, new, metric, year, countries=None):
+        """
+        Ranking of one year under both vintages (1 = best, direction as on the Rankings page).
+
+        Returns:
+            DataFrame with country, old_rank, new_rank and rank_change (positive = climbed),
+            restricted to countries whose rank changed
+        """
+        yi = int(year) - int(self.years[0])
+        frame = pd.DataFrame({
+            "country": self.countries,
+            "old_value": self.values(old, metric)[:, yi],
+            "new_value": self.values(new, metric)[:, yi],
+        })
+        if countries is not None:
+            frame = frame[frame["country"].isin(countries)]
+        ascending = RANK_ASCENDING[metric]
+        frame["old_rank"] = frame["old_value"].rank(ascending=ascending, method="min")
+        frame["new_rank"] = frame["new_value"].rank(ascending=ascending, method="min")
+        frame["rank_change"] = frame["old_rank"] - frame["new_rank"]
+        moved = frame["old_rank"].ne(frame["new_rank"]) & ~(frame["old_rank"].isna() & frame["new_rank"].isna())
+        return frame[moved].sort_values("rank_change", key=np.abs, ascending=False).reset_index(drop=True)
+
+
+def _canonical(values, digits=12):
+    """Round to `digits` significant digits, so float noise from CSV round trips is not taken for a revision"""
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        scale = 10.0 ** (digits - 1 - np.floor(np.log10(np.abs(values))))
+        return np.where(np.isfinite(scale), np.round(values * scale) / scale, values)
+
+
+def build_vintage_store(datasets):
+    """
+    Store several vintages with shared buffers for identical series.
+
+    Args:
+        datasets: dict vintage name -> (df_recycling, df_waste, df_merged, europe, africa),
+                  in display order
+
+    Returns:
+        VintageStore
+    """
+    cubes = {name: build_cube(d[0], d[1], d[3], d[4]) for name, d in datasets.items()}
+    countries = list(dict.fromkeys(c for cube in cubes.values() for c in cube.countries))
+    years = np.arange(min(int(c.years[0]) for c in cubes.values()),
+                      max(int(c.years[-1]) for c in cubes.values()) + 1)
+    metrics = next(iter(cubes.values())).metrics
+
+    buffers, pool = [], {}
+    refs = np.full((len(cubes), len(metrics), len(countries)), -1, dtype=np.int32)
+    for v, cube in enumerate(cubes.values()):
+        offset = int(cube.years[0]) - int(years[0])
+        for c, country in enumerate(cube.countries):
+            ci = countries.index(country)
+            for m in range(len(metrics)):
+                series = np.full(len(years), np.nan)
+                series[offset:offset + len(cube.years)] = _canonical(cube.values[m, c])
+                # Byte-identical series (NaNs included) map to the same buffer
+                key = series.tobytes()
+                if key not in pool:
+                    series.flags.writeable = False
+                    pool[key] = len(buffers)
+                    buffers.append(series)
+                refs[v, m, ci] = pool[key]
+
+    return VintageStore(
+        names=tuple(cubes),
+        countries=tuple(countries),
+        years=years,
+        metrics=tuple(metrics),
+        buffers=tuple(buffers),
+        refs=refs,
+    )
+
+
+def forecast_changes(old_waste, new_waste, countries, years_ahead=5, window_size=5):
+    """
+    Final-year waste per capita forecast of each country under two vintages.
+
+    Only worth running for countries whose waste per capita was revised; the
+    others get the same forecast from both vintages.
+
+    Returns:
+        DataFrame with country, year, old/new forecast, change_pct and old/new model
+    """
+    rows = []
+    for country in countries:
+        before = forecast_waste(old_waste, country, years_ahead=years_ahead, window_size=window_size)
+        after = forecast_waste(new_waste, country, years_ahead=years_ahead, window_size=window_size)
+        if before is None or after is None:
+            continue
+        before, after = before.iloc[-1], after.iloc[-1]
+        rows.append({
+            "country": country,
+            "old_year": int(before["year"]),
+            "old_forecast": before["predicted_waste_pc"],
+            "new_year": int(after["year"]),
+            "new_forecast": after["predicted_waste_pc"],
+            "old_model": before["model_used"],
+            "new_model": after["model_used"],
+        })
+    frame = pd.DataFrame(rows, columns=["country", "old_year", "old_forecast", "new_year", "new_forecast",
+                                        "old_model", "new_model"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frame.insert(5, "change_pct", (frame["new_forecast"] - frame["old_forecast"]) / frame["old_forecast"] * 100)
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Save or list dataset vintages")
+    parser.add_argument("--save", metavar="NAME", help="Save the current raw data as a vintage")
+    parser.add_argument("--list", action="store_true", help="List saved vintages")
+    args = parser.parse_args()
+
+    base_path = Path(__file__).parent
+    if args.save:
+        print(f"✓ vintage saved to {save_vintage(base_path, args.save)}")
+    if args.list or not args.save:
+        names = list_vintages(base_path)
+        print("\n".join(names) if names else "No saved vintages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Background cache warm-up with readiness reporting.
+
+serve.py starts a WarmUp as soon as the server process is up (with plain
+`streamlit run app.py`, on the first script run instead); it fills the data
+caches, the forecasts of the default selections and the common figures in a
+daemon thread. Readiness is exported
+on the metrics endpoint (GET /ready answers 503 until the warm-up finished, then
+200), so a deploy's health check can wait for it:
+
+    python warmup.py --wait http://localhost:9464/ready --timeout 300
+"""
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+THREAD_NAME = "cache-warmup"
+# Streamlit warns about every cached call made outside a session
+_CONTEXT_LOGGER = "streamlit.runtime.scriptrunner_utils.script_run_context"
+
+
+class _SkipWarmUpThread(logging.Filter):
+    """Drop records emitted from the warm-up thread, which runs outside any session by design"""
+
+    def filter(self, record):
+        return threading.current_thread().name != THREAD_NAME
+
+
+_skip_warmup_thread = _SkipWarmUpThread()
+
+
+def quiet_context_warnings():
+    """Silence the "missing ScriptRunContext" warnings of threads named THREAD_NAME"""
+    logging.getLogger(_CONTEXT_LOGGER).addFilter(_skip_warmup_thread)
+
+
+class WarmUp:
+    """Runs named steps one after the other in a daemon thread and tracks their progress"""
+
+    def __init__(self, steps):
+        self.steps = list(steps)
+        self.done = 0
+        self.current = None
+        self.errors = []
+        self.started = None
+        self.finished = None
+        self._ready = threading.Event()
+
+    def start(self):
+        self.started = time.perf_counter()
+        quiet_context_warnings()
+        threading.Thread(target=self._run, daemon=True, name=THREAD_NAME).start()
+        return self
+
+    def _run(self):
+        for name, step in self.steps:
+            self.current = name
+            try:
+                step()
+            except Exception as exc:
+                # A failed step only leaves its cache cold; the page computes it on demand
+                self.errors.append((name, repr(exc)))
+            self.done += 1
+        self.current = None
+        self.finished = time.perf_counter()
+        self._ready.set()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def status(self):
+        """JSON-serializable progress report"""
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return {
+            "ready": self.ready,
+            "steps_done": self.done,
+            "steps_total": len(self.steps),
+            "current": self.current,
+            "errors": [f"{name}: {error}" for name, error in self.errors],
+            "elapsed_s": round(end - self.started, 2) if self.started is not None else 0.0,
+        }
+
+
+def wait_until_ready(url, timeout=300, interval=1.0):
+    """Poll a /ready endpoint until it answers 200; returns the last status (None if unreachable)"""
+    deadline = time.monotonic() + timeout
+    status = None
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as exc:
+            # 503 while warming up, with the progress report as body
+            status = json.loads(exc.read() or b"null")
+        except (urllib.error.URLError, OSError):
+            # Server (or its first session) not up yet
+            pass
+        if time.monotonic() >= deadline:
+            return status
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wait for the dashboard cache warm-up to finish")
+    parser.add_argument("--wait", metavar="URL", default="http://localhost:9464/ready",
+                        help="Readiness endpoint (served on METRICS_PORT)")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait before giving up")
+    args = parser.parse_args()
+
+    status = wait_until_ready(args.wait, args.timeout)
+    if status is None or not status.get("ready"):
+        print(f"✗ not ready after {args.timeout:.0f}s: {status}")
+        sys.exit(1)
+    print(f"✓ ready: {status['steps_done']} steps in {status['elapsed_s']}s"
+          + (f", {len(status['errors'])} failed" if status["errors"] else ""))
+
+
+if __name__ == "__main__":
+    main()